@@ -0,0 +1,56 @@
+"""
+Compares sustained writes per second of Neo4jRtStore and AsyncNeo4jRtStore, for single-tuple saves and batched saves.
+Requires a disposable Neo4j database at neo4j://localhost:7687.
+"""
+from rt_core_v2.rttuple import ANTuple
+from rt2_neo4j.client import Neo4jRtStore
+from rt2_neo4j.async_client import AsyncNeo4jRtStore
+import asyncio
+import time
+
+uri = "neo4j://localhost:7687/"
+auth = ("neo4j", "neo4jneo4j")
+
+single_tuples = 5_000
+batched_tuples = 200_000
+batch_size = 5_000
+concurrency = 32
+
+
+def report(name, count, seconds):
+    print(f"{name:<40} {count / seconds:>12.0f} tuples/s")
+
+
+def bench_sync():
+    store = Neo4jRtStore(uri, auth)
+    store.ensure_schema()
+    tuples = [ANTuple() for _ in range(single_tuples)]
+    start = time.perf_counter()
+    for tup in tuples:
+        store.save_tuple(tup)
+    report("sync save_tuple", single_tuples, time.perf_counter() - start)
+
+    tuples = [ANTuple() for _ in range(batched_tuples)]
+    start = time.perf_counter()
+    store.save_tuples(tuples, batch_size=batch_size)
+    report("sync save_tuples", batched_tuples, time.perf_counter() - start)
+    store.shut_down()
+
+
+async def bench_async():
+    async with AsyncNeo4jRtStore(uri, auth, max_concurrency=concurrency) as store:
+        tuples = [ANTuple() for _ in range(single_tuples)]
+        start = time.perf_counter()
+        await asyncio.gather(*(store.save_tuple(tup) for tup in tuples))
+        report(f"async save_tuple (concurrency {concurrency})", single_tuples, time.perf_counter() - start)
+
+        tuples = [ANTuple() for _ in range(batched_tuples)]
+        chunks = [tuples[idx:idx + batch_size] for idx in range(0, batched_tuples, batch_size)]
+        start = time.perf_counter()
+        await asyncio.gather(*(store.save_tuples(chunk) for chunk in chunks))
+        report(f"async save_tuples (concurrency {concurrency})", batched_tuples, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    bench_sync()
+    asyncio.run(bench_async())
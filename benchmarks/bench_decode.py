@@ -0,0 +1,89 @@
+"""
+Measures the decode throughput of hydrated records per tuple type, comparing record_to_rttuple and its
+precompiled per-type decoders with the generic neo4j_to_rttuple conversion.
+Records are built in memory in the shape hydration_return produces, so no database is needed.
+"""
+from rt_core_v2.rttuple import ANTuple, ARTuple, DITuple, DCTuple, FTuple, NtoNTuple, NtoRTuple, NtoCTuple, NtoDETuple, NtoLackRTuple
+from rt2_neo4j.queries import NodeLabels, record_to_rttuple, neo4j_to_rttuple, tuple_constructors, ordered_relationships, tuple_node_properties
+from rt2_neo4j.bulk import tuple_to_row
+import time
+
+records_per_type = 20_000
+
+
+def hydrated_record(tup):
+    """Builds the record hydration_return would return for a tuple"""
+    row = tuple_to_row(tup)
+    label = tup.tuple_type.value
+    node_properties = tuple_node_properties[tup.tuple_type]
+    properties = {key: row[key] for key in node_properties}
+    edges = []
+    ordered_key = ordered_relationships.get(label)
+    for key, value in row.items():
+        if key in node_properties or key in ("sha256", "ruics", "ruidt"):
+            continue
+        if key == ordered_key:
+            edges.extend({"type": key, "rui": entry, key: idx} for idx, entry in enumerate(value))
+        elif key == "code":
+            edges.append({"type": key, "code": value, "designated": row["ruics"]})
+        elif key == "data":
+            edges.append({"type": key, "data": value, "sha256": row["sha256"], "designated": row["ruidt"]})
+        else:
+            edges.append({"type": key, "rui": value})
+    return {"labels": [label, NodeLabels.RtNode.value], "properties": properties, "edges": edges}
+
+
+def flat_attributes(record):
+    """Flattens a record the way record_to_rttuple does before decoding"""
+    attributes = dict(record["properties"])
+    for edge in record["edges"]:
+        if edge["type"] == "code":
+            attributes["code"], attributes["ruics"] = edge["code"], edge["designated"]
+        elif edge["type"] == "data":
+            attributes["data"], attributes["ruidt"] = edge["data"], edge["designated"]
+        elif edge["type"] in ("replacements", "p"):
+            attributes.setdefault(edge["type"], []).append(edge["rui"])
+        else:
+            attributes[edge["type"]] = edge["rui"]
+    return attributes
+
+
+def sample_tuples():
+    an, other_an, ar = ANTuple(), ANTuple(), ARTuple()
+    ntor = NtoRTuple(ruin=an.ruin, ruir=ar.ruir, r=other_an.ruin)
+    return [
+        an, ar,
+        DITuple(ruia=an.ruin, ruid=an.ruin, ruit=ar.rui),
+        DCTuple(ruid=an.ruin, ruit=an.rui, replacements=[other_an.rui, ar.rui]),
+        FTuple(C=0.5, ruitn=ntor.rui),
+        NtoNTuple(r=an.ruin, p=[an.ruin, other_an.ruin]),
+        ntor,
+        NtoCTuple(code="code", ruin=an.ruin, r=other_an.ruin, ruics=an.ruin),
+        NtoDETuple(ruin=an.ruin, ruidt=other_an.ruin, data=bytes(64)),
+        NtoLackRTuple(ruin=an.ruin, ruir=ar.ruir, r=other_an.ruin),
+    ]
+
+
+def throughput(decode, inputs):
+    start = time.perf_counter()
+    for entry in inputs:
+        decode(entry)
+    return len(inputs) / (time.perf_counter() - start)
+
+
+def main():
+    print(f"{'type':>10} {'decoder/s':>12} {'generic/s':>12}")
+    for tup in sample_tuples():
+        record = hydrated_record(tup)
+        assert record_to_rttuple(record) == tup
+        label = tup.tuple_type.value
+        attributes = flat_attributes(record)
+        records = [record] * records_per_type
+        attribute_dicts = [attributes] * records_per_type
+        decoded = throughput(record_to_rttuple, records)
+        generic = throughput(lambda attrs: tuple_constructors[label](**neo4j_to_rttuple(attrs)), attribute_dicts)
+        print(f"{label:>10} {decoded:>12,.0f} {generic:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
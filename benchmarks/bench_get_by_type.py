@@ -0,0 +1,54 @@
+"""
+Measures how get_by_type lookup time scales with the number of designation tuples in the store.
+The same lookups against InMemoryRtStore give the ceiling an index lookup can reach.
+Requires a disposable Neo4j database at neo4j://localhost:7687, which is wiped before each run.
+"""
+from rt_core_v2.rttuple import ANTuple, NtoCTuple, TupleType
+from rt2_neo4j.client import Neo4jRtStore
+from rt2_neo4j.memory import InMemoryRtStore
+import random
+import time
+
+uri = "neo4j://localhost:7687/"
+auth = ("neo4j", "neo4jneo4j")
+
+sizes = [1_000, 10_000, 100_000]
+lookups = 500
+
+
+def load(store, size):
+    if isinstance(store, Neo4jRtStore):
+        with store.driver.session() as session:
+            session.run("MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS").consume()
+    else:
+        store.shut_down()
+    code_system = ANTuple()
+    relation = ANTuple()
+    particulars = [ANTuple() for _ in range(size)]
+    store.save_tuples([code_system, relation] + particulars, batch_size=5000)
+    store.save_tuples((NtoCTuple(code=f"code-{idx}", ruin=particular.ruin, r=relation.ruin, ruics=code_system.ruin)
+                       for idx, particular in enumerate(particulars)), batch_size=5000)
+    return code_system.ruin
+
+
+def main():
+    neo4j_store = Neo4jRtStore(uri, auth)
+    neo4j_store.ensure_schema()
+    print(f"{'store':>8} {'tuples':>10} {'mean ms':>10} {'p99 ms':>10}")
+    for name, store in [("neo4j", neo4j_store), ("memory", InMemoryRtStore())]:
+        for size in sizes:
+            code_system = load(store, size)
+            timings = []
+            for _ in range(lookups):
+                code = f"code-{random.randrange(size)}"
+                start = time.perf_counter()
+                found = store.get_by_type(TupleType.NtoC, code_system, code)
+                timings.append((time.perf_counter() - start) * 1000)
+                assert len(found) == 1
+            timings.sort()
+            print(f"{name:>8} {size:>10} {sum(timings) / len(timings):>10.3f} {timings[int(len(timings) * 0.99)]:>10.3f}")
+        store.shut_down()
+
+
+if __name__ == "__main__":
+    main()
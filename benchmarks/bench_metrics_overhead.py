@@ -0,0 +1,39 @@
+"""
+Measures the per-call cost of the instrumented decorator around a trivial function, with no sink enabled,
+with an in-process MetricsRegistry and with a CallbackSink, against the bare function.
+No database is needed.
+"""
+from rt2_neo4j.metrics import MetricsRegistry, CallbackSink, instrumented, set_sink
+import time
+
+calls = 1_000_000
+
+
+def bare(x):
+    return x
+
+
+instrumented_bare = instrumented("bare")(bare)
+
+
+def nanoseconds_per_call(function) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        function(i)
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main():
+    baseline = nanoseconds_per_call(bare)
+    print(f"bare function:         {baseline:6.0f} ns/call")
+    print(f"instrumented, off:     {nanoseconds_per_call(instrumented_bare):6.0f} ns/call")
+    for name, sink in [("registry", MetricsRegistry()), ("callback", CallbackSink(observe=lambda *args: None))]:
+        previous = set_sink(sink)
+        try:
+            print(f"instrumented, {name}: {nanoseconds_per_call(instrumented_bare):6.0f} ns/call")
+        finally:
+            set_sink(previous)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Measures how the throughput of parallel_ingest scales with the number of worker processes.
+Each run writes the same mix of AN, DI, NtoR and NtoC tuples, with NtoC tuples sharing a few Code nodes,
+and prints the report of parallel_ingest next to the single-process Neo4jRtStore.ingest baseline.
+Requires a disposable Neo4j database at neo4j://localhost:7687, which is wiped before each run.
+"""
+from rt_core_v2.rttuple import ANTuple, ARTuple, DITuple, NtoRTuple, NtoCTuple
+from rt2_neo4j.client import Neo4jRtStore
+from rt2_neo4j.parallel import parallel_ingest
+import random
+import time
+
+uri = "neo4j://localhost:7687/"
+auth = ("neo4j", "neo4jneo4j")
+
+particulars = 50_000
+codes = 100
+worker_counts = [1, 2, 4, 8]
+batch_size = 5_000
+
+
+def sample_tuples():
+    random.seed(0)
+    author, ar, code_system, relation = ANTuple(), ARTuple(), ANTuple(), ANTuple()
+    ans = [ANTuple() for _ in range(particulars)]
+    tuples = [author, ar, code_system, relation] + ans
+    for an in ans:
+        tuples.append(DITuple(ruia=author.ruin, ruid=author.ruin, ruit=an.rui))
+        tuples.append(NtoRTuple(ruin=an.ruin, ruir=ar.ruir, r=relation.ruin))
+        tuples.append(NtoCTuple(code=f"code-{random.randrange(codes)}", ruin=an.ruin, r=relation.ruin, ruics=code_system.ruin))
+    return tuples
+
+
+def wipe(store):
+    with store.driver.session() as session:
+        session.run("MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS").consume()
+
+
+def main():
+    tuples = sample_tuples()
+    store = Neo4jRtStore(uri, auth, batch_size=batch_size)
+    store.ensure_schema()
+    wipe(store)
+    start = time.perf_counter()
+    report = store.ingest(tuples, window_size=len(tuples))
+    elapsed = time.perf_counter() - start
+    print(f"{'workers':>8} {'tuples/s':>12} {'seconds':>10} {'levels':>8} {'retries':>8} {'contention':>11}")
+    print(f"{'ingest':>8} {report.written / elapsed:>12,.0f} {elapsed:>10.2f} {'-':>8} {'-':>8} {'-':>11}")
+    for workers in worker_counts:
+        wipe(store)
+        report = parallel_ingest(tuples, uri, auth, workers=workers, window_size=len(tuples), batch_size=batch_size)
+        assert report.written == len(tuples)
+        print(f"{workers:>8} {report.throughput():>12,.0f} {report.seconds:>10.2f} {report.levels:>8} "
+              f"{report.retries.retries:>8} {report.retries.contention_rate():>11.1%}")
+    store.shut_down()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compares statements with inlined values against the parameterized templates of rt2_neo4j.cypher.
+Each statement matches a node and creates a relationship per entry of a list, like DC replacements.
+The plan cache hit rate is estimated as the share of statements whose text had already been sent,
+since Neo4j caches plans by query text; Neo4j's own query statistics are printed when available.
+Requires a disposable Neo4j database at neo4j://localhost:7687, which is wiped before each run.
+"""
+from rt2_neo4j.cypher import CypherNode, CypherOperation, AtomicEntityQuery, CompoundQuery, create_relationship
+from neo4j import GraphDatabase
+import random
+import time
+import uuid
+
+uri = "neo4j://localhost:7687/"
+auth = ("neo4j", "neo4jneo4j")
+
+statements = 2_000
+max_entries = 8
+
+
+def inlined_query(rui, entries):
+    lines = [f"CREATE (dc:Bench {{rui: '{rui}'}})"]
+    for idx, entry in enumerate(entries):
+        lines.append(f"MERGE (entry{idx}:BenchEntry {{rui: '{entry}'}})")
+        lines.append(f"CREATE (dc)-[:replacements {{replacements: {idx}}}]->(entry{idx})")
+    return "\n".join(lines), {}
+
+
+def parameterized_query(rui, entries):
+    dc = CypherNode("dc", ["Bench"], {"rui": rui})
+    queries = [AtomicEntityQuery(CypherOperation.CREATE, dc)]
+    for idx, entry in enumerate(entries):
+        node = CypherNode(f"entry{idx}", ["BenchEntry"], {"rui": entry})
+        queries.append(AtomicEntityQuery(CypherOperation.MERGE, node))
+        queries.append(create_relationship(dc, node, ["replacements"], {"replacements": idx}))
+    query = CompoundQuery(queries)
+    return query.get_query(), query.get_parameters()
+
+
+def server_query_stats(session):
+    try:
+        rows = session.run("CALL db.stats.retrieve('QUERIES') YIELD data RETURN data").data()
+        return len(rows)
+    except Exception:
+        return None
+
+
+def run(driver, build):
+    with driver.session() as session:
+        session.run("MATCH (n) WHERE n:Bench OR n:BenchEntry DETACH DELETE n").consume()
+        try:
+            session.run("CALL db.stats.clear('QUERIES')").consume()
+            session.run("CALL db.stats.collect('QUERIES')").consume()
+        except Exception:
+            pass
+        seen = set()
+        hits = 0
+        start = time.perf_counter()
+        for _ in range(statements):
+            entries = [str(uuid.uuid4()) for _ in range(random.randint(1, max_entries))]
+            text, parameters = build(str(uuid.uuid4()), entries)
+            if text in seen:
+                hits += 1
+            seen.add(text)
+            session.run(text, parameters).consume()
+        elapsed = time.perf_counter() - start
+        collected = server_query_stats(session)
+        try:
+            session.run("CALL db.stats.stop('QUERIES')").consume()
+        except Exception:
+            pass
+    return elapsed, len(seen), hits / statements, collected
+
+
+def main():
+    driver = GraphDatabase.driver(uri, auth=auth)
+    print(f"{'builder':>14} {'seconds':>10} {'texts':>8} {'hit rate':>10} {'server queries':>16}")
+    for name, build in [("inlined", inlined_query), ("parameterized", parameterized_query)]:
+        random.seed(0)
+        elapsed, texts, hit_rate, collected = run(driver, build)
+        print(f"{name:>14} {elapsed:>10.3f} {texts:>8} {hit_rate:>10.1%} {collected if collected is not None else '-':>16}")
+    driver.close()
+
+
+if __name__ == "__main__":
+    main()
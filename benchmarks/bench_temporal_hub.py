@@ -0,0 +1,56 @@
+"""
+Measures writes of tuples sharing one temporal reference, merging the temporal node in every statement
+versus creating it ahead of each batch with the temporal_hubs store option.
+One million NtoR tuples all point at the same temporal node and are written by concurrent threads;
+their particulars are written beforehand and are not timed.
+Requires a disposable Neo4j database at neo4j://localhost:7687, which is wiped before each run.
+"""
+from rt_core_v2.rttuple import ANTuple, ARTuple, NtoRTuple
+from rt_core_v2.ids_codes.rui import TempRef
+from rt2_neo4j.client import Neo4jRtStore
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import time
+
+uri = "neo4j://localhost:7687/"
+auth = ("neo4j", "neo4jneo4j")
+
+tuples = 1_000_000
+writers = 8
+batch_size = 5_000
+
+
+def load(store):
+    with store.driver.session() as session:
+        session.run("MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS").consume()
+    ar, relation = ARTuple(), ANTuple()
+    particulars = [ANTuple() for _ in range(tuples)]
+    store.save_tuples([ar, relation] + particulars, batch_size=batch_size)
+    shared = TempRef(datetime(2024, 1, 1))
+    return [NtoRTuple(ruin=particular.ruin, ruir=ar.ruir, r=relation.ruin, tr=shared) for particular in particulars]
+
+
+def run(temporal_hubs):
+    store = Neo4jRtStore(uri, auth, batch_size=batch_size, temporal_hubs=temporal_hubs)
+    store.ensure_schema()
+    ntors = load(store)
+    store.retry_policy.take_stats()
+    chunks = [ntors[idx::writers] for idx in range(writers)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(writers) as executor:
+        list(executor.map(lambda chunk: store.save_tuples(chunk, batch_size=batch_size), chunks))
+    elapsed = time.perf_counter() - start
+    stats = store.retry_stats()
+    store.shut_down()
+    return elapsed, stats
+
+
+def main():
+    print(f"{'mode':>14} {'tuples/s':>12} {'seconds':>10} {'retries':>8} {'deadlocks':>10} {'lock waits':>11}")
+    for name, temporal_hubs in [("merge", False), ("temporal_hubs", True)]:
+        elapsed, stats = run(temporal_hubs)
+        print(f"{name:>14} {tuples / elapsed:>12,.0f} {elapsed:>10.2f} {stats.retries:>8} {stats.deadlocks:>10} {stats.lock_timeouts:>11}")
+
+
+if __name__ == "__main__":
+    main()
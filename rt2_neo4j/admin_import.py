@@ -0,0 +1,312 @@
+from rt_core_v2.rttuple import RtTuple, TupleType
+from rt2_neo4j.queries import NodeLabels, RelationshipLabels, tuple_node_properties
+from rt2_neo4j.bulk import tuple_to_row
+from rt2_neo4j.encoding import Encoding, string_encoding
+from collections import OrderedDict
+from array import array
+from pathlib import Path
+from typing import Iterable
+from datetime import datetime
+import csv
+import hashlib
+import shutil
+import zlib
+
+"""Components of each tuple type pointing directly at the node of another rui, with the relationship they become"""
+tuple_node_references = {
+    TupleType.AN: [],
+    TupleType.AR: [],
+    TupleType.DI: [RelationshipLabels.ruit, RelationshipLabels.ruid, RelationshipLabels.ruia],
+    TupleType.DC: [RelationshipLabels.ruit, RelationshipLabels.ruid],
+    TupleType.F: [RelationshipLabels.ruitn],
+    TupleType.NtoN: [RelationshipLabels.r],
+    TupleType.NtoR: [RelationshipLabels.ruin, RelationshipLabels.ruir, RelationshipLabels.r],
+    TupleType.NtoC: [RelationshipLabels.r, RelationshipLabels.ruin],
+    TupleType.NtoDE: [RelationshipLabels.ruin],
+    TupleType.NtoLackR: [RelationshipLabels.ruin, RelationshipLabels.ruir, RelationshipLabels.r],
+}
+
+"""Components holding an ordered list of ruis, with the relationship property recording the position of each entry"""
+tuple_list_references = {
+    TupleType.DC: RelationshipLabels.replacement,
+    TupleType.NtoN: RelationshipLabels.p_list,
+}
+
+"""Components naming the temporal node of a tuple"""
+tuple_temporal_references = {
+    TupleType.DI: RelationshipLabels.ta,
+    TupleType.NtoN: RelationshipLabels.tr,
+    TupleType.NtoR: RelationshipLabels.tr,
+    TupleType.NtoC: RelationshipLabels.tr,
+    TupleType.NtoLackR: RelationshipLabels.tr,
+}
+
+temporal_file = NodeLabels.Temporal.value
+code_file = NodeLabels.Code.value
+data_file = NodeLabels.Data.value
+relationships_file = "relationships"
+
+"""Headers of the node properties that are not strings"""
+property_headers = {
+    "t": "t:datetime",
+    "C": "C:double",
+    "polarity": "polarity:boolean",
+}
+
+"""Header of every node file, by file name"""
+node_headers = {
+    **{tuple_type.value: [":ID"] + [property_headers.get(prop, prop) for prop in tuple_node_properties[tuple_type]] + [":LABEL"]
+       for tuple_type in tuple_node_properties},
+    NodeLabels.NPoR.value: [":ID", "rui", ":LABEL"],
+    NodeLabels.RPoR.value: [":ID", "rui", ":LABEL"],
+    temporal_file: [":ID", "rui", ":LABEL"],
+    code_file: [":ID", "ruics", "code", ":LABEL"],
+    data_file: [":ID", "ruidt", "sha256", "data:byte[]", ":LABEL"],
+}
+
+relationship_header = [":START_ID", ":END_ID", ":TYPE",
+                       f"{RelationshipLabels.replacement.value}:int", f"{RelationshipLabels.p_list.value}:int"]
+
+def node_labels(*labels: NodeLabels) -> str:
+    return ";".join(label.value for label in labels)
+
+def temporal_id(rui: str) -> str:
+    # Temporal nodes are MERGEd under their own label, so they get an ID of their own even if their rui is reused
+    return f"{NodeLabels.Temporal.value}:{rui}"
+
+def code_id(ruics: str, code: str) -> str:
+    return f"{NodeLabels.Code.value}:{ruics}:{hashlib.sha256(code.encode()).hexdigest()}"
+
+def data_id(ruidt: str, digest: str) -> str:
+    return f"{NodeLabels.Data.value}:{ruidt}:{digest}"
+
+def byte_array(data: bytes | None) -> str | None:
+    """Formats a payload as a neo4j-admin byte[] field of signed bytes"""
+    if data is None:
+        return None
+    return ";".join(map(str, array('b', data)))
+
+def csv_field(value) -> str:
+    """
+    Formats a CSV field for neo4j-admin. Strings are always quoted so that empty strings are told apart from
+    missing properties, which are written as empty unquoted fields.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+class PartWriter:
+    """
+    Writes the rows of one CSV file as a header file followed by numbered part files of at most part_size rows.
+
+    Attributes:
+        paths (list[Path]): The header file followed by the part files written so far.
+    """
+
+    def __init__(self, directory: Path, name: str, header: list[str], part_size: int):
+        self.directory = directory
+        self.name = name
+        self.part_size = part_size
+        self.rows = 0
+        self.file = None
+        header_path = directory / f"{name}-header.csv"
+        with open(header_path, 'w', newline='') as header_file:
+            csv.writer(header_file).writerow(header)
+        self.paths = [header_path]
+
+    def write(self, row: list):
+        if self.rows % self.part_size == 0:
+            self.close()
+            path = self.directory / f"{self.name}-part{len(self.paths):05d}.csv"
+            self.paths.append(path)
+            self.file = open(path, 'w', newline='')
+        self.file.write(",".join(map(csv_field, row)) + "\n")
+        self.rows += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+class AdminImportWriter:
+    """
+    Streams tuples into node and relationship CSV files for `neo4j-admin database import full`,
+    reproducing the graph TupleInsertionVisitor creates.
+
+    Tuple and PoR nodes are identified by their rui. Temporal, Code and data nodes are shared between tuples, so they
+    are spilled to hash-partitioned bucket files and deduplicated one bucket at a time on close(), keeping memory
+    bounded by the size of a bucket rather than of the stream. A small LRU cache of recently spilled shared nodes
+    keeps the buckets from filling up with repeats.
+
+    Like the MATCH clauses of the insertion queries, relationships to ruis missing from the export cannot be
+    created, so the import should be run with --skip-bad-relationships, which command() includes.
+    """
+
+    def __init__(self, directory, part_size: int = 1_000_000, hub_buckets: int = 64, cache_size: int = 100_000,
+                 blob_store=None, encoding: Encoding = string_encoding):
+        """
+        Initializes an AdminImportWriter instance, creating its directory if needed.
+
+        Args:
+            directory: The directory the CSV files are written to.
+            part_size (int): The maximum number of rows per part file.
+            hub_buckets (int): The number of bucket files shared nodes are spilled to before deduplication.
+            cache_size (int): The number of recently spilled shared nodes remembered to skip repeats.
+            blob_store (BlobStore | None): The blob store for large NtoDE payloads, if any.
+            encoding (Encoding): The encoding of the values written to the files.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.part_size = part_size
+        self.blob_store = blob_store
+        self.encoding = encoding
+        self.cache_size = cache_size
+        self.recent = OrderedDict()
+        self.nodes = {}
+        self.relationships = PartWriter(self.directory, relationships_file, relationship_header, part_size)
+        self.spill_directory = self.directory / "spill"
+        self.spill_directory.mkdir(exist_ok=True)
+        self.spill_files = [open(self.spill_directory / f"bucket{idx:03d}.csv", 'w', newline='') for idx in range(hub_buckets)]
+        self.spill_writers = [csv.writer(file) for file in self.spill_files]
+        self.closed = False
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def node_writer(self, name: str) -> PartWriter:
+        if name not in self.nodes:
+            self.nodes[name] = PartWriter(self.directory, name, node_headers[name], self.part_size)
+        return self.nodes[name]
+
+    def relate(self, start: str, end: str, relationship: RelationshipLabels, position: int | None = None):
+        row = [start, end, relationship.value, None, None]
+        if relationship == RelationshipLabels.replacement:
+            row[3] = position
+        elif relationship == RelationshipLabels.p_list:
+            row[4] = position
+        self.relationships.write(row)
+
+    def spill(self, name: str, node_id: str, row: list):
+        """Queues a shared node for deduplication, unless it was spilled recently"""
+        if node_id in self.recent:
+            self.recent.move_to_end(node_id)
+            return
+        self.recent[node_id] = None
+        if len(self.recent) > self.cache_size:
+            self.recent.popitem(last=False)
+        bucket = zlib.crc32(node_id.encode()) % len(self.spill_writers)
+        self.spill_writers[bucket].writerow([name, node_id] + row)
+
+    def write(self, tup: RtTuple):
+        """Writes the nodes and relationships of a tuple"""
+        tuple_type = tup.tuple_type
+        row = tuple_to_row(tup, self.blob_store, self.encoding)
+        rui = row["rui"]
+        label = NodeLabels(tuple_type.value)
+        self.node_writer(tuple_type.value).write(
+            [rui] + [row[prop] for prop in tuple_node_properties[tuple_type]] + [node_labels(label, NodeLabels.RtNode)])
+
+        match tuple_type:
+            case TupleType.AN:
+                self.node_writer(NodeLabels.NPoR.value).write([row["ruin"], row["ruin"], node_labels(NodeLabels.NPoR, NodeLabels.RtNode)])
+                self.relate(rui, row["ruin"], RelationshipLabels.ruin)
+            case TupleType.AR:
+                self.node_writer(NodeLabels.RPoR.value).write([row["ruir"], row["ruir"], node_labels(NodeLabels.RPoR, NodeLabels.RtNode)])
+                self.relate(rui, row["ruir"], RelationshipLabels.ruir)
+            case TupleType.NtoC:
+                node_id = code_id(row["ruics"], row["code"])
+                self.spill(code_file, node_id, [row["ruics"], row["code"]])
+                self.relate(rui, node_id, RelationshipLabels.code)
+            case TupleType.NtoDE:
+                node_id = data_id(row["ruidt"], row["sha256"])
+                # Empty payloads and payloads moved to the blob store both spill as empty fields, so a flag tells them apart
+                self.spill(data_file, node_id, [row["ruidt"], row["sha256"], byte_array(row["data"]), row["data"] is not None])
+                self.relate(rui, node_id, RelationshipLabels.data)
+
+        for relationship in tuple_node_references[tuple_type]:
+            self.relate(rui, row[relationship.value], relationship)
+        if tuple_type in tuple_list_references:
+            relationship = tuple_list_references[tuple_type]
+            for position, target in enumerate(row[relationship.value]):
+                self.relate(rui, target, relationship, position)
+        if tuple_type in tuple_temporal_references:
+            relationship = tuple_temporal_references[tuple_type]
+            node_id = temporal_id(row[relationship.value])
+            self.spill(temporal_file, node_id, [row[relationship.value]])
+            self.relate(rui, node_id, relationship)
+        self.count += 1
+
+    def write_all(self, tuples: Iterable[RtTuple]) -> int:
+        """Writes every tuple of an iterable and returns how many were written"""
+        for tup in tuples:
+            self.write(tup)
+        return self.count
+
+    def close(self):
+        """Writes the deduplicated shared nodes, closes every file and removes the spill buckets"""
+        if self.closed:
+            return
+        self.closed = True
+        for file in self.spill_files:
+            file.close()
+        for file in self.spill_files:
+            with open(file.name, newline='') as bucket:
+                seen = set()
+                for name, node_id, *row in csv.reader(bucket):
+                    if node_id in seen:
+                        continue
+                    seen.add(node_id)
+                    self.write_shared_node(name, node_id, row)
+        shutil.rmtree(self.spill_directory)
+        for writer in self.nodes.values():
+            writer.close()
+        self.relationships.close()
+
+    def write_shared_node(self, name: str, node_id: str, row: list):
+        if name == temporal_file:
+            self.node_writer(name).write([node_id, row[0], node_labels(NodeLabels.Temporal, NodeLabels.RtNode)])
+        elif name == code_file:
+            ruics, code = row
+            self.node_writer(name).write([node_id, ruics, code, NodeLabels.Code.value])
+            self.relate(node_id, ruics, RelationshipLabels.ruics)
+        elif name == data_file:
+            # Payloads moved to the blob store are left unset, while empty payloads are written as empty arrays
+            ruidt, digest, data, stored = row
+            self.node_writer(name).write([node_id, ruidt, digest, data if stored == "True" else None, NodeLabels.Data.value])
+            self.relate(node_id, ruidt, RelationshipLabels.ruidt)
+
+    def command(self, database: str = "neo4j") -> list[str]:
+        """Returns the neo4j-admin command importing the written files into a database"""
+        args = ["neo4j-admin", "database", "import", "full", database, "--overwrite-destination",
+                "--skip-bad-relationships", "--multiline-fields=true"]
+        for writer in self.nodes.values():
+            args.append(f"--nodes={','.join(str(path) for path in writer.paths)}")
+        args.append(f"--relationships={','.join(str(path) for path in self.relationships.paths)}")
+        return args
+
+def export_admin_import(tuples: Iterable[RtTuple], directory, part_size: int = 1_000_000, blob_store=None) -> AdminImportWriter:
+    """
+    Writes a stream of tuples as neo4j-admin import CSV files.
+
+    Args:
+        tuples (Iterable[RtTuple]): The tuples to be exported.
+        directory: The directory the CSV files are written to.
+        part_size (int): The maximum number of rows per part file.
+        blob_store (BlobStore | None): The blob store for large NtoDE payloads, if any.
+
+    Returns:
+        AdminImportWriter: The closed writer, whose command() imports the files.
+    """
+    with AdminImportWriter(directory, part_size, blob_store=blob_store) as writer:
+        writer.write_all(tuples)
+    return writer
@@ -0,0 +1,151 @@
+from rt_core_v2.ids_codes.rui import Rui
+from rt_core_v2.rttuple import RtTuple
+from neo4j import AsyncGraphDatabase
+from rt2_neo4j.queries import TupleInsertionVisitor, batched, tuple_lookup_query, tuples_lookup_query, tuple_constructors, record_to_rttuple
+from rt2_neo4j.bulk import batch_levels, group_rows, insertion_order, unwind_insertion_queries
+from rt2_neo4j.blobs import BlobStore
+from rt2_neo4j.encoding import Encoding, string_encoding
+from rt2_neo4j.retry import RetryPolicy, RetryMetrics
+from rt2_neo4j.metrics import instrumented, record_summary, record_size
+from typing import Iterable
+import asyncio
+
+class AsyncTupleInsertionVisitor(TupleInsertionVisitor):
+    """
+    Visitor running the insertion queries of TupleInsertionVisitor on the async neo4j driver.
+    The visit_* functions return the coroutine of the async transaction's run, which is awaited here;
+    their latency and errors are recorded when that coroutine completes.
+    """
+
+    async def visit(self, host: RtTuple):
+        """
+        Visits a tuple and inserts it in a transaction of its own.
+
+        Args:
+            host (RtTuple): The tuple to be visited.
+
+        """
+        async with self.driver.session() as session:
+            async with await session.begin_transaction() as tx:
+                return await self.insert(host, tx)
+
+    async def insert(self, host: RtTuple, tx):
+        """
+        Generates the Cypher query for a tuple and runs it in an async transaction owned by the caller.
+
+        Args:
+            host (RtTuple): The tuple to be inserted.
+            tx: The async transaction the query is run in.
+
+        """
+        result = await super().insert(host, tx)
+        record_summary(await result.consume(), "save_tuple")
+        return result
+
+@instrumented("insert_batch")
+async def insert_batch_async(tuples, tx, blob_store=None, encoding: Encoding = string_encoding):
+    """
+    Inserts a batch of tuples in an async transaction using one UNWIND statement per tuple type present in each
+    level of the batch, as insert_batch does.
+
+    Args:
+        tuples: The tuples to be inserted.
+        tx: The async transaction the statements are run in.
+        blob_store (BlobStore | None): The blob store for large NtoDE payloads, if any.
+        encoding (Encoding): The encoding of the values written to the database.
+    """
+    for level in batch_levels(tuples):
+        rows = group_rows(level, blob_store, encoding)
+        for tuple_type in insertion_order:
+            if tuple_type in rows:
+                operation = f"insert_{tuple_type.value}"
+                record_size("rt2_neo4j_batch_rows", len(rows[tuple_type]), operation)
+                result = await tx.run(unwind_insertion_queries[tuple_type], rows=rows[tuple_type])
+                record_summary(await result.consume(), operation)
+
+class AsyncNeo4jRtStore:
+    """
+    Asyncio counterpart of Neo4jRtStore built on the async neo4j driver.
+    Every operation holds a slot of a semaphore while it talks to the database, bounding the number of
+    concurrent transactions regardless of how many tasks use the store.
+    Writes run as managed transactions retried by retry_policy, as in Neo4jRtStore.
+    """
+
+    def __init__(self, uri, auth, config={}, blob_store: BlobStore | None = None,
+                 max_connection_pool_size: int | None = None, connection_acquisition_timeout: float | None = None,
+                 max_concurrency: int = 64, batch_size: int = 1000, compact_ruis: bool = False,
+                 retry_policy: RetryPolicy | None = None):
+        config = dict(config)
+        if max_connection_pool_size is not None:
+            config["max_connection_pool_size"] = max_connection_pool_size
+        if connection_acquisition_timeout is not None:
+            config["connection_acquisition_timeout"] = connection_acquisition_timeout
+        self.driver = AsyncGraphDatabase.driver(uri, auth=auth, **config)
+        self.blob_store = blob_store
+        self.encoding = Encoding(compact_ruis)
+        self.batch_size = batch_size
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.insertion_visitor = AsyncTupleInsertionVisitor(self.driver, blob_store, self.encoding)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.shut_down()
+
+    @instrumented("save_tuple")
+    async def save_tuple(self, tup: RtTuple):
+        async with self.semaphore:
+            async with self.driver.session() as session:
+                await self.retry_policy.execute_write_async(session, lambda tx: self.insertion_visitor.insert(tup, tx))
+
+    @instrumented("save_tuples")
+    async def save_tuples(self, tuples: Iterable[RtTuple], batch_size: int | None = None) -> int:
+        """
+        Saves tuples in batches of batch_size, with one transaction and one statement per tuple type per level of a batch.
+        Tuples may reference tuples of the same batch in any order, but references to tuples of later batches are
+        dropped, so the stream must be ordered.
+        """
+        count = 0
+        for batch in batched(tuples, batch_size or self.batch_size):
+            async with self.semaphore:
+                async with self.driver.session() as session:
+                    await self.retry_policy.write_async(
+                        session, lambda tx, rows: insert_batch_async(rows, tx, self.blob_store, self.encoding), batch)
+            count += len(batch)
+        return count
+
+    @instrumented("get_tuple")
+    async def get_tuple(self, rui: Rui) -> RtTuple:
+        async with self.semaphore:
+            async with self.driver.session() as session:
+                async with await session.begin_transaction() as tx:
+                    result = await tx.run(tuple_lookup_query, rui=self.encoding.rui(rui))
+                    record = await result.single()
+        if not record:
+            raise ValueError(f"No node found for Rui: {rui}")
+        return record_to_rttuple(record, self.blob_store)
+
+    @instrumented("get_tuples")
+    async def get_tuples(self, ruis: Iterable[Rui], batch_size: int | None = None) -> dict[Rui, RtTuple | None]:
+        """Retrieves many tuples with one query per batch of ruis, mapping ruis without a tuple to None"""
+        retrieved = {}
+        for batch in batched(ruis, batch_size or self.batch_size):
+            requested = {self.encoding.rui(rui): rui for rui in batch}
+            async with self.semaphore:
+                async with self.driver.session() as session:
+                    async with await session.begin_transaction() as tx:
+                        result = await tx.run(tuples_lookup_query, ruis=list(requested), tuple_labels=list(tuple_constructors))
+                        found = {record["properties"]["rui"]: record_to_rttuple(record, self.blob_store)
+                                 async for record in result}
+            for rui_str, rui in requested.items():
+                retrieved[rui] = found.get(rui_str)
+        return retrieved
+
+    def retry_stats(self) -> RetryMetrics:
+        """Returns the attempt, retry, split and lock contention counters of the store's writes"""
+        return self.retry_policy.stats()
+
+    async def shut_down(self):
+        await self.driver.close()
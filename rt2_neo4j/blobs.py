@@ -0,0 +1,59 @@
+from pathlib import Path
+import os
+import tempfile
+
+class BlobStore:
+    """
+    Local content-addressed directory holding the NtoDE payloads too large to be stored on their data node.
+    Payloads are stored under their SHA-256 hex digest, split into a two character fan-out directory.
+
+    Attributes:
+        directory (Path): The root directory of the blob store.
+        threshold (int): Payloads larger than this many bytes are stored as blobs.
+    """
+
+    def __init__(self, directory, threshold: int = 1 << 20):
+        """
+        Initializes a BlobStore instance, creating its directory if needed.
+
+        Args:
+            directory: The root directory of the blob store.
+            threshold (int): Payloads larger than this many bytes are stored as blobs.
+        """
+        self.directory = Path(directory)
+        self.threshold = threshold
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def accepts(self, data: bytes) -> bool:
+        """Returns whether a payload is large enough to be stored as a blob"""
+        return len(data) > self.threshold
+
+    def path(self, digest: str) -> Path:
+        """Returns the path of the blob with a given digest"""
+        return self.directory / digest[:2] / digest
+
+    def put(self, digest: str, data: bytes):
+        """
+        Stores a payload under its digest. Payloads already present are not rewritten.
+        The payload is written to a temporary file first, so concurrent writers never expose a partial blob.
+
+        Args:
+            digest (str): The SHA-256 hex digest of the payload.
+            data (bytes): The payload.
+        """
+        path = self.path(digest)
+        if path.exists():
+            return
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, digest: str) -> bytes:
+        """Returns the payload stored under a digest"""
+        return self.path(digest).read_bytes()
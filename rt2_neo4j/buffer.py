@@ -0,0 +1,204 @@
+from rt2_neo4j.retry import PartialWriteError
+from typing import Callable
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class WriteFailure:
+    """
+    A tuple the write-behind buffer could not write.
+
+    Attributes:
+        tup (RtTuple): The tuple that was not written.
+        error (Exception): The error raised while writing it on its own.
+    """
+
+    def __init__(self, tup, error: Exception):
+        self.tup = tup
+        self.error = error
+
+    def __repr__(self):
+        return f"WriteFailure({self.tup!r}, {self.error!r})"
+
+class WriteBehindBuffer:
+    """
+    Bounded in-memory queue of tuples written in batches by a background thread.
+
+    A batch is written once batch_size tuples are queued or flush_interval seconds have passed since its first tuple.
+    put() blocks while the queue is full, applying backpressure to producers. When a batch fails, its tuples are
+    retried one by one so that failures are reported per tuple rather than per batch.
+
+    Attributes:
+        failures (list[WriteFailure]): The tuples that could not be written, in the order they failed.
+    """
+
+    _flush = object()
+    _stop = object()
+
+    def __init__(self, write_batch: Callable[[list], object], max_size: int = 10000, batch_size: int = 1000,
+                 flush_interval: float = 1.0, on_error: Callable[[WriteFailure], object] | None = None):
+        """
+        Initializes a WriteBehindBuffer instance and starts its flushing thread.
+
+        Args:
+            write_batch (Callable[[list], object]): Writes a list of tuples, raising if the write fails.
+            max_size (int): The maximum number of queued tuples before put() blocks.
+            batch_size (int): The maximum number of tuples written per batch.
+            flush_interval (float): The maximum number of seconds a queued tuple waits for its batch to fill up.
+            on_error (Callable[[WriteFailure], object] | None): Called from the flushing thread for each failed tuple;
+                errors it raises are logged and ignored.
+        """
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_error = on_error
+        self.failures = []
+        self.queue = queue.Queue(maxsize=max_size)
+        self.closed = False
+        self.lock = threading.Lock()
+        # Guards closed and counts the callers enqueueing, so that close() queues its stop entry after theirs
+        self.producing = threading.Condition()
+        self.producers = 0
+        self.thread = threading.Thread(target=self.run, name="rt2-neo4j-write-behind", daemon=True)
+        self.thread.start()
+
+    def put(self, tup, timeout: float | None = None):
+        """
+        Queues a tuple, blocking while the buffer is full.
+
+        Args:
+            tup (RtTuple): The tuple to be written.
+            timeout (float | None): The maximum number of seconds to wait for room, forever if None.
+
+        Raises:
+            queue.Full: If there was no room before the timeout.
+            RuntimeError: If the buffer is closed.
+        """
+        if not self.admit():
+            raise RuntimeError("Write-behind buffer is closed")
+        try:
+            self.queue.put(tup, timeout=timeout)
+        finally:
+            self.release()
+
+    def flush(self):
+        """Blocks until every tuple queued before the call has been written or reported as failed"""
+        if not self.admit():
+            return
+        try:
+            self.queue.put(self._flush)
+        finally:
+            self.release()
+        self.queue.join()
+
+    def close(self):
+        """Writes the queued tuples and stops the flushing thread"""
+        with self.producing:
+            if self.closed:
+                return
+            self.closed = True
+            # Callers already enqueueing finish first, so nothing is queued after the stop entry
+            while self.producers:
+                self.producing.wait()
+        self.queue.put(self._stop)
+        self.thread.join()
+
+    def admit(self) -> bool:
+        """Registers a caller about to enqueue, returning False if the buffer is closed"""
+        with self.producing:
+            if self.closed:
+                return False
+            self.producers += 1
+            return True
+
+    def release(self):
+        with self.producing:
+            self.producers -= 1
+            if not self.producers:
+                self.producing.notify_all()
+
+    def take_failures(self) -> list[WriteFailure]:
+        """Returns and forgets the failures reported so far"""
+        with self.lock:
+            failures, self.failures = self.failures, []
+        return failures
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            entry = self.queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            taken = 1
+            while True:
+                if entry is self._stop:
+                    stopping = True
+                    break
+                if entry is self._flush:
+                    break
+                batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                taken += 1
+            try:
+                if stopping:
+                    batch.extend(self.drain())
+                self.write(batch)
+            finally:
+                # flush() and close() wait on the queue, so entries are marked done even if writing blew up
+                for _ in range(taken):
+                    self.queue.task_done()
+
+    def drain(self) -> list:
+        """Removes every tuple left in the queue once the buffer is stopping"""
+        drained = []
+        while True:
+            try:
+                entry = self.queue.get_nowait()
+            except queue.Empty:
+                return drained
+            if entry is not self._flush and entry is not self._stop:
+                drained.append(entry)
+            self.queue.task_done()
+
+    def write(self, batch: list):
+        """
+        Writes a batch in chunks of batch_size, falling back to one tuple at a time when a chunk fails.
+        When part of a chunk was committed before it failed, only the remaining tuples are written again.
+        """
+        for start in range(0, len(batch), self.batch_size):
+            chunk = batch[start:start + self.batch_size]
+            try:
+                self.write_batch(chunk)
+            except PartialWriteError as partial:
+                self.write_each(partial.remaining)
+            except Exception:
+                self.write_each(chunk)
+
+    def write_each(self, tuples: list):
+        """Writes tuples one at a time, reporting each one that fails"""
+        for tup in tuples:
+            try:
+                self.write_batch([tup])
+            except Exception as error:
+                self.report(WriteFailure(tup, error))
+
+    def report(self, failure: WriteFailure):
+        with self.lock:
+            self.failures.append(failure)
+        if self.on_error is not None:
+            try:
+                self.on_error(failure)
+            except Exception:
+                # An error in the callback must not stop the flushing thread
+                logger.exception("on_error callback failed for %r", failure)
@@ -0,0 +1,380 @@
+from rt_core_v2.rttuple import RtTuple, TupleType, TupleComponents, AttributesVisitor
+from rt2_neo4j.queries import NodeLabels, RelationshipLabels, pop_key, batched, encode_data
+from rt2_neo4j.encoding import Encoding, string_encoding
+from rt2_neo4j.retry import RetryPolicy, PartialWriteError
+from rt2_neo4j.ordering import DependencyOrderer
+from rt2_neo4j.metrics import instrumented, record_summary, record_size
+from collections import OrderedDict
+from typing import Iterable
+import threading
+
+"""
+Order in which the tuple types of a level of a batch are written (see batch_levels).
+Tuples that create the nodes other tuples point at (PoR nodes, referenced tuples) go first.
+"""
+insertion_order = [
+    TupleType.AN,
+    TupleType.AR,
+    TupleType.NtoN,
+    TupleType.NtoR,
+    TupleType.NtoC,
+    TupleType.NtoDE,
+    TupleType.NtoLackR,
+    TupleType.F,
+    TupleType.DI,
+    TupleType.DC,
+]
+
+"""
+UNWIND statements used for batched insertion, one per tuple type.
+Each statement creates the same nodes and relationships as the corresponding TupleInsertionVisitor.visit_* function,
+with every row of $rows holding the attributes of one tuple.
+"""
+unwind_insertion_queries = {
+    TupleType.AN: f"""
+        UNWIND $rows AS row
+        CREATE (an:{NodeLabels.AN.value}:{NodeLabels.RtNode.value} {{rui: row.rui, ar: row.ar, unique: row.unique}})
+        CREATE (npor:{NodeLabels.NPoR.value}:{NodeLabels.RtNode.value} {{rui: row.ruin}})
+        CREATE (an)-[:{RelationshipLabels.ruin.value}]->(npor)
+        """,
+    TupleType.AR: f"""
+        UNWIND $rows AS row
+        CREATE (ar:{NodeLabels.AR.value}:{NodeLabels.RtNode.value} {{rui: row.rui, ar: row.ar, unique: row.unique, ruio: row.ruio}})
+        CREATE (rpor:{NodeLabels.RPoR.value}:{NodeLabels.RtNode.value} {{rui: row.ruir}})
+        CREATE (ar)-[:{RelationshipLabels.ruir.value}]->(rpor)
+        """,
+    TupleType.DI: f"""
+        UNWIND $rows AS row
+        CREATE (di:{NodeLabels.DI.value}:{NodeLabels.RtNode.value} {{rui: row.rui, t: row.t, event_reason: row.event_reason, ruia: row.ruia}})
+
+        WITH di, row
+        MATCH (ruit:{NodeLabels.RtNode.value} {{rui: row.ruit}})
+        CREATE (di)-[:{RelationshipLabels.ruit.value}]->(ruit)
+
+        WITH di, row
+        MATCH (ruid:{NodeLabels.RtNode.value} {{rui: row.ruid}})
+        CREATE (di)-[:{RelationshipLabels.ruid.value}]->(ruid)
+
+        WITH di, row
+        MATCH (ruia:{NodeLabels.RtNode.value} {{rui: row.ruia}})
+        CREATE (di)-[:{RelationshipLabels.ruia.value}]->(ruia)
+
+        WITH di, row
+        MERGE (ta:{NodeLabels.Temporal.value}:{NodeLabels.RtNode.value} {{rui: row.ta}})
+        CREATE (di)-[:{RelationshipLabels.ta.value}]->(ta)
+        """,
+    TupleType.DC: f"""
+        UNWIND $rows AS row
+        CREATE (dc:{NodeLabels.DC.value}:{NodeLabels.RtNode.value} {{rui: row.rui, t: row.t, event_reason: row.event_reason, event: row.event}})
+
+        WITH dc, row
+        MATCH (ruit:{NodeLabels.RtNode.value} {{rui: row.ruit}})
+        CREATE (dc)-[:{RelationshipLabels.ruit.value}]->(ruit)
+
+        WITH dc, row
+        MATCH (ruid:{NodeLabels.RtNode.value} {{rui: row.ruid}})
+        CREATE (dc)-[:{RelationshipLabels.ruid.value}]->(ruid)
+
+        WITH dc, row
+        UNWIND range(0, size(row.replacements) - 1) AS idx
+        MATCH (replacement:{NodeLabels.RtNode.value} {{rui: row.replacements[idx]}})
+        CREATE (dc)-[:{RelationshipLabels.replacement.value} {{replacements: idx}}]->(replacement)
+        """,
+    TupleType.F: f"""
+        UNWIND $rows AS row
+        MATCH (tup:{NodeLabels.RtNode.value} {{rui: row.ruitn}})
+        CREATE (f:{NodeLabels.F.value}:{NodeLabels.RtNode.value} {{rui: row.rui, C: row.C}})
+        CREATE (f)-[:{RelationshipLabels.ruitn.value}]->(tup)
+        """,
+    TupleType.NtoN: f"""
+        UNWIND $rows AS row
+        CREATE (nton:{NodeLabels.NtoN.value}:{NodeLabels.RtNode.value} {{rui: row.rui, polarity: row.polarity}})
+
+        WITH nton, row
+        MATCH (r:{NodeLabels.RtNode.value} {{rui: row.r}})
+        CREATE (nton)-[:{RelationshipLabels.r.value}]->(r)
+
+        WITH nton, row
+        MERGE (tr:{NodeLabels.Temporal.value}:{NodeLabels.RtNode.value} {{rui: row.tr}})
+        CREATE (nton)-[:{RelationshipLabels.tr.value}]->(tr)
+
+        WITH nton, row
+        UNWIND range(0, size(row.p) - 1) AS idx
+        MATCH (ruip:{NodeLabels.RtNode.value} {{rui: row.p[idx]}})
+        CREATE (nton)-[:{RelationshipLabels.p_list.value} {{p: idx}}]->(ruip)
+        """,
+    TupleType.NtoR: f"""
+        UNWIND $rows AS row
+        CREATE (ntor:{NodeLabels.NtoR.value}:{NodeLabels.RtNode.value} {{rui: row.rui, polarity: row.polarity}})
+
+        WITH ntor, row
+        MATCH (ruin:{NodeLabels.RtNode.value} {{rui: row.ruin}})
+        CREATE (ntor)-[:{RelationshipLabels.ruin.value}]->(ruin)
+
+        WITH ntor, row
+        MATCH (ruir:{NodeLabels.RtNode.value} {{rui: row.ruir}})
+        CREATE (ntor)-[:{RelationshipLabels.ruir.value}]->(ruir)
+
+        WITH ntor, row
+        MATCH (r:{NodeLabels.RtNode.value} {{rui: row.r}})
+        CREATE (ntor)-[:{RelationshipLabels.r.value}]->(r)
+
+        WITH ntor, row
+        MERGE (tr:{NodeLabels.Temporal.value}:{NodeLabels.RtNode.value} {{rui: row.tr}})
+        CREATE (ntor)-[:{RelationshipLabels.tr.value}]->(tr)
+        """,
+    TupleType.NtoC: f"""
+        UNWIND $rows AS row
+        CREATE (ntoc:{NodeLabels.NtoC.value}:{NodeLabels.RtNode.value} {{rui: row.rui, polarity: row.polarity}})
+
+        WITH ntoc, row
+        MATCH (r:{NodeLabels.RtNode.value} {{rui: row.r}})
+        CREATE (ntoc)-[:{RelationshipLabels.r.value}]->(r)
+
+        WITH ntoc, row
+        MATCH (ruin:{NodeLabels.RtNode.value} {{rui: row.ruin}})
+        CREATE (ntoc)-[:{RelationshipLabels.ruin.value}]->(ruin)
+
+        WITH ntoc, row
+        MATCH (ruics:{NodeLabels.RtNode.value} {{rui: row.ruics}})
+        MERGE (code_node:{NodeLabels.Code.value} {{ruics: row.ruics, code: row.code}})
+        MERGE (code_node)-[:{RelationshipLabels.ruics.value}]->(ruics)
+        CREATE (ntoc)-[:{RelationshipLabels.code.value}]->(code_node)
+
+        WITH ntoc, row
+        MERGE (tr:{NodeLabels.Temporal.value}:{NodeLabels.RtNode.value} {{rui: row.tr}})
+        CREATE (ntoc)-[:{RelationshipLabels.tr.value}]->(tr)
+        """,
+    TupleType.NtoDE: f"""
+        UNWIND $rows AS row
+        CREATE (ntode:{NodeLabels.NtoDE.value}:{NodeLabels.RtNode.value} {{rui: row.rui, polarity: row.polarity}})
+
+        WITH ntode, row
+        MATCH (ruin:{NodeLabels.RtNode.value} {{rui: row.ruin}})
+        CREATE (ntode)-[:{RelationshipLabels.ruin.value}]->(ruin)
+
+        WITH ntode, row
+        MATCH (ruidt:{NodeLabels.RtNode.value} {{rui: row.ruidt}})
+        MERGE (data_node:{NodeLabels.Data.value} {{ruidt: row.ruidt, sha256: row.sha256}})
+        ON CREATE SET data_node.data = row.data
+        MERGE (data_node)-[:{RelationshipLabels.ruidt.value}]->(ruidt)
+        CREATE (ntode)-[:{RelationshipLabels.data.value}]->(data_node)
+        """,
+    TupleType.NtoLackR: f"""
+        UNWIND $rows AS row
+        CREATE (ntolackr:{NodeLabels.NtoLackR.value}:{NodeLabels.RtNode.value} {{rui: row.rui}})
+
+        WITH ntolackr, row
+        MATCH (ruin:{NodeLabels.RtNode.value} {{rui: row.ruin}})
+        CREATE (ntolackr)-[:{RelationshipLabels.ruin.value}]->(ruin)
+
+        WITH ntolackr, row
+        MATCH (ruir:{NodeLabels.RtNode.value} {{rui: row.ruir}})
+        CREATE (ntolackr)-[:{RelationshipLabels.ruir.value}]->(ruir)
+
+        WITH ntolackr, row
+        MATCH (r:{NodeLabels.RtNode.value} {{rui: row.r}})
+        CREATE (ntolackr)-[:{RelationshipLabels.r.value}]->(r)
+
+        WITH ntolackr, row
+        MERGE (tr:{NodeLabels.Temporal.value}:{NodeLabels.RtNode.value} {{rui: row.tr}})
+        CREATE (ntolackr)-[:{RelationshipLabels.tr.value}]->(tr)
+        """,
+}
+
+"""Components naming the temporal node each tuple type's insertion statement MERGEs"""
+temporal_components = {
+    TupleType.DI: TupleComponents.ta.value,
+    TupleType.NtoN: TupleComponents.tr.value,
+    TupleType.NtoR: TupleComponents.tr.value,
+    TupleType.NtoC: TupleComponents.tr.value,
+    TupleType.NtoLackR: TupleComponents.tr.value,
+}
+
+def match_temporal(query: str, component: str) -> str:
+    """Replaces the MERGE of a statement's temporal node by a MATCH on the temporal rui constraint"""
+    merge = f"MERGE ({component}:{NodeLabels.Temporal.value}:{NodeLabels.RtNode.value} {{rui: row.{component}}})"
+    if merge not in query:
+        raise ValueError(f"Statement does not merge its {component} temporal node")
+    return query.replace(merge, f"MATCH ({component}:{NodeLabels.Temporal.value} {{rui: row.{component}}})")
+
+"""
+UNWIND statements used when temporal nodes are created ahead of the batch by TemporalHubs.
+Matching an existing temporal node skips the lock a MERGE takes to check that the node does not exist yet.
+Creating the ta or tr relationship still locks both of its endpoints, so writers attaching tuples to a popular
+temporal node still contend for it, only no longer for its uniqueness check.
+"""
+hub_insertion_queries = {
+    tuple_type: match_temporal(query, temporal_components[tuple_type]) if tuple_type in temporal_components else query
+    for tuple_type, query in unwind_insertion_queries.items()
+}
+
+"""Creates the temporal nodes of a batch that do not exist yet, one MERGE per distinct temporal rui"""
+temporal_merge_query = f"""
+    UNWIND $ruis AS rui
+    MERGE (:{NodeLabels.Temporal.value}:{NodeLabels.RtNode.value} {{rui: rui}})
+"""
+
+class TemporalHubs:
+    """
+    Creates the temporal nodes of each batch before its tuples, remembering in an LRU set the temporal ruis
+    known to exist so that their nodes are not merged again.
+    Temporal nodes must not be deleted while a store using TemporalHubs is running: the insertion statements
+    match them, and a tuple whose temporal node is missing would be written without its relationships.
+
+    Attributes:
+        max_size (int): The maximum number of temporal ruis remembered.
+    """
+
+    def __init__(self, max_size: int = 100_000):
+        self.max_size = max_size
+        self.known = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.known)
+
+    def missing(self, ruis: set[str]) -> list[str]:
+        """Returns the temporal ruis not known to exist, in sorted order so that writers lock them in the same order"""
+        with self.lock:
+            missing = []
+            for rui in ruis:
+                if rui in self.known:
+                    self.known.move_to_end(rui)
+                else:
+                    missing.append(rui)
+        return sorted(missing)
+
+    def remember(self, ruis: Iterable[str]):
+        """Records temporal ruis whose nodes were committed"""
+        with self.lock:
+            for rui in ruis:
+                self.known[rui] = None
+                self.known.move_to_end(rui)
+            while len(self.known) > self.max_size:
+                self.known.popitem(last=False)
+
+    def prepare(self, rows: dict[TupleType, list[dict]], tx) -> list[str]:
+        """
+        Merges the temporal nodes of a batch's rows that are not known to exist, in the batch's transaction.
+        The returned ruis must be passed to remember() once the transaction is committed.
+        """
+        ruis = {row[component] for tuple_type, component in temporal_components.items()
+                for row in rows.get(tuple_type, ()) if row.get(component) is not None}
+        missing = self.missing(ruis)
+        if missing:
+            tx.run(temporal_merge_query, ruis=missing).consume()
+        return missing
+
+get_attr = AttributesVisitor()
+
+def tuple_to_row(tup: RtTuple, blob_store=None, encoding: Encoding = string_encoding) -> dict:
+    """
+    Converts a tuple to the parameter row used by its UNWIND insertion statement.
+    Values are converted the same way TupleInsertionVisitor converts them, with list-valued
+    components (DC replacements, NtoN p) converted entry by entry.
+
+    Args:
+        tup (RtTuple): The tuple to be converted.
+        blob_store (BlobStore | None): The blob store for large NtoDE payloads, if any.
+        encoding (Encoding): The encoding of the values written to the database.
+
+    Returns:
+        dict: The neo4j representation of the tuple's attributes.
+    """
+    attributes = tup.accept(get_attr)
+    pop_key(attributes, TupleComponents.type.value)
+    row = {key: encoding.value(value) for key, value in attributes.items()}
+    if tup.tuple_type == TupleType.NtoDE:
+        row.update(encode_data(tup.data, blob_store))
+    return row
+
+def group_rows(tuples, blob_store=None, encoding: Encoding = string_encoding) -> dict[TupleType, list[dict]]:
+    """Groups the parameter rows of a collection of tuples by tuple type"""
+    rows = {}
+    for tup in tuples:
+        rows.setdefault(tup.tuple_type, []).append(tuple_to_row(tup, blob_store, encoding))
+    return rows
+
+def batch_levels(tuples: list[RtTuple]) -> list[list[RtTuple]]:
+    """
+    Splits a batch into levels whose tuples only reference nodes created by earlier levels or outside the batch.
+    Every reference of an insertion statement is a MATCH that silently drops the row's relationship if the node
+    does not exist yet, so type order alone is not enough: an F may point at a DI of the same batch, or a DI at a DC.
+    References outside the batch are expected to exist already.
+
+    Raises:
+        ValueError: If tuples of the batch reference themselves or each other in a cycle.
+    """
+    orderer = DependencyOrderer(exists=lambda ruis: ruis)
+    levels = orderer.order(tuples)
+    if orderer.pending:
+        raise ValueError(f"Tuples {[str(tup.rui) for tup in orderer.pending]} reference each other in a cycle")
+    return levels
+
+@instrumented("insert_batch")
+def insert_batch(tuples, tx, blob_store=None, encoding: Encoding = string_encoding,
+                 temporal_hubs: TemporalHubs | None = None) -> list[str]:
+    """
+    Inserts a batch of tuples using one UNWIND statement per tuple type present in each level of the batch,
+    so that tuples referencing other tuples of the batch are written after them.
+
+    Args:
+        tuples: The tuples to be inserted.
+        tx: The transaction the statements are run in.
+        blob_store (BlobStore | None): The blob store for large NtoDE payloads, if any.
+        encoding (Encoding): The encoding of the values written to the database.
+        temporal_hubs (TemporalHubs | None): Creates the batch's temporal nodes ahead of its tuples, if given.
+
+    Returns:
+        list[str]: The temporal ruis whose nodes were merged, to be remembered by temporal_hubs after the commit.
+    """
+    queries = unwind_insertion_queries if temporal_hubs is None else hub_insertion_queries
+    merged = []
+    for level in batch_levels(tuples):
+        rows = group_rows(level, blob_store, encoding)
+        if temporal_hubs is not None:
+            merged.extend(temporal_hubs.prepare(rows, tx))
+        for tuple_type in insertion_order:
+            if tuple_type in rows:
+                operation = f"insert_{tuple_type.value}"
+                record_size("rt2_neo4j_batch_rows", len(rows[tuple_type]), operation)
+                record_summary(tx.run(queries[tuple_type], rows=rows[tuple_type]).consume(), operation)
+    return merged
+
+def insert_batches(tuples, driver, batch_size: int = 1000, blob_store=None, encoding: Encoding = string_encoding,
+                   retry_policy: RetryPolicy | None = None, temporal_hubs: TemporalHubs | None = None) -> int:
+    """
+    Inserts tuples in batches, committing each batch in its own managed transaction.
+    Transient errors are retried by the retry policy, which splits batches that keep failing; if a part of a split
+    batch fails, the PartialWriteError raised tells its committed tuples from the remaining ones.
+
+    Args:
+        tuples: An iterable of tuples to be inserted.
+        driver: The Neo4j database driver.
+        batch_size (int): The maximum number of tuples written per transaction.
+        blob_store (BlobStore | None): The blob store for large NtoDE payloads, if any.
+        encoding (Encoding): The encoding of the values written to the database.
+        retry_policy (RetryPolicy | None): The policy retrying failed transactions, a default RetryPolicy if None.
+        temporal_hubs (TemporalHubs | None): Creates each batch's temporal nodes ahead of its tuples, if given.
+
+    Returns:
+        int: The number of tuples written.
+    """
+    retry_policy = retry_policy or RetryPolicy()
+    count = 0
+    with driver.session() as session:
+        for batch in batched(tuples, batch_size):
+            try:
+                merged = retry_policy.write(session, lambda tx, rows: insert_batch(rows, tx, blob_store, encoding, temporal_hubs), batch)
+            except PartialWriteError as partial:
+                # The temporal nodes of the committed parts exist even though the batch failed
+                if temporal_hubs is not None:
+                    for ruis in partial.results:
+                        temporal_hubs.remember(ruis)
+                raise
+            if temporal_hubs is not None:
+                for ruis in merged:
+                    temporal_hubs.remember(ruis)
+            count += len(batch)
+    return count
@@ -0,0 +1,125 @@
+from collections import OrderedDict
+from typing import Callable, Iterable
+import threading
+import time
+
+class CacheStats:
+    """
+    Counters of a TupleCache.
+
+    Attributes:
+        hits (int): The lookups answered by the cache.
+        misses (int): The lookups that had to go to the database, including expired entries.
+        evictions (int): The entries dropped to stay within max_size.
+        expirations (int): The entries dropped because they outlived the ttl.
+        size (int): The number of cached tuples.
+    """
+
+    def __init__(self, hits: int = 0, misses: int = 0, evictions: int = 0, expirations: int = 0, size: int = 0):
+        self.hits = hits
+        self.misses = misses
+        self.evictions = evictions
+        self.expirations = expirations
+        self.size = size
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __repr__(self):
+        return (f"CacheStats(hits={self.hits}, misses={self.misses}, evictions={self.evictions}, "
+                f"expirations={self.expirations}, size={self.size})")
+
+class TupleCache:
+    """
+    Thread-safe bounded LRU cache of tuples keyed by Rui, with an optional time to live.
+    Tuples are immutable once written, so entries never need to be invalidated by later writes;
+    the ttl only bounds how long a tuple removed from the database behind the store's back stays visible.
+    """
+
+    def __init__(self, max_size: int = 100_000, ttl: float | None = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Initializes a TupleCache instance.
+
+        Args:
+            max_size (int): The maximum number of cached tuples, beyond which the least recently used are evicted.
+            ttl (float | None): The number of seconds a tuple stays cached, forever if None.
+            clock (Callable[[], float]): The clock entries expire by.
+        """
+        if max_size < 1:
+            raise ValueError("Cache size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = CacheStats()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, rui, now: float):
+        # Must be called with the lock held
+        entry = self.entries.get(rui)
+        if entry is None:
+            self.counters.misses += 1
+            return None
+        tup, expires = entry
+        if expires is not None and expires <= now:
+            del self.entries[rui]
+            self.counters.expirations += 1
+            self.counters.misses += 1
+            return None
+        self.entries.move_to_end(rui)
+        self.counters.hits += 1
+        return tup
+
+    def get(self, rui):
+        """Returns the cached tuple of a Rui, or None"""
+        with self.lock:
+            return self.lookup(rui, self.clock())
+
+    def get_many(self, ruis: Iterable) -> tuple[dict, list]:
+        """Returns the cached tuples of some ruis keyed by Rui, and the ruis that are not cached"""
+        found = {}
+        missing = []
+        with self.lock:
+            now = self.clock()
+            for rui in ruis:
+                tup = self.lookup(rui, now)
+                if tup is None:
+                    missing.append(rui)
+                else:
+                    found[rui] = tup
+        return found, missing
+
+    def put(self, tup):
+        """Caches a tuple under its Rui"""
+        self.put_many([tup])
+
+    def put_many(self, tuples: Iterable):
+        """Caches tuples under their Rui, evicting the least recently used beyond max_size"""
+        with self.lock:
+            expires = None if self.ttl is None else self.clock() + self.ttl
+            for tup in tuples:
+                self.entries[tup.rui] = (tup, expires)
+                self.entries.move_to_end(tup.rui)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.counters.evictions += 1
+
+    def invalidate(self, rui):
+        """Drops the cached tuple of a Rui, if any"""
+        with self.lock:
+            self.entries.pop(rui, None)
+
+    def clear(self):
+        """Drops every cached tuple"""
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> CacheStats:
+        """Returns a snapshot of the cache's counters"""
+        with self.lock:
+            return CacheStats(self.counters.hits, self.counters.misses, self.counters.evictions,
+                              self.counters.expirations, len(self.entries))
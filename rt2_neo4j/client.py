@@ -2,41 +2,344 @@ from rt_core_v2.ids_codes.rui import Rui
 from rt_core_v2.rttuple import RtTuple, RtTupleVisitor, TupleType, TupleComponents
 from rt_core_v2.persist.rts_store import RtStore
 from neo4j import GraphDatabase
-from rt2_neo4j.queries import TupleInsertionVisitor, tuple_query
+from rt2_neo4j.queries import TupleInsertionVisitor, batched, tuple_query, tuples_query, referent_query, author_page_query, author_count_query, designator_query, existing_ruis_query, type_page_query, tuple_constructors
+from rt2_neo4j.bulk import insert_batches, insert_batch, TemporalHubs
+from rt2_neo4j.schema import ensure_schema, migrate_shared_label, migrate_designator_keys, merge_duplicate_designators, migrate_author_keys, migrate_data_nodes, migrate_timestamps, migrate_encoding
+from rt2_neo4j.blobs import BlobStore
+from rt2_neo4j.encoding import Encoding
+from rt2_neo4j.cache import TupleCache, CacheStats
+from rt2_neo4j.retry import RetryPolicy, RetryMetrics, PartialWriteError
+from rt2_neo4j.metrics import instrumented, record_result
+from rt2_neo4j.buffer import WriteBehindBuffer, WriteFailure
+from rt2_neo4j.ordering import DependencyOrderer, IngestReport
+from rt2_neo4j.export import export_jsonl, export_parquet
+from rt2_neo4j.rt_query import RtQuery, QueryPlan, iter_query, explain, profile
+from typing import Iterable, Iterator, Callable
+from contextlib import contextmanager
+import threading
 
 class Neo4jRtStore(RtStore):
+    """
+    RtStore backed by a Neo4j database.
 
-    def __init__(self, uri, auth, config={}):
+    The store owns session and transaction lifetimes and is safe to share between threads: the driver's
+    connection pool is shared, while sessions and pending unit-of-work writes belong to the calling thread.
+    In autocommit mode every save is written immediately. Otherwise, and inside unit_of_work(), saved tuples
+    are held by the calling thread until commit() writes them in a single transaction.
+    In write-behind mode, autocommitted saves are queued and written in batches by a background thread instead;
+    commit() and shut_down() wait for the queue to drain and write_failures() reports the tuples that failed.
+    With compact_ruis, ruis are stored in their 22 character compact form; reads decode either form.
+    With cache_size, get_tuple and get_tuples are served from an LRU cache of up to cache_size tuples, filled by
+    reads and by successful writes; tuples are immutable once written, so the cache is never stale.
+    Writes run as managed transactions retried by retry_policy on deadlocks and other transient errors;
+    batches that keep failing are split, except the unit of work written by commit().
+    With temporal_hubs, the temporal nodes of each batch are created ahead of its tuples and the temporal ruis known
+    to exist are remembered, so that tuples match popular temporal nodes instead of merging them; every save is
+    then written as a batch.
+    """
+
+    def __init__(self, uri, auth, config={}, blob_store: BlobStore | None = None,
+                 max_connection_pool_size: int | None = None, connection_acquisition_timeout: float | None = None,
+                 autocommit: bool = True, batch_size: int = 1000,
+                 write_behind: bool = False, write_behind_size: int = 10000, flush_interval: float = 1.0,
+                 on_write_error: Callable[[WriteFailure], object] | None = None, compact_ruis: bool = False,
+                 cache_size: int | None = None, cache_ttl: float | None = None, retry_policy: RetryPolicy | None = None,
+                 temporal_hubs: bool = False, temporal_cache_size: int = 100_000):
+        config = dict(config)
+        if max_connection_pool_size is not None:
+            config["max_connection_pool_size"] = max_connection_pool_size
+        if connection_acquisition_timeout is not None:
+            config["connection_acquisition_timeout"] = connection_acquisition_timeout
         self.driver = GraphDatabase.driver(uri, auth=auth, **config)
-        self.insertion_visitor = TupleInsertionVisitor(self.driver)
+        self.blob_store = blob_store
+        self.encoding = Encoding(compact_ruis)
+        self.autocommit = autocommit
+        self.batch_size = batch_size
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.temporal_hubs = TemporalHubs(temporal_cache_size) if temporal_hubs else None
+        self.insertion_visitor = TupleInsertionVisitor(self.driver, blob_store, self.encoding)
+        self.local = threading.local()
+        self.cache = TupleCache(cache_size, cache_ttl) if cache_size else None
+        self.buffer = None
+        if write_behind:
+            self.buffer = WriteBehindBuffer(self.write_batch, write_behind_size, batch_size, flush_interval, on_write_error)
+
+    def pending(self) -> list[RtTuple]:
+        """Returns the tuples saved by the calling thread that are waiting for commit()"""
+        if not hasattr(self.local, "pending"):
+            self.local.pending = []
+        return self.local.pending
+
+    def deferred(self) -> bool:
+        """Returns whether saves made by the calling thread wait for commit()"""
+        return not self.autocommit or getattr(self.local, "unit_depth", 0) > 0
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Groups the tuples saved by the calling thread into one transaction.
+        The transaction is committed when the block exits normally and the pending tuples are discarded otherwise.
+        Nested blocks join the outermost one.
+        """
+        self.local.unit_depth = getattr(self.local, "unit_depth", 0) + 1
+        try:
+            yield self
+        except BaseException:
+            if self.local.unit_depth == 1:
+                self.rollback()
+            raise
+        else:
+            if self.local.unit_depth == 1:
+                self.commit()
+        finally:
+            self.local.unit_depth -= 1
+
+    def ensure_schema(self, migrate: bool = False):
+        """
+        Creates the constraints and indexes the store's queries rely on. Safe to call on every start-up.
+        Databases written before the shared RtNode label, the Code/data designator keys, the DI author keys, the
+        content-addressed data nodes and native values existed must be migrated once with migrate=True,
+        as must databases switching between canonical and compact ruis, or holding duplicate Code or data nodes.
+        """
+        if migrate:
+            migrate_shared_label(self.driver)
+            migrate_designator_keys(self.driver)
+            migrate_author_keys(self.driver)
+            migrate_data_nodes(self.driver, self.blob_store)
+            migrate_timestamps(self.driver)
+            migrate_encoding(self.driver, self.encoding)
+            merge_duplicate_designators(self.driver)
+        ensure_schema(self.driver)
+
+    def insert_tuples(self, tx, tuples: list[RtTuple]) -> list[str]:
+        merged = []
+        for batch in batched(tuples, self.batch_size):
+            merged.extend(insert_batch(batch, tx, self.blob_store, self.encoding, self.temporal_hubs))
+        return merged
+
+    def write_batch(self, tuples: list[RtTuple], split: bool = True):
+        """
+        Writes a list of tuples in a single transaction, retried on transient errors.
+        Unless split is False, a list that keeps failing is split and its halves are written in separate transactions;
+        if a half fails after others were committed, PartialWriteError tells the committed tuples from the remaining ones.
+        """
+        tuples = list(tuples)
+        try:
+            with self.driver.session() as session:
+                merged = self.retry_policy.write(session, self.insert_tuples, tuples, split)
+        except PartialWriteError as partial:
+            self.written(partial.committed, partial.results)
+            raise
+        self.written(tuples, merged)
+
+    def written(self, tuples: list[RtTuple], merged: list[list[str]]):
+        """Records committed tuples in the cache and the temporal ruis their transactions merged"""
+        if self.temporal_hubs is not None:
+            for ruis in merged:
+                self.temporal_hubs.remember(ruis)
+        if self.cache is not None:
+            self.cache.put_many(tuples)
 
+    def write_failures(self) -> list[WriteFailure]:
+        """Returns and forgets the tuples the write-behind buffer failed to write so far"""
+        return self.buffer.take_failures() if self.buffer else []
+
+    @instrumented("save_tuple")
     def save_tuple(self, tup: RtTuple) -> bool:
-        tup.accept(self.insertion_visitor)
+        if self.deferred():
+            self.pending().append(tup)
+            return
+        if self.buffer:
+            self.buffer.put(tup)
+            return
+        if self.temporal_hubs is not None:
+            self.write_batch([tup])
+            return
+        with self.driver.session() as session:
+            self.retry_policy.execute_write(session, lambda tx: record_result(self.insertion_visitor.insert(tup, tx), "save_tuple"))
+        if self.cache is not None:
+            self.cache.put(tup)
+
+    @instrumented("save_tuples")
+    def save_tuples(self, tuples: Iterable[RtTuple], batch_size: int | None = None) -> int:
+        """
+        Saves tuples in batches of batch_size, with one transaction and one statement per tuple type per level of a batch.
+        Tuples may reference tuples of the same batch in any order, but references to tuples of later batches are
+        dropped; use ingest() for streams that are not ordered.
+        """
+        if self.deferred():
+            pending = self.pending()
+            count = len(pending)
+            pending.extend(tuples)
+            return len(pending) - count
+        if self.buffer:
+            count = 0
+            for tup in tuples:
+                self.buffer.put(tup)
+                count += 1
+            return count
+        if self.cache is not None or self.temporal_hubs is not None:
+            count = 0
+            for batch in batched(tuples, batch_size or self.batch_size):
+                self.write_batch(batch)
+                count += len(batch)
+            return count
+        return insert_batches(tuples, self.driver, batch_size or self.batch_size, self.blob_store, self.encoding, self.retry_policy)
+
+    def ingest(self, tuples: Iterable[RtTuple], window_size: int = 10000, batch_size: int | None = None,
+               max_pending: int | None = None) -> IngestReport:
+        """
+        Writes a stream of tuples in any order, making sure every tuple is written after the nodes it references.
+        The stream is ordered a window at a time by a DependencyOrderer and each dependency level is written in
+        batches of batch_size. Tuples whose references are neither in the stream nor in the database are not
+        written and are returned in the report instead.
+
+        Args:
+            tuples (Iterable[RtTuple]): The tuples to be written.
+            window_size (int): The number of tuples ordered at a time.
+            batch_size (int | None): The maximum number of tuples per transaction, the store's batch_size if None.
+            max_pending (int | None): The maximum number of tuples waiting for their references, unbounded if None.
 
+        Returns:
+            IngestReport: The number of tuples and batches written and the unresolved tuples.
+        """
+        orderer = DependencyOrderer(exists=lambda ruis: existing_ruis_query(ruis, self.driver, encoding=self.encoding), max_pending=max_pending)
+        report = IngestReport()
+        for level in orderer.stream(tuples, window_size):
+            for batch in batched(level, batch_size or self.batch_size):
+                self.write_batch(batch)
+                report.written += len(batch)
+                report.batches += 1
+        report.unresolved = orderer.unresolved
+        return report
+
+    @instrumented("get_tuple")
     def get_tuple(self, rui: Rui) -> RtTuple:
-        return tuple_query(rui, self.driver)
+        if self.cache is not None:
+            tup = self.cache.get(rui)
+            if tup is not None:
+                return tup
+        tup = tuple_query(rui, self.driver, self.blob_store, self.encoding)
+        if self.cache is not None and tup is not None:
+            self.cache.put(tup)
+        return tup
+
+    @instrumented("get_tuples")
+    def get_tuples(self, ruis: Iterable[Rui], batch_size: int = 1000) -> dict[Rui, RtTuple | None]:
+        """Retrieves many tuples with one query per batch of ruis, mapping ruis without a tuple to None"""
+        if self.cache is None:
+            return tuples_query(ruis, self.driver, batch_size, self.blob_store, self.encoding)
+        found, missing = self.cache.get_many(ruis)
+        fetched = tuples_query(missing, self.driver, batch_size, self.blob_store, self.encoding)
+        self.cache.put_many(tup for tup in fetched.values() if tup is not None)
+        found.update(fetched)
+        return found
+
+    def retry_stats(self) -> RetryMetrics:
+        """Returns the attempt, retry, split and lock contention counters of the store's writes"""
+        return self.retry_policy.stats()
+
+    def cache_stats(self) -> CacheStats | None:
+        """Returns the hit, miss and eviction counters of the tuple cache, or None without a cache"""
+        return self.cache.stats() if self.cache is not None else None
 
     def get_by_referent(self, rui: Rui) -> set[RtTuple]:
-        pass
+        return set(referent_query(rui, self.driver, self.blob_store, self.encoding))
 
-    def get_by_author(self, rui: Rui) -> Rui:
-        pass
+    def iter_by_referent(self, rui: Rui) -> Iterator[RtTuple]:
+        """Streams the tuples referring to a referent instead of collecting them into a set"""
+        return referent_query(rui, self.driver, self.blob_store, self.encoding)
+
+    def get_by_author(self, rui: Rui) -> set[RtTuple]:
+        return set(self.iter_by_author(rui))
+
+    def iter_by_author(self, rui: Rui, page_size: int = 1000) -> Iterator[RtTuple]:
+        """Streams the DI tuples of an author and the tuples they register, one page at a time"""
+        cursor = None
+        while True:
+            page, cursor = author_page_query(rui, self.driver, cursor, page_size, self.blob_store, self.encoding)
+            yield from page
+            if cursor is None:
+                return
+
+    def page_by_author(self, rui: Rui, after: Rui | None = None, page_size: int = 1000) -> tuple[list[RtTuple], Rui | None]:
+        """Retrieves one page of the DI tuples of an author and the tuples they register, with the cursor of the next page"""
+        return author_page_query(rui, self.driver, after, page_size, self.blob_store, self.encoding)
+
+    def count_by_author(self, rui: Rui) -> int:
+        """Counts the DI tuples of an author without retrieving them"""
+        return author_count_query(rui, self.driver, self.encoding)
+
+    def iter_tuples(self, types: Iterable[TupleType] | None = None, chunk_size: int = 1000) -> Iterator[RtTuple]:
+        """
+        Streams every tuple of the store, or of the given types, type by type in rui order.
+        Tuples are retrieved one page of chunk_size at a time, so the store need not fit in memory.
+        """
+        for tuple_type in types or [TupleType(label) for label in tuple_constructors]:
+            cursor = None
+            while True:
+                page, cursor = type_page_query(tuple_type, self.driver, cursor, chunk_size, self.blob_store, self.encoding)
+                yield from page
+                if cursor is None:
+                    break
+
+    def export_jsonl(self, path, types: Iterable[TupleType] | None = None, chunk_size: int = 1000) -> int:
+        """Writes every tuple of the store, or of the given types, to a JSON Lines file and returns how many were written"""
+        return export_jsonl(self.iter_tuples(types, chunk_size), path)
+
+    def export_parquet(self, path, types: Iterable[TupleType] | None = None, chunk_size: int = 1000) -> int:
+        """Writes every tuple of the store, or of the given types, to a Parquet file and returns how many were written"""
+        return export_parquet(self.iter_tuples(types, chunk_size), path, row_group_size=chunk_size)
 
     def get_available_rui(self) -> Rui:
         pass
 
     def get_by_type(self, referentType, designatorType, designatorText) -> set:
-        pass
+        """
+        Retrieves the designation tuples of type referentType (NtoC or NtoDE) whose code or data
+        designatorText has the designator type designatorType
+        """
+        return designator_query(referentType, designatorType, designatorText, self.driver, self.blob_store, self.encoding)
 
-    def run_query(self, query) -> set[RtTuple]:
-        pass
+    def run_query(self, query: RtQuery) -> set[RtTuple]:
+        """Retrieves the tuples matched by an RtQuery"""
+        return set(self.iter_query(query))
+
+    def iter_query(self, query: RtQuery) -> Iterator[RtTuple]:
+        """Streams the tuples matched by an RtQuery, in the query's order"""
+        return iter_query(query, self.driver, self.blob_store, self.encoding)
+
+    def explain(self, query: RtQuery) -> QueryPlan:
+        """Returns the operator tree Neo4j would run an RtQuery with, without running it"""
+        return explain(query, self.driver, self.encoding)
+
+    def profile(self, query: RtQuery) -> QueryPlan:
+        """Runs an RtQuery and returns its operator tree with the rows and db hits of each operator"""
+        return profile(query, self.driver, self.encoding)
 
     def shut_down(self):
+        if self.buffer:
+            self.buffer.close()
+        if self.cache is not None:
+            self.cache.clear()
         self.driver.close()
 
     def commit(self):
-        #TODO Still figure out if I want transactions to be on a per commit or per function call basis
-        pass
+        """
+        Writes the tuples pending in the calling thread in a single transaction, then waits for the
+        write-behind buffer to drain. If the write fails the tuples stay pending, so the commit can be
+        retried or rolled back.
+        """
+        pending = self.pending()
+        if pending:
+            self.write_batch(pending, split=False)
+            pending.clear()
+        if self.buffer:
+            self.buffer.flush()
+
+    def rollback(self):
+        """Discards the tuples pending in the calling thread"""
+        self.pending().clear()
     
     #TODO Remove this function from superclass
     def save_rts_declaration(self, declaration) -> bool:
@@ -1,6 +1,6 @@
 from enum import Enum
 from abc import ABC, abstractmethod
-from functools import reduce
+from functools import lru_cache
 
 class CypherComponent(ABC):
     """
@@ -16,6 +16,15 @@ class CypherComponent(ABC):
         """
         return str(self)
 
+    def get_parameters(self) -> dict:
+        """
+        Returns the parameters referenced by the placeholders of the Cypher component.
+
+        Returns:
+            dict: The parameter values keyed by placeholder name.
+        """
+        return {}
+
 class CypherQuery(ABC):
     """
     Abstract base class representing a Cypher query.
@@ -31,6 +40,27 @@ class CypherQuery(ABC):
         """
         pass
 
+    def get_parameters(self) -> dict:
+        """
+        Returns the parameters to be sent alongside the query string.
+
+        Returns:
+            dict: The parameter values keyed by placeholder name.
+        """
+        return {}
+
+    def run(self, tx):
+        """
+        Runs the query with its parameters in a transaction.
+
+        Args:
+            tx: The transaction the query is run in.
+
+        Returns:
+            The result of the query.
+        """
+        return tx.run(self.get_query(), self.get_parameters())
+
     def __str__(self):
         """
         Returns the string representation of the Cypher query.
@@ -42,7 +72,8 @@ class CypherQuery(ABC):
 
 class CypherNode(CypherComponent):
     """
-    Represents a Cypher node.
+    Represents a Cypher node. Attribute values are sent as parameters named after the node and the attribute,
+    so nodes of the same shape render the same query text whatever their values.
 
     Attributes:
         name (str): The name of the node.
@@ -70,12 +101,21 @@ class CypherNode(CypherComponent):
         Returns:
             str: The Cypher node representation in Cypher query format.
         """
-        node_attributes = dict_to_attributes(self.attributes)
-        return f'({self.name}:{" : ".join(self.labels)} {node_attributes})'
+        return render_node(self.name, tuple(self.labels), tuple(self.attributes))
+
+    def get_parameters(self) -> dict:
+        """
+        Returns the values of the node's attributes keyed by placeholder name.
+
+        Returns:
+            dict: The parameters of the node.
+        """
+        return dict_to_parameters(self.name, self.attributes)
 
 class CypherRelationship(CypherComponent):
     """
-    Represents a Cypher relationship.
+    Represents a Cypher relationship. Attribute values are sent as parameters named after the
+    relationship's nodes, labels and attribute.
 
     Attributes:
         start_node (CypherNode): The start node of the relationship.
@@ -106,8 +146,16 @@ class CypherRelationship(CypherComponent):
         Returns:
             str: The Cypher relationship representation in Cypher query format.
         """
-        edge_attributes = dict_to_attributes(self.attributes)
-        return f'({self.start_node.name})-[:{":".join(self.labels)} {edge_attributes}]->({self.end_node.name})'
+        return render_relationship(self.start_node.name, self.end_node.name, tuple(self.labels), tuple(self.attributes))
+
+    def get_parameters(self) -> dict:
+        """
+        Returns the values of the relationship's attributes keyed by placeholder name.
+
+        Returns:
+            dict: The parameters of the relationship.
+        """
+        return dict_to_parameters(relationship_prefix(self.start_node.name, self.end_node.name, tuple(self.labels)), self.attributes)
 
 class CypherOperation(Enum):
     """
@@ -141,7 +189,25 @@ class CompoundQuery(CypherQuery):
         Returns:
             str: Combined Cypher query string.
         """
-        return reduce(lambda x, y: f"{x}\n{y}", self.queries, "")
+        return "\n".join(query.get_query() for query in self.queries)
+
+    def get_parameters(self) -> dict:
+        """
+        Combines the parameters of the queries.
+
+        Returns:
+            dict: The parameters of every query.
+
+        Raises:
+            ValueError: If two queries give the same placeholder different values.
+        """
+        parameters = {}
+        for query in self.queries:
+            for key, value in query.get_parameters().items():
+                if key in parameters and parameters[key] != value:
+                    raise ValueError(f"Conflicting values for query parameter {key}")
+                parameters[key] = value
+        return parameters
 
 class AtomicEntityQuery(CypherQuery):
     """
@@ -172,17 +238,64 @@ class AtomicEntityQuery(CypherQuery):
         """
         return f"{self.operation} {self.component}"
 
-def dict_to_attributes(dct):
+    def get_parameters(self) -> dict:
+        """
+        Returns the parameters of the queried component.
+
+        Returns:
+            dict: The parameters of the component.
+        """
+        return self.component.get_parameters()
+
+def dict_to_attributes(prefix, keys):
     """
-    Converts a dictionary of attributes to a Cypher attributes string.
+    Converts attribute names to a Cypher attributes string of parameter placeholders.
 
     Args:
-        dct (dict): Dictionary of attributes.
+        prefix (str): The prefix of the placeholder names.
+        keys (Iterable[str]): The names of the attributes.
 
     Returns:
         str: The Cypher attributes string.
     """
-    return f'{{{", ".join([f"{key}:{value}" for key, value in dct.items()])}}}'
+    return f'{{{", ".join([f"{key}: ${prefix}_{key}" for key in keys])}}}'
+
+def dict_to_parameters(prefix, dct):
+    """
+    Converts a dictionary of attributes to the parameters referenced by dict_to_attributes.
+
+    Args:
+        prefix (str): The prefix of the placeholder names.
+        dct (dict): Dictionary of attributes.
+
+    Returns:
+        dict: The attribute values keyed by placeholder name.
+    """
+    return {f"{prefix}_{key}": value for key, value in dct.items()}
+
+def relationship_prefix(start_name, end_name, labels):
+    return f'{start_name}_{end_name}_{"_".join(labels)}'
+
+@lru_cache(maxsize=4096)
+def render_node(name, labels, keys):
+    """
+    Renders the template of a node, memoized per name, labels and attribute names.
+
+    Returns:
+        str: The Cypher node representation in Cypher query format.
+    """
+    return f'({name}:{" : ".join(labels)} {dict_to_attributes(name, keys)})'
+
+@lru_cache(maxsize=4096)
+def render_relationship(start_name, end_name, labels, keys):
+    """
+    Renders the template of a relationship, memoized per node names, labels and attribute names.
+
+    Returns:
+        str: The Cypher relationship representation in Cypher query format.
+    """
+    edge_attributes = dict_to_attributes(relationship_prefix(start_name, end_name, labels), keys)
+    return f'({start_name})-[:{":".join(labels)} {edge_attributes}]->({end_name})'
 
 def query_node(operation, name, labels, attributes):
     """
@@ -0,0 +1,55 @@
+from rt_core_v2.ids_codes.rui import Rui
+from datetime import datetime
+from enum import Enum
+import base64
+import uuid
+
+"""Length of a rui in its canonical 36 character form and in its compact form"""
+canonical_rui_length = 36
+compact_rui_length = 22
+
+def compact_rui(rui) -> str:
+    """
+    Encodes a rui as the unpadded URL-safe base64 of its 16 bytes.
+    The compact form stays a string, so rui indexes, equality lookups and keyset pagination work unchanged.
+    """
+    return base64.urlsafe_b64encode(uuid.UUID(str(rui)).bytes).decode()[:compact_rui_length]
+
+def expand_rui(x: str) -> uuid.UUID:
+    """Decodes a rui stored in either its canonical or its compact form"""
+    if len(x) == compact_rui_length:
+        return uuid.UUID(bytes=base64.urlsafe_b64decode(x + "=="))
+    return uuid.UUID(x)
+
+class Encoding:
+    """
+    Converts tuple components to the values stored in Neo4j.
+    Numbers, booleans, timestamps and payloads are stored natively, enums by value and ruis as strings,
+    either canonical or compact. Temporal references and other components are stored as their string form,
+    so temporal nodes keep their string keys.
+
+    Attributes:
+        compact_ruis (bool): Whether ruis are stored in their compact 22 character form.
+    """
+
+    def __init__(self, compact_ruis: bool = False):
+        self.compact_ruis = compact_ruis
+
+    def rui(self, rui) -> str:
+        """Encodes a Rui, or the canonical string of one"""
+        return compact_rui(rui) if self.compact_ruis else str(rui)
+
+    def value(self, attribute):
+        """Encodes a tuple component, entry by entry for lists"""
+        if attribute is None or isinstance(attribute, (bool, int, float, datetime, bytes)):
+            return attribute
+        if isinstance(attribute, Rui):
+            return self.rui(attribute)
+        if isinstance(attribute, Enum):
+            return attribute.value
+        if isinstance(attribute, list):
+            return [self.value(entry) for entry in attribute]
+        return str(attribute)
+
+"""Encoding of databases written with canonical ruis, the default"""
+string_encoding = Encoding()
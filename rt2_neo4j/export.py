@@ -0,0 +1,115 @@
+from rt_core_v2.rttuple import RtTuple, TupleComponents, AttributesVisitor
+from rt2_neo4j.queries import tuple_decoders, batched
+from rt2_neo4j.encoding import string_encoding
+from typing import Iterable, Iterator
+from datetime import datetime
+import base64
+import json
+
+"""Components holding a list of ruis, stored as list columns in Parquet files"""
+list_components = [TupleComponents.replacements.value, TupleComponents.p_list.value]
+
+get_attr = AttributesVisitor()
+
+def tuple_to_record(tup: RtTuple) -> dict:
+    """
+    Converts a tuple to a flat record of its type and its components in their neo4j representation,
+    so that record_to_tuple can rebuild it with the same converters used when reading from the store.
+    NtoDE payloads are kept as bytes, without the digest and payload metric of the bulk insertion rows.
+    """
+    attributes = tup.accept(get_attr)
+    record = {key: string_encoding.value(value) for key, value in attributes.items()}
+    record[TupleComponents.type.value] = tup.tuple_type.value
+    for key, value in record.items():
+        if isinstance(value, datetime):
+            record[key] = value.isoformat()
+    return record
+
+def record_to_tuple(record: dict) -> RtTuple:
+    """Rebuilds a tuple from a record produced by tuple_to_record"""
+    attributes = dict(record)
+    label = attributes.pop(TupleComponents.type.value)
+    return tuple_decoders[label](attributes)
+
+def export_jsonl(tuples: Iterable[RtTuple], path) -> int:
+    """
+    Writes tuples to a JSON Lines file, one record per line, with NtoDE payloads base64 encoded.
+
+    Args:
+        tuples (Iterable[RtTuple]): The tuples to be written.
+        path: The path of the file.
+
+    Returns:
+        int: The number of tuples written.
+    """
+    count = 0
+    with open(path, 'w') as file:
+        for tup in tuples:
+            record = tuple_to_record(tup)
+            if isinstance(record.get(TupleComponents.data.value), bytes):
+                record[TupleComponents.data.value] = base64.b64encode(record[TupleComponents.data.value]).decode()
+            file.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+def read_jsonl(path) -> Iterator[RtTuple]:
+    """Lazily reads the tuples of a JSON Lines file written by export_jsonl"""
+    with open(path) as file:
+        for line in file:
+            # Base64 payloads are decoded by the data converter
+            yield record_to_tuple(json.loads(line))
+
+def parquet_schema():
+    import pyarrow as pa
+    fields = []
+    for component in TupleComponents:
+        if component.value in list_components:
+            fields.append(pa.field(component.value, pa.list_(pa.string())))
+        elif component == TupleComponents.data:
+            fields.append(pa.field(component.value, pa.binary()))
+        else:
+            fields.append(pa.field(component.value, pa.string()))
+    return pa.schema(fields)
+
+def export_parquet(tuples: Iterable[RtTuple], path, row_group_size: int = 10000) -> int:
+    """
+    Writes tuples to a Parquet file with one column per tuple component, one row group at a time.
+    Requires pyarrow.
+
+    Args:
+        tuples (Iterable[RtTuple]): The tuples to be written.
+        path: The path of the file.
+        row_group_size (int): The number of tuples held in memory and written per row group.
+
+    Returns:
+        int: The number of tuples written.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError("export_parquet requires pyarrow") from error
+    schema = parquet_schema()
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in batched(tuples, row_group_size):
+            rows = []
+            for tup in batch:
+                row = {}
+                for key, value in tuple_to_record(tup).items():
+                    if value is None or key in list_components or key == TupleComponents.data.value:
+                        row[key] = value
+                    else:
+                        row[key] = str(value)
+                rows.append(row)
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            count += len(batch)
+    return count
+
+def read_parquet(path) -> Iterator[RtTuple]:
+    """Lazily reads the tuples of a Parquet file written by export_parquet, one row group at a time"""
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(path)
+    for group in range(parquet_file.num_row_groups):
+        for row in parquet_file.read_row_group(group).to_pylist():
+            yield record_to_tuple({key: value for key, value in row.items() if value is not None})
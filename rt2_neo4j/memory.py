@@ -0,0 +1,281 @@
+from rt_core_v2.ids_codes.rui import Rui
+from rt_core_v2.rttuple import RtTuple, TupleType, TupleComponents, AttributesVisitor
+from rt_core_v2.persist.rts_store import RtStore
+from rt2_neo4j.queries import batched, tuple_constructors
+from rt2_neo4j.ordering import DependencyOrderer, IngestReport
+from rt2_neo4j.export import export_jsonl, export_parquet
+from rt2_neo4j.rt_query import RtQuery
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+import hashlib
+import threading
+
+"""
+Components through which a tuple refers to a referent, mirroring referent_lookup_query: the relationships
+pointing at the referent directly, temporal nodes included, and the designator types of the Code and data
+nodes of NtoC and NtoDE tuples
+"""
+referent_components = [
+    TupleComponents.ruin, TupleComponents.ruir, TupleComponents.ruia, TupleComponents.ruid, TupleComponents.ruit,
+    TupleComponents.replacements, TupleComponents.ruitn, TupleComponents.r, TupleComponents.p_list,
+    TupleComponents.ta, TupleComponents.tr, TupleComponents.ruics, TupleComponents.ruidt,
+]
+
+get_attr = AttributesVisitor()
+
+def designator_key(tup: RtTuple) -> tuple[str, str] | None:
+    """Returns the designator type and text a designation tuple is looked up by, as designator_query does"""
+    if tup.tuple_type == TupleType.NtoC:
+        return str(tup.ruics), tup.code
+    if tup.tuple_type == TupleType.NtoDE:
+        return str(tup.ruidt), hashlib.sha256(tup.data).hexdigest()
+    return None
+
+class InMemoryRtStore(RtStore):
+    """
+    RtStore holding tuples in process memory, with the same query methods as Neo4jRtStore.
+
+    Tuples are indexed in dicts and sets keyed by the string of a rui: by their own rui, by type, by every
+    referent they refer to, by author for DI tuples and by designator for NtoC and NtoDE tuples. Every query is
+    answered from an index, so the store serves as a fast backend for unit tests, as an oracle for differential
+    tests against Neo4jRtStore and as a throughput ceiling in benchmarks. Unlike Neo4j, references to tuples and
+    nodes that were never saved are indexed as well.
+    Saves follow Neo4jRtStore: they are applied immediately in autocommit mode, and otherwise, or inside
+    unit_of_work(), held by the calling thread until commit().
+    """
+
+    def __init__(self, autocommit: bool = True):
+        self.autocommit = autocommit
+        self.tuples = {}
+        self.by_type = defaultdict(dict)
+        self.by_referent = defaultdict(set)
+        self.by_author = defaultdict(set)
+        self.by_designator = defaultdict(set)
+        self.nodes = set()
+        self.lock = threading.RLock()
+        self.local = threading.local()
+
+    def __len__(self):
+        return len(self.tuples)
+
+    def pending(self) -> list[RtTuple]:
+        """Returns the tuples saved by the calling thread that are waiting for commit()"""
+        if not hasattr(self.local, "pending"):
+            self.local.pending = []
+        return self.local.pending
+
+    def deferred(self) -> bool:
+        """Returns whether saves made by the calling thread wait for commit()"""
+        return not self.autocommit or getattr(self.local, "unit_depth", 0) > 0
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Groups the tuples saved by the calling thread into one write.
+        The tuples are applied when the block exits normally and discarded otherwise. Nested blocks join the outermost one.
+        """
+        self.local.unit_depth = getattr(self.local, "unit_depth", 0) + 1
+        try:
+            yield self
+        except BaseException:
+            if self.local.unit_depth == 1:
+                self.rollback()
+            raise
+        else:
+            if self.local.unit_depth == 1:
+                self.commit()
+        finally:
+            self.local.unit_depth -= 1
+
+    def index(self, tup: RtTuple):
+        # Must be called with the lock held
+        rui = str(tup.rui)
+        if rui in self.tuples:
+            raise ValueError(f"A tuple with rui {rui} already exists")
+        self.tuples[rui] = tup
+        self.by_type[tup.tuple_type][rui] = tup
+        self.nodes.add(rui)
+        attributes = tup.accept(get_attr)
+        for component in referent_components:
+            value = attributes.get(component.value)
+            for referent in value if isinstance(value, list) else [value]:
+                if referent is not None:
+                    self.by_referent[str(referent)].add(tup)
+        if tup.tuple_type == TupleType.DI:
+            self.by_author[str(tup.ruia)].add(tup)
+        elif tup.tuple_type == TupleType.AN:
+            self.nodes.add(str(tup.ruin))
+        elif tup.tuple_type == TupleType.AR:
+            self.nodes.add(str(tup.ruir))
+        key = designator_key(tup)
+        if key is not None:
+            self.by_designator[key].add(tup)
+
+    def write_batch(self, tuples: list[RtTuple]):
+        """Writes a list of tuples at once, writing none of them if any rui is already taken"""
+        with self.lock:
+            ruis = [str(tup.rui) for tup in tuples]
+            taken = [rui for rui in ruis if rui in self.tuples]
+            if taken or len(set(ruis)) < len(ruis):
+                raise ValueError(f"Tuples with ruis {taken or ruis} already exist")
+            for tup in tuples:
+                self.index(tup)
+
+    def save_tuple(self, tup: RtTuple) -> bool:
+        if self.deferred():
+            self.pending().append(tup)
+            return
+        self.write_batch([tup])
+
+    def save_tuples(self, tuples: Iterable[RtTuple], batch_size: int | None = None) -> int:
+        """Saves tuples and returns how many were saved; batch_size is accepted for compatibility with Neo4jRtStore"""
+        if self.deferred():
+            pending = self.pending()
+            count = len(pending)
+            pending.extend(tuples)
+            return len(pending) - count
+        tuples = list(tuples)
+        self.write_batch(tuples)
+        return len(tuples)
+
+    def ingest(self, tuples: Iterable[RtTuple], window_size: int = 10000, batch_size: int | None = None,
+               max_pending: int | None = None) -> IngestReport:
+        """
+        Writes a stream of tuples in any order with the same dependency ordering as Neo4jRtStore.ingest,
+        so tuples whose references are neither in the stream nor in the store are returned as unresolved.
+        """
+        orderer = DependencyOrderer(exists=self.existing_ruis, max_pending=max_pending)
+        report = IngestReport()
+        for level in orderer.stream(tuples, window_size):
+            for batch in batched(level, batch_size or 1000):
+                self.write_batch(batch)
+                report.written += len(batch)
+                report.batches += 1
+        report.unresolved = orderer.unresolved
+        return report
+
+    def existing_ruis(self, rui_strs) -> set[str]:
+        """Returns the ruis of the given ones that name a saved tuple or a node created by one"""
+        with self.lock:
+            return {rui for rui in rui_strs if rui in self.nodes}
+
+    def get_tuple(self, rui: Rui) -> RtTuple:
+        """Retrieves a tuple, raising ValueError like Neo4jRtStore when the rui names no node or a node that is not a tuple"""
+        tup = self.tuples.get(str(rui))
+        if tup is None:
+            if str(rui) in self.nodes:
+                raise ValueError(f"Rui {rui} does not name a tuple")
+            raise ValueError(f"No node found for Rui: {rui}")
+        return tup
+
+    def get_tuples(self, ruis: Iterable[Rui], batch_size: int = 1000) -> dict[Rui, RtTuple | None]:
+        """Retrieves many tuples, mapping ruis without a tuple to None"""
+        return {rui: self.tuples.get(str(rui)) for rui in ruis}
+
+    def get_by_referent(self, rui: Rui) -> set[RtTuple]:
+        with self.lock:
+            return set(self.by_referent.get(str(rui), ()))
+
+    def iter_by_referent(self, rui: Rui) -> Iterator[RtTuple]:
+        return iter(self.get_by_referent(rui))
+
+    def get_by_author(self, rui: Rui) -> set[RtTuple]:
+        return set(self.iter_by_author(rui))
+
+    def iter_by_author(self, rui: Rui, page_size: int = 1000) -> Iterator[RtTuple]:
+        """Streams the DI tuples of an author and the tuples they register, one page at a time"""
+        cursor = None
+        while True:
+            page, cursor = self.page_by_author(rui, cursor, page_size)
+            yield from page
+            if cursor is None:
+                return
+
+    def page_by_author(self, rui: Rui, after: Rui | None = None, page_size: int = 1000) -> tuple[list[RtTuple], Rui | None]:
+        """Retrieves one page of the DI tuples of an author, in rui order, each followed by the tuple it registers"""
+        with self.lock:
+            dis = sorted(self.by_author.get(str(rui), ()), key=lambda di: str(di.rui))
+        if after is not None:
+            dis = [di for di in dis if str(di.rui) > str(after)]
+        dis = dis[:page_size]
+        page = []
+        for di in dis:
+            page.append(di)
+            registered = self.tuples.get(str(di.ruit))
+            if registered is not None:
+                page.append(registered)
+        cursor = dis[-1].rui if len(dis) == page_size else None
+        return page, cursor
+
+    def count_by_author(self, rui: Rui) -> int:
+        """Counts the DI tuples of an author"""
+        with self.lock:
+            return len(self.by_author.get(str(rui), ()))
+
+    def iter_tuples(self, types: Iterable[TupleType] | None = None, chunk_size: int = 1000) -> Iterator[RtTuple]:
+        """Streams every tuple of the store, or of the given types, type by type in rui order"""
+        for tuple_type in types or [TupleType(label) for label in tuple_constructors]:
+            with self.lock:
+                tuples = sorted(self.by_type.get(tuple_type, {}).items())
+            for _, tup in tuples:
+                yield tup
+
+    def export_jsonl(self, path, types: Iterable[TupleType] | None = None, chunk_size: int = 1000) -> int:
+        """Writes every tuple of the store, or of the given types, to a JSON Lines file and returns how many were written"""
+        return export_jsonl(self.iter_tuples(types, chunk_size), path)
+
+    def export_parquet(self, path, types: Iterable[TupleType] | None = None, chunk_size: int = 1000) -> int:
+        """Writes every tuple of the store, or of the given types, to a Parquet file and returns how many were written"""
+        return export_parquet(self.iter_tuples(types, chunk_size), path, row_group_size=chunk_size)
+
+    def get_available_rui(self) -> Rui:
+        pass
+
+    def get_by_type(self, referentType, designatorType, designatorText) -> set:
+        """
+        Retrieves the designation tuples of type referentType (NtoC or NtoDE) whose code or data
+        designatorText has the designator type designatorType
+        """
+        if referentType == TupleType.NtoC:
+            key = (str(designatorType), designatorText)
+        elif referentType == TupleType.NtoDE:
+            key = (str(designatorType), hashlib.sha256(designatorText).hexdigest())
+        else:
+            raise ValueError(f"Tuples of type {referentType} have no designator")
+        with self.lock:
+            return set(self.by_designator.get(key, ()))
+
+    def run_query(self, query: RtQuery) -> set[RtTuple]:
+        """Retrieves the tuples matched by an RtQuery, evaluated in memory"""
+        return set(self.iter_query(query))
+
+    def iter_query(self, query: RtQuery) -> Iterator[RtTuple]:
+        """Returns the tuples matched by an RtQuery, in the query's order"""
+        with self.lock:
+            tuples = list(self.tuples.values())
+        return iter(query.evaluate(tuples, lambda rui: self.tuples.get(str(rui))))
+
+    def shut_down(self):
+        with self.lock:
+            self.tuples.clear()
+            self.by_type.clear()
+            self.by_referent.clear()
+            self.by_author.clear()
+            self.by_designator.clear()
+            self.nodes.clear()
+
+    def commit(self):
+        """Applies the tuples pending in the calling thread at once; if that fails they stay pending"""
+        pending = self.pending()
+        if pending:
+            self.write_batch(pending)
+            pending.clear()
+
+    def rollback(self):
+        """Discards the tuples pending in the calling thread"""
+        self.pending().clear()
+
+    #TODO Remove this function from superclass
+    def save_rts_declaration(self, declaration) -> bool:
+        pass
@@ -0,0 +1,265 @@
+from bisect import bisect_left
+from typing import Callable
+import functools
+import inspect
+import threading
+import time
+
+"""Upper bounds of the histogram buckets of latencies in seconds, from 10 microseconds to about 10 seconds"""
+seconds_buckets = [0.00001 * 4 ** exponent for exponent in range(11)]
+
+"""Upper bounds of the histogram buckets of sizes in bytes, from 64 bytes to 64 MiB"""
+bytes_buckets = [64 * 4 ** exponent for exponent in range(11)]
+
+"""Upper bounds of the histogram buckets of row counts"""
+rows_buckets = [1, 10, 100, 1000, 10000, 100000]
+
+def buckets_for(name: str) -> list[float]:
+    """Returns the default buckets of a histogram, chosen by the unit suffix of its name"""
+    if name.endswith("_bytes"):
+        return bytes_buckets
+    if name.endswith("_rows"):
+        return rows_buckets
+    return seconds_buckets
+
+class MetricsSink:
+    """
+    Receives the measurements of the instrumented operations. The default sink discards them.
+    Instrumentation checks enabled before measuring anything, so a disabled sink costs one attribute lookup per call.
+
+    Attributes:
+        enabled (bool): Whether measurements should be taken at all.
+    """
+
+    enabled = False
+
+    def observe(self, name: str, value: float, labels: dict | None = None):
+        """Records a sample of a histogram, such as a latency or a payload size"""
+        pass
+
+    def increment(self, name: str, amount: float = 1, labels: dict | None = None):
+        """Adds to a counter, such as the nodes created by a statement"""
+        pass
+
+class CallbackSink(MetricsSink):
+    """Forwards measurements to callbacks, e.g. to feed an existing metrics client"""
+
+    enabled = True
+
+    def __init__(self, observe: Callable[[str, float, dict], object] | None = None,
+                 increment: Callable[[str, float, dict], object] | None = None):
+        self.on_observe = observe
+        self.on_increment = increment
+
+    def observe(self, name: str, value: float, labels: dict | None = None):
+        if self.on_observe is not None:
+            self.on_observe(name, value, labels or {})
+
+    def increment(self, name: str, amount: float = 1, labels: dict | None = None):
+        if self.on_increment is not None:
+            self.on_increment(name, amount, labels or {})
+
+class Histogram:
+    """
+    Cumulative histogram in the style of Prometheus.
+
+    Attributes:
+        buckets (list[float]): The upper bounds of the buckets, in increasing order.
+        counts (list[int]): The number of samples of each bucket, with one more for samples above every bound.
+        sum (float): The sum of the samples.
+        count (int): The number of samples.
+    """
+
+    def __init__(self, buckets: list[float]):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[int]:
+        """Returns the number of samples at or below each bound, ending with the total"""
+        total = 0
+        cumulative = []
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile as the upper bound of the bucket it falls in, inf if above every bound"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, count in zip(self.buckets + [float("inf")], self.cumulative()):
+            if count >= rank:
+                return bound
+        return float("inf")
+
+def label_key(labels: dict | None) -> tuple:
+    return tuple(sorted(labels.items())) if labels else ()
+
+def format_labels(key: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class MetricsRegistry(MetricsSink):
+    """
+    Thread-safe in-process registry of histograms and counters keyed by name and labels,
+    which can be rendered in the Prometheus text exposition format.
+    """
+
+    enabled = True
+
+    def __init__(self, buckets: dict[str, list[float]] | None = None):
+        """
+        Initializes a MetricsRegistry instance.
+
+        Args:
+            buckets (dict[str, list[float]] | None): Histogram buckets by metric name, overriding the defaults.
+        """
+        self.buckets = buckets or {}
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def observe(self, name: str, value: float, labels: dict | None = None):
+        key = (name, label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets.get(name) or buckets_for(name))
+            histogram.observe(value)
+
+    def increment(self, name: str, amount: float = 1, labels: dict | None = None):
+        key = (name, label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def histogram(self, name: str, labels: dict | None = None) -> Histogram | None:
+        """Returns the histogram of a name and labels, or None if nothing was observed"""
+        return self.histograms.get((name, label_key(labels)))
+
+    def counter(self, name: str, labels: dict | None = None) -> float:
+        """Returns the value of the counter of a name and labels"""
+        return self.counters.get((name, label_key(labels)), 0)
+
+    def clear(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def render(self) -> str:
+        """Renders every metric in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            typed = set()
+            for (name, key), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                for bound, count in zip(histogram.buckets + ["+Inf"], histogram.cumulative()):
+                    le = f'le="{bound}"'
+                    lines.append(f"{name}_bucket{format_labels(key, le)} {count}")
+                lines.append(f"{name}_sum{format_labels(key)} {histogram.sum}")
+                lines.append(f"{name}_count{format_labels(key)} {histogram.count}")
+            for (name, key), value in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+"""The sink every instrumented operation reports to"""
+active_sink = MetricsSink()
+
+def set_sink(sink: MetricsSink | None) -> MetricsSink:
+    """Makes a sink receive the measurements of every instrumented operation, or turns them off with None"""
+    global active_sink
+    previous = active_sink
+    active_sink = sink if sink is not None else MetricsSink()
+    return previous
+
+def get_sink() -> MetricsSink:
+    return active_sink
+
+def instrumented(operation: str):
+    """
+    Decorates a function so that its latency is observed in rt2_neo4j_operation_seconds and its errors counted
+    in rt2_neo4j_operation_errors_total, both labelled with the operation. Coroutine functions, and plain functions
+    returning an awaitable such as the visit_* functions on the async driver, are timed until the awaitable completes.
+    """
+    labels = {"operation": operation}
+
+    async def completed(awaitable, sink: MetricsSink, start: float):
+        try:
+            return await awaitable
+        except Exception:
+            sink.increment("rt2_neo4j_operation_errors_total", 1, labels)
+            raise
+        finally:
+            sink.observe("rt2_neo4j_operation_seconds", time.perf_counter() - start, labels)
+
+    def decorator(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                sink = active_sink
+                if not sink.enabled:
+                    return await function(*args, **kwargs)
+                return await completed(function(*args, **kwargs), sink, time.perf_counter())
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            sink = active_sink
+            if not sink.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except Exception:
+                sink.increment("rt2_neo4j_operation_errors_total", 1, labels)
+                sink.observe("rt2_neo4j_operation_seconds", time.perf_counter() - start, labels)
+                raise
+            if inspect.isawaitable(result):
+                return completed(result, sink, start)
+            sink.observe("rt2_neo4j_operation_seconds", time.perf_counter() - start, labels)
+            return result
+        return wrapper
+    return decorator
+
+def record_summary(summary, operation: str):
+    """
+    Records the counters and server timings of a statement's result summary: the nodes, relationships and
+    properties it created or set, and the milliseconds until its first record was available and until it was consumed.
+    """
+    sink = active_sink
+    if not sink.enabled or summary is None:
+        return
+    labels = {"operation": operation}
+    counters = summary.counters
+    sink.increment("rt2_neo4j_nodes_created_total", counters.nodes_created, labels)
+    sink.increment("rt2_neo4j_relationships_created_total", counters.relationships_created, labels)
+    sink.increment("rt2_neo4j_properties_set_total", counters.properties_set, labels)
+    if summary.result_available_after is not None:
+        sink.observe("rt2_neo4j_result_available_after_seconds", summary.result_available_after / 1000, labels)
+    if summary.result_consumed_after is not None:
+        sink.observe("rt2_neo4j_result_consumed_after_seconds", summary.result_consumed_after / 1000, labels)
+
+def record_size(name: str, size: int, operation: str):
+    """Observes a payload size, such as the bytes of an NtoDE payload or the rows of a batch"""
+    sink = active_sink
+    if sink.enabled:
+        sink.observe(name, size, {"operation": operation})
+
+def record_result(result, operation: str):
+    """Consumes a result and records its summary, leaving the result untouched when no sink is enabled"""
+    if active_sink.enabled:
+        record_summary(result.consume(), operation)
@@ -0,0 +1,198 @@
+from rt_core_v2.rttuple import RtTuple, TupleType, TupleComponents, AttributesVisitor
+from collections import OrderedDict
+from typing import Callable, Iterable, Iterator
+
+"""
+Components of each tuple type naming nodes its insertion query MATCHes.
+If such a node does not exist yet the query silently drops the relationship, so it must be written first.
+Temporal, Code and data nodes are MERGEd and never need to exist beforehand.
+"""
+reference_components = {
+    TupleType.AN: [],
+    TupleType.AR: [],
+    TupleType.DI: [TupleComponents.ruit, TupleComponents.ruid, TupleComponents.ruia],
+    TupleType.DC: [TupleComponents.ruit, TupleComponents.ruid, TupleComponents.replacements],
+    TupleType.F: [TupleComponents.ruitn],
+    TupleType.NtoN: [TupleComponents.r, TupleComponents.p_list],
+    TupleType.NtoR: [TupleComponents.ruin, TupleComponents.ruir, TupleComponents.r],
+    TupleType.NtoC: [TupleComponents.r, TupleComponents.ruin, TupleComponents.ruics],
+    TupleType.NtoDE: [TupleComponents.ruin, TupleComponents.ruidt],
+    TupleType.NtoLackR: [TupleComponents.ruin, TupleComponents.ruir, TupleComponents.r],
+}
+
+"""Components of each tuple type naming nodes its insertion query creates, besides the tuple node itself"""
+provided_components = {
+    TupleType.AN: [TupleComponents.ruin],
+    TupleType.AR: [TupleComponents.ruir],
+}
+
+get_attr = AttributesVisitor()
+
+def tuple_references(tup: RtTuple) -> set[str]:
+    """Returns the neo4j ruis of the nodes a tuple's insertion query expects to exist"""
+    attributes = tup.accept(get_attr)
+    references = set()
+    for component in reference_components[tup.tuple_type]:
+        value = attributes.get(component.value)
+        if isinstance(value, list):
+            references.update(str(entry) for entry in value)
+        elif value is not None:
+            references.add(str(value))
+    return references
+
+def tuple_provides(tup: RtTuple) -> set[str]:
+    """Returns the neo4j ruis of the nodes a tuple's insertion query creates"""
+    provided = {str(tup.rui)}
+    for component in provided_components.get(tup.tuple_type, []):
+        provided.add(str(getattr(tup, component.value)))
+    return provided
+
+class DependencyOrderer:
+    """
+    Orders a stream of tuples so that every tuple is written after the nodes it references.
+
+    Tuples are processed a window at a time. Each window, together with the tuples deferred so far, is split into
+    levels by a topological sort of its reference graph: the tuples of a level only reference nodes that already
+    exist or are created by earlier levels, so a level can be written as one batch, or in parallel batches.
+    Tuples whose references cannot be resolved yet stay in a pending pool until a later window provides them.
+
+    Attributes:
+        pending (list[RtTuple]): The tuples waiting for the nodes they reference.
+        unresolved (list[RtTuple]): The tuples given up on, either when the stream ended or when the pool overflowed.
+    """
+
+    def __init__(self, exists: Callable[[set[str]], set[str]] | None = None,
+                 known_limit: int = 1_000_000, max_pending: int | None = None):
+        """
+        Initializes a DependencyOrderer instance.
+
+        Args:
+            exists (Callable[[set[str]], set[str]] | None): Returns which of a set of neo4j ruis already exist
+                in the database, used for references the stream itself does not provide.
+            known_limit (int): The maximum number of ruis remembered as written; older ones are looked up again with exists.
+            max_pending (int | None): The maximum size of the pending pool, unbounded if None.
+        """
+        self.exists = exists
+        self.known_limit = known_limit
+        self.max_pending = max_pending
+        self.known = OrderedDict()
+        self.pending = []
+        self.unresolved = []
+
+    def remember(self, ruis: Iterable[str]):
+        for rui in ruis:
+            self.known[rui] = None
+            self.known.move_to_end(rui)
+        while len(self.known) > self.known_limit:
+            self.known.popitem(last=False)
+
+    def order(self, window: Iterable[RtTuple]) -> list[list[RtTuple]]:
+        """
+        Releases the tuples of a window, and the pending tuples, whose references are resolved.
+
+        Args:
+            window (Iterable[RtTuple]): The next tuples of the stream.
+
+        Returns:
+            list[list[RtTuple]]: The released tuples grouped in levels, to be written in order.
+        """
+        candidates = self.pending + list(window)
+        self.pending = []
+        references = [tuple_references(tup) for tup in candidates]
+        providers = {}
+        for idx, tup in enumerate(candidates):
+            for rui in tuple_provides(tup):
+                providers.setdefault(rui, idx)
+
+        unknown = {rui for refs in references for rui in refs if rui not in self.known and rui not in providers}
+        if unknown and self.exists is not None:
+            self.remember(self.exists(unknown))
+
+        waiting = {}
+        dependents = {}
+        ready = []
+        for idx, refs in enumerate(references):
+            dependencies = set()
+            blocked = False
+            for rui in refs:
+                if rui in self.known:
+                    continue
+                provider = providers.get(rui)
+                if provider is None or provider == idx:
+                    blocked = True
+                    break
+                dependencies.add(provider)
+            if blocked:
+                continue
+            if dependencies:
+                waiting[idx] = len(dependencies)
+                for provider in dependencies:
+                    dependents.setdefault(provider, []).append(idx)
+            else:
+                ready.append(idx)
+
+        levels = []
+        released = set()
+        while ready:
+            levels.append([candidates[idx] for idx in ready])
+            released.update(ready)
+            next_ready = []
+            for idx in ready:
+                self.remember(tuple_provides(candidates[idx]))
+                for dependent in dependents.get(idx, []):
+                    waiting[dependent] -= 1
+                    if waiting[dependent] == 0:
+                        next_ready.append(dependent)
+            ready = next_ready
+
+        self.pending = [tup for idx, tup in enumerate(candidates) if idx not in released]
+        if self.max_pending is not None and len(self.pending) > self.max_pending:
+            overflow = len(self.pending) - self.max_pending
+            self.unresolved.extend(self.pending[:overflow])
+            self.pending = self.pending[overflow:]
+        return levels
+
+    def finish(self) -> list[list[RtTuple]]:
+        """Releases what the end of the stream resolves and gives up on the remaining pending tuples"""
+        levels = self.order([])
+        self.unresolved.extend(self.pending)
+        self.pending = []
+        return levels
+
+    def stream(self, tuples: Iterable[RtTuple], window_size: int = 10000) -> Iterator[list[RtTuple]]:
+        """
+        Orders a whole stream of tuples a window at a time.
+
+        Args:
+            tuples (Iterable[RtTuple]): The stream of tuples.
+            window_size (int): The number of tuples read from the stream per window.
+
+        Yields:
+            list[RtTuple]: The levels of released tuples, in the order they must be written.
+        """
+        window = []
+        for tup in tuples:
+            window.append(tup)
+            if len(window) >= window_size:
+                yield from self.order(window)
+                window = []
+        yield from self.order(window)
+        yield from self.finish()
+
+class IngestReport:
+    """
+    Summary of an ordered ingestion.
+
+    Attributes:
+        written (int): The number of tuples written.
+        batches (int): The number of batches written.
+        unresolved (list[RtTuple]): The tuples whose references never resolved.
+    """
+
+    def __init__(self):
+        self.written = 0
+        self.batches = 0
+        self.unresolved = []
+
+    def __repr__(self):
+        return f"IngestReport(written={self.written}, batches={self.batches}, unresolved={len(self.unresolved)})"
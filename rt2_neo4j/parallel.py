@@ -0,0 +1,242 @@
+from rt_core_v2.rttuple import RtTuple, TupleType, TupleComponents, AttributesVisitor
+from neo4j import GraphDatabase
+from rt2_neo4j.queries import batched, existing_ruis_query
+from rt2_neo4j.bulk import insert_batch
+from rt2_neo4j.blobs import BlobStore
+from rt2_neo4j.encoding import Encoding
+from rt2_neo4j.ordering import DependencyOrderer, IngestReport
+from rt2_neo4j.retry import RetryPolicy, RetryMetrics, PartialWriteError
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable
+import hashlib
+import heapq
+import multiprocessing
+import os
+import time
+
+"""
+Components naming the nodes a tuple's insertion locks: PoR, tuple and temporal nodes are locked when relationships
+are created to them, and temporal nodes are MERGEd as well. NtoC and NtoDE tuples also lock their Code or data node.
+"""
+contended_components = [
+    TupleComponents.ruin, TupleComponents.ruir, TupleComponents.ruia, TupleComponents.ruid, TupleComponents.ruit,
+    TupleComponents.replacements, TupleComponents.ruitn, TupleComponents.r, TupleComponents.p_list,
+    TupleComponents.ta, TupleComponents.tr, TupleComponents.ruics, TupleComponents.ruidt,
+]
+
+get_attr = AttributesVisitor()
+
+def contended_keys(tup: RtTuple) -> list[str]:
+    """Returns the keys of every existing node a tuple's insertion locks"""
+    keys = []
+    if tup.tuple_type == TupleType.NtoC:
+        keys.append(f"code:{tup.ruics}:{tup.code}")
+    elif tup.tuple_type == TupleType.NtoDE:
+        keys.append(f"data:{tup.ruidt}:{hashlib.sha256(tup.data).hexdigest()}")
+    attributes = tup.accept(get_attr)
+    for component in contended_components:
+        value = attributes.get(component.value)
+        for node in value if isinstance(value, list) else [value]:
+            if node is not None:
+                keys.append(str(node))
+    return keys
+
+def partition(tuples: Iterable[RtTuple], shards: int) -> list[list[RtTuple]]:
+    """
+    Splits tuples into shards so that tuples locking a common node always land in the same shard.
+    Tuples are grouped by a union-find over their contended keys, and the groups, largest first, go to the least
+    loaded shard. Tuples connected through a node most of them share, such as a common relation, form a single group
+    and are written by a single worker.
+    """
+    tuples = list(tuples)
+    parent = {}
+
+    def find(key: str) -> str:
+        parent.setdefault(key, key)
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    firsts = []
+    for tup in tuples:
+        keys = contended_keys(tup) or [str(tup.rui)]
+        root = find(keys[0])
+        for key in keys[1:]:
+            other = find(key)
+            if other != root:
+                parent[other] = root
+        firsts.append(keys[0])
+    groups = {}
+    for tup, key in zip(tuples, firsts):
+        groups.setdefault(find(key), []).append(tup)
+    partitions = [[] for _ in range(shards)]
+    loads = [(0, shard) for shard in range(shards)]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        load, shard = heapq.heappop(loads)
+        partitions[shard].extend(group)
+        heapq.heappush(loads, (load + len(group), shard))
+    return partitions
+
+class ShardWriter:
+    """
+    Writer owned by one worker process, with a driver of its own.
+
+    Attributes:
+        driver: The worker's Neo4j database driver.
+        batch_size (int): The maximum number of tuples per transaction.
+        blob_store (BlobStore | None): The blob store for large NtoDE payloads, if any.
+        encoding (Encoding): The encoding of the values written to the database.
+        retry_policy (RetryPolicy): The policy retrying the worker's transactions.
+    """
+
+    def __init__(self, uri, auth, config: dict, batch_size: int, blob_store: BlobStore | None, compact_ruis: bool,
+                 retry_policy: RetryPolicy):
+        self.driver = GraphDatabase.driver(uri, auth=auth, **config)
+        self.batch_size = batch_size
+        self.blob_store = blob_store
+        self.encoding = Encoding(compact_ruis)
+        self.retry_policy = retry_policy
+
+    def insert(self, tx, tuples: list[RtTuple]):
+        insert_batch(tuples, tx, self.blob_store, self.encoding)
+
+    def write(self, tuples: list[RtTuple]) -> tuple[int, int, int, float, RetryMetrics, list[RtTuple], str | None]:
+        """
+        Writes a shard in batches, one transaction per batch, and returns the worker's pid, tuple and batch counts,
+        busy time, retry counters, and the tuples left unwritten with the error that stopped the shard.
+        A batch committed only in part stops the shard, leaving its remaining tuples and every later batch unwritten.
+        """
+        start = time.perf_counter()
+        written = 0
+        batches = 0
+        failed = []
+        error = None
+        with self.driver.session() as session:
+            for batch in batched(tuples, self.batch_size):
+                try:
+                    self.retry_policy.write(session, self.insert, batch)
+                except PartialWriteError as partial:
+                    written += len(partial.committed)
+                    failed = partial.remaining + tuples[written + len(partial.remaining):]
+                    # Neo4j errors do not always survive pickling, so only their message goes back to the caller
+                    error = str(partial.error)
+                    break
+                written += len(batch)
+                batches += 1
+        return os.getpid(), written, batches, time.perf_counter() - start, self.retry_policy.take_stats(), failed, error
+
+"""The ShardWriter of the current worker process"""
+shard_writer = None
+
+def start_worker(*args):
+    global shard_writer
+    shard_writer = ShardWriter(*args)
+
+def write_shard(tuples: list[RtTuple]) -> tuple[int, int, int, float, RetryMetrics, list[RtTuple], str | None]:
+    return shard_writer.write(tuples)
+
+class ParallelIngestReport(IngestReport):
+    """
+    Summary of a parallel ingestion.
+
+    Attributes:
+        workers (int): The number of worker processes.
+        levels (int): The number of dependency levels written, each one behind a barrier.
+        seconds (float): The wall-clock duration of the ingestion.
+        worker_written (dict[int, int]): The number of tuples written by each worker process, keyed by pid.
+        worker_seconds (dict[int, float]): The time each worker process spent writing, keyed by pid.
+        retries (RetryMetrics): The retry and lock contention counters of every worker.
+        failed (list[RtTuple]): The tuples of the last level that were not written after a batch was committed only in part.
+        errors (list[str]): The messages of the errors that left tuples unwritten.
+    """
+
+    def __init__(self, workers: int):
+        super().__init__()
+        self.workers = workers
+        self.levels = 0
+        self.seconds = 0.0
+        self.worker_written = {}
+        self.worker_seconds = {}
+        self.retries = RetryMetrics()
+        self.failed = []
+        self.errors = []
+
+    def throughput(self) -> float:
+        """Returns the number of tuples written per second"""
+        return self.written / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return (f"ParallelIngestReport(written={self.written}, batches={self.batches}, unresolved={len(self.unresolved)}, "
+                f"failed={len(self.failed)}, workers={self.workers}, levels={self.levels}, seconds={self.seconds:.3f}, "
+                f"throughput={self.throughput():.0f}/s, retries={self.retries.retries}, "
+                f"contention={self.retries.contention_rate():.1%})")
+
+def parallel_ingest(source: Iterable[RtTuple], uri, auth, workers: int | None = None, config: dict | None = None,
+                    window_size: int = 10000, batch_size: int = 1000, blob_store: BlobStore | None = None,
+                    compact_ruis: bool = False, max_pending: int | None = None,
+                    retry_policy: RetryPolicy | None = None) -> ParallelIngestReport:
+    """
+    Writes a stream of tuples in any order with a pool of worker processes, each with its own driver.
+
+    The stream is ordered a window at a time by a DependencyOrderer in the calling process. Each dependency level
+    is partitioned so that tuples locking a common node, whether a PoR, tuple or temporal node they point at or the
+    Code or data node they merge, are written by the same worker, and the shards are written concurrently. How much
+    the workers overlap therefore depends on how connected a level is: tuples that all point at one node are written
+    by one worker. A level is written only after the previous one has been written by every worker. Converting and
+    encoding tuples happens in the workers. The schema should exist beforehand, so that concurrent MERGEs of distinct
+    nodes cannot create duplicates.
+    A batch committed only in part stops its worker's shard. The unwritten tuples of the level are returned in the
+    report, and no later level is written since it may refer to them.
+
+    Args:
+        source (Iterable[RtTuple]): The tuples to be written.
+        uri: The URI of the Neo4j database.
+        auth: The authentication of the Neo4j database.
+        workers (int | None): The number of worker processes, the number of CPUs if None.
+        config (dict | None): Additional configuration of each worker's driver.
+        window_size (int): The number of tuples ordered at a time.
+        batch_size (int): The maximum number of tuples per transaction.
+        blob_store (BlobStore | None): The blob store for large NtoDE payloads, if any.
+        compact_ruis (bool): Whether ruis are stored in their compact form.
+        max_pending (int | None): The maximum number of tuples waiting for their references, unbounded if None.
+        retry_policy (RetryPolicy | None): The policy each worker retries its transactions with, a default RetryPolicy if None.
+
+    Returns:
+        ParallelIngestReport: The number of tuples, batches and levels written, the unresolved and failed tuples,
+            the throughput and the retry counters.
+    """
+    workers = workers or os.cpu_count() or 1
+    config = config or {}
+    report = ParallelIngestReport(workers)
+    start = time.perf_counter()
+    # Workers are spawned rather than forked so they do not inherit the driver of the calling process
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=start_worker,
+                             initargs=(uri, auth, config, batch_size, blob_store, compact_ruis,
+                                       retry_policy or RetryPolicy())) as executor:
+        driver = GraphDatabase.driver(uri, auth=auth, **config)
+        try:
+            encoding = Encoding(compact_ruis)
+            orderer = DependencyOrderer(exists=lambda ruis: existing_ruis_query(ruis, driver, encoding=encoding),
+                                        max_pending=max_pending)
+            for level in orderer.stream(source, window_size):
+                futures = [executor.submit(write_shard, shard) for shard in partition(level, workers) if shard]
+                for future in futures:
+                    pid, written, batches, seconds, retries, failed, error = future.result()
+                    report.retries.add(retries)
+                    report.written += written
+                    report.batches += batches
+                    report.worker_written[pid] = report.worker_written.get(pid, 0) + written
+                    report.worker_seconds[pid] = report.worker_seconds.get(pid, 0.0) + seconds
+                    report.failed.extend(failed)
+                    if error is not None:
+                        report.errors.append(error)
+                report.levels += 1
+                if report.failed:
+                    break
+            report.unresolved = orderer.unresolved
+        finally:
+            driver.close()
+    report.seconds = time.perf_counter() - start
+    return report
@@ -1,10 +1,14 @@
 from rt_core_v2.rttuple import RtTupleVisitor, RtTuple, ANTuple, ARTuple, DITuple, DCTuple, FTuple, NtoNTuple, NtoRTuple, NtoCTuple, NtoDETuple, NtoLackRTuple, TupleType, TupleComponents, AttributesVisitor, RuiStatus, PorType, TempRef
 from rt_core_v2.ids_codes.rui import Rui, Relationship
 from rt_core_v2.metadata import TupleEventType, RtChangeReason
+from rt2_neo4j.encoding import Encoding, string_encoding, expand_rui
+from rt2_neo4j.metrics import instrumented, record_result, record_size
 from enum import Enum
 from datetime import datetime
 import uuid
 import base64
+import hashlib
+from itertools import islice
 
 """
 Enum for defining various node labels used in Cypher queries.
@@ -27,27 +31,45 @@ class NodeLabels(Enum):
     Temporal = "temp"
     Relation = "rel"
     Concept = "con"
+    Code = "Code"
+    # Shared label of every node identified by a rui, so that label-less rui lookups can use an index
+    RtNode = "RtNode"
 
 
 class Neo4jEntryConverter:
     """Contains functions for converting neo4j representation to and from tuple representation"""
     @staticmethod
     def str_to_rui(x: str) -> Rui:
-        return Rui(uuid.UUID(x))
+        return Rui(expand_rui(x))
     @staticmethod
     def lst_to_ruis(x: list[str]) -> list[Rui]:
-        return [Rui(uuid.UUID(entry)) for entry in x]
+        return [Rui(expand_rui(entry)) for entry in x]
+
+    @staticmethod
+    def to_bool(x) -> bool:
+        # Booleans written before they were stored natively hold "True" or "False"
+        if isinstance(x, str):
+            return x == "True"
+        return bool(x)
 
     @staticmethod
     def str_to_str(x: str):
         return x
     
+    @staticmethod
+    def to_datetime(x) -> datetime:
+        # Timestamps written before they were stored natively hold formatted strings
+        if isinstance(x, str):
+            return datetime.fromisoformat(x)
+        if isinstance(x, datetime):
+            return x
+        return x.to_native()
+
     @staticmethod
     def process_temp_ref(x: str):
         #UUIDs do not contain colons. A bit hacky, so find a better way to differentiate.
         if ':' in x:
-            format = "%Y-%m-%d %H:%M:%S.%f%z"
-            time_data = datetime.strptime(x, format)
+            time_data = datetime.fromisoformat(x)
         else:
             time_data = Rui(uuid.UUID(x))
         return TempRef(time_data)
@@ -57,8 +79,11 @@ class Neo4jEntryConverter:
         return Relationship(relation_str)
     
     @staticmethod
-    def str_to_bytes(x: str):
-        return base64.b64decode(x)
+    def str_to_bytes(x):
+        # Data nodes written before payloads were stored natively hold base64 strings
+        if isinstance(x, str):
+            return base64.b64decode(x)
+        return bytes(x)
 
 neo4j_entry_converter = {
     TupleComponents.rui: Neo4jEntryConverter.str_to_rui,
@@ -72,8 +97,7 @@ neo4j_entry_converter = {
     TupleComponents.ruit: Neo4jEntryConverter.str_to_rui,
     TupleComponents.ruitn: Neo4jEntryConverter.str_to_rui,
     TupleComponents.ruio: Neo4jEntryConverter.str_to_rui,
-    #TODO Change this for timestamp
-    TupleComponents.t: lambda x: datetime.strptime(x, "%Y-%m-%d %H:%M:%S.%f%z"),
+    TupleComponents.t: Neo4jEntryConverter.to_datetime,
     TupleComponents.ta: Neo4jEntryConverter.process_temp_ref,
     TupleComponents.tr: Neo4jEntryConverter.process_temp_ref,
     TupleComponents.ar: lambda x: RuiStatus(x),
@@ -83,7 +107,7 @@ neo4j_entry_converter = {
     TupleComponents.replacements: Neo4jEntryConverter.lst_to_ruis,
     TupleComponents.p_list: Neo4jEntryConverter.lst_to_ruis,
     TupleComponents.C: lambda x: float(x),
-    TupleComponents.polarity: lambda x: bool(x),
+    TupleComponents.polarity: Neo4jEntryConverter.to_bool,
     TupleComponents.r: Neo4jEntryConverter.str_to_rui,
     # TODO Figure out the types of code and data
     TupleComponents.code: Neo4jEntryConverter.str_to_str,
@@ -91,18 +115,27 @@ neo4j_entry_converter = {
     TupleComponents.type: lambda x: TupleType(x),
 }
 
-def neo4j_to_rttuple(record) -> RtTuple:
-    """Map a dictionary containing neo4j tuple components to a tuple"""
+"""Converters of each component keyed by its neo4j property name, so decoding needs no enum lookup"""
+property_converters = {component.value: converter for component, converter in neo4j_entry_converter.items()}
+
+@instrumented("neo4j_to_rttuple")
+def neo4j_to_rttuple(record) -> dict:
+    """
+    Map a dictionary containing neo4j tuple components to the arguments of a tuple.
+    Keys that are not tuple components are ignored.
+
+    Raises:
+        TupleDecodeError: If a component's value cannot be converted.
+    """
     output = {}
     for key, value in record.items():
+        converter = property_converters.get(key)
+        if converter is None:
+            continue
         try:
-            entry = TupleComponents(key)
-            output[key] = neo4j_entry_converter[entry](value)
-        except ValueError:
-            # TODO Log error
-            print(
-                f"Invalid neo4j-rttuple processed due to key: {key} with entry: {value}. The processing of this tuple has been skipped."
-            )
+            output[key] = converter(value)
+        except (TypeError, ValueError) as error:
+            raise TupleDecodeError(RtTuple, key, value, error) from error
     return output
 
 """
@@ -127,18 +160,45 @@ class RelationshipLabels(Enum):
     ruics = TupleComponents.ruics.value
     code = TupleComponents.code.value
 
+def encode_data(data: bytes, blob_store=None) -> dict:
+    """
+    Computes the content-addressed representation of an NtoDE payload.
+    Payloads accepted by the blob store are moved there and not stored on the data node.
+
+    Args:
+        data (bytes): The payload.
+        blob_store (BlobStore | None): The blob store for large payloads, if any.
+
+    Returns:
+        dict: The SHA-256 hex digest of the payload and the payload to store on the data node, if any.
+    """
+    record_size("rt2_neo4j_payload_bytes", len(data), "encode_data")
+    digest = hashlib.sha256(data).hexdigest()
+    if blob_store is not None and blob_store.accepts(data):
+        blob_store.put(digest, data)
+        data = None
+    return {"sha256": digest, TupleComponents.data.value: data}
+
+def decode_data(data, digest: str | None, blob_store=None):
+    """Returns the neo4j payload of a data node, reading it from the blob store if it is not stored on the node"""
+    if data is None:
+        if blob_store is None:
+            raise ValueError(f"Data {digest} is stored as a blob, but no blob store is configured")
+        data = blob_store.get(digest)
+    record_size("rt2_neo4j_payload_bytes", len(data), "decode_data")
+    return data
+
 class TupleInsertionVisitor(RtTupleVisitor):
-    def __init__(self, driver):
+    def __init__(self, driver, blob_store=None, encoding: Encoding = string_encoding):
         self.driver = driver
+        self.blob_store = blob_store
+        self.encoding = encoding
     
 
-    def convert_att_neo4j(self, attribute):
-        att_type = attribute
-        if att_type == int or att_type == float or att_type == datetime or att_type == bool:
-            return attribute
-        elif isinstance(att_type, Enum):
-            return attribute.value
-        return str(attribute)
+    @staticmethod
+    def convert_att_neo4j(attribute):
+        """Converts a tuple component to its neo4j value with canonical ruis"""
+        return string_encoding.value(attribute)
     
     """
     Visitor class for handling different types of tuples and generating corresponding Cypher queries for insertion.
@@ -150,42 +210,52 @@ class TupleInsertionVisitor(RtTupleVisitor):
 
     def visit(self, host: RtTuple):
         """
-        Visits a tuple and generates a Cypher query based on the tuple's type.
+        Visits a tuple and inserts it in a transaction of its own.
         
         Args:
             host (RtTuple): The tuple to be visited.
 
         """
-        attributes = host.accept(self.get_attr)
-        pop_key(attributes, TupleComponents.type.value)
-        query = None
-        attributes = {key: self.convert_att_neo4j(value) for key, value in attributes.items()}
-        #TODO Move session control out of insertion and into RtStore
         with self.driver.session() as session:
             with session.begin_transaction() as tx:
-                match host.tuple_type:
-                    case TupleType.AN:
-                        query = self.visit_an(host, attributes, tx)
-                    case TupleType.AR:
-                        query = self.visit_ar(host, attributes, tx)
-                    case TupleType.DI:
-                        query = self.visit_di(host, attributes, tx)
-                    case TupleType.DC:
-                        query = self.visit_dc(host, attributes, tx)
-                    case TupleType.F:
-                        query = self.visit_f(host, attributes, tx)
-                    case TupleType.NtoN:
-                        query = self.visit_nton(host, attributes, tx)
-                    case TupleType.NtoR:
-                        query = self.visit_ntor(host, attributes, tx)
-                    case TupleType.NtoC:
-                        query = self.visit_ntoc(host, attributes, tx)
-                    case TupleType.NtoDE:
-                        query = self.visit_ntode(host, attributes, tx)
-                    case TupleType.NtoLackR:
-                        query = self.visit_ntolackr(host, attributes, tx)
-        return query
+                return self.insert(host, tx)
 
+    def insert(self, host: RtTuple, tx):
+        """
+        Generates the Cypher query for a tuple based on the tuple's type and runs it in a transaction owned by the caller.
+
+        Args:
+            host (RtTuple): The tuple to be inserted.
+            tx: The transaction the query is run in.
+
+        """
+        attributes = host.accept(self.get_attr)
+        pop_key(attributes, TupleComponents.type.value)
+        attributes = {key: self.encoding.value(value) for key, value in attributes.items()}
+        match host.tuple_type:
+            case TupleType.AN:
+                return self.visit_an(host, attributes, tx)
+            case TupleType.AR:
+                return self.visit_ar(host, attributes, tx)
+            case TupleType.DI:
+                return self.visit_di(host, attributes, tx)
+            case TupleType.DC:
+                return self.visit_dc(host, attributes, tx)
+            case TupleType.F:
+                return self.visit_f(host, attributes, tx)
+            case TupleType.NtoN:
+                return self.visit_nton(host, attributes, tx)
+            case TupleType.NtoR:
+                return self.visit_ntor(host, attributes, tx)
+            case TupleType.NtoC:
+                return self.visit_ntoc(host, attributes, tx)
+            case TupleType.NtoDE:
+                return self.visit_ntode(host, attributes, tx)
+            case TupleType.NtoLackR:
+                return self.visit_ntolackr(host, attributes, tx)
+        return None
+
+    @instrumented("visit_an")
     def visit_an(self, host: ANTuple, attributes: dict, tx):
         """
         Generates a Cypher query for an ANTuple.
@@ -196,12 +266,13 @@ class TupleInsertionVisitor(RtTupleVisitor):
 
         """
         return tx.run(f"""
-               CREATE (an:{NodeLabels.AN.value} {{rui: $rui, ar: $ar, unique: $unique}}) 
-               CREATE (npor:{NodeLabels.NPoR.value} {{rui:$ruin}})
+               CREATE (an:{NodeLabels.AN.value}:{NodeLabels.RtNode.value} {{rui: $rui, ar: $ar, unique: $unique}}) 
+               CREATE (npor:{NodeLabels.NPoR.value}:{NodeLabels.RtNode.value} {{rui:$ruin}})
                CREATE (an)-[:{RelationshipLabels.ruin.value}]->(npor)
                """, **attributes)
         
     
+    @instrumented("visit_ar")
     def visit_ar(self, host: ARTuple, attributes: dict, tx):
         """
         Generates a Cypher query for an ARTuple.
@@ -212,11 +283,12 @@ class TupleInsertionVisitor(RtTupleVisitor):
 
         """
         return tx.run(f"""
-               CREATE (ar:{NodeLabels.AR.value} {{rui: $rui, ar: $ar, unique: $unique, ruio: $ruio}}) 
-               CREATE (rpor:{NodeLabels.RPoR.value} {{rui:$ruir}})
+               CREATE (ar:{NodeLabels.AR.value}:{NodeLabels.RtNode.value} {{rui: $rui, ar: $ar, unique: $unique, ruio: $ruio}}) 
+               CREATE (rpor:{NodeLabels.RPoR.value}:{NodeLabels.RtNode.value} {{rui:$ruir}})
                CREATE (ar)-[:{RelationshipLabels.ruir.value}]->(rpor)
                """, **attributes)
 
+    @instrumented("visit_di")
     def visit_di(self, host: DITuple, attributes: dict, tx):
         """
         Generates a Cypher query for a DITuple.
@@ -227,25 +299,26 @@ class TupleInsertionVisitor(RtTupleVisitor):
 
         """
         return tx.run(f"""
-            CREATE (di:{NodeLabels.DI.value} {{rui: $rui, t: $t, event_reason: $event_reason}})
+            CREATE (di:{NodeLabels.DI.value}:{NodeLabels.RtNode.value} {{rui: $rui, t: $t, event_reason: $event_reason, ruia: $ruia}})
 
             WITH di
-            MATCH (ruit {{rui: $ruit}})
+            MATCH (ruit:{NodeLabels.RtNode.value} {{rui: $ruit}})
             CREATE (di)-[:{RelationshipLabels.ruit.value}]->(ruit)
 
             WITH di
-            MATCH (ruid {{rui: $ruid}})
+            MATCH (ruid:{NodeLabels.RtNode.value} {{rui: $ruid}})
             CREATE (di)-[:{RelationshipLabels.ruid.value}]->(ruid)
 
             WITH di
-            MATCH (ruia {{rui: $ruia}})
+            MATCH (ruia:{NodeLabels.RtNode.value} {{rui: $ruia}})
             CREATE (di)-[:{RelationshipLabels.ruia.value}]->(ruia)
 
             WITH di
-            MERGE (ta:{NodeLabels.Temporal.value} {{rui: $ta}})
+            MERGE (ta:{NodeLabels.Temporal.value}:{NodeLabels.RtNode.value} {{rui: $ta}})
             CREATE (di)-[:{RelationshipLabels.ta.value}]->(ta)
             """, **attributes)
 
+    @instrumented("visit_dc")
     def visit_dc(self, host: DCTuple, attributes: dict, tx):
         """
         Generates a Cypher query for a DCTuple.
@@ -257,27 +330,24 @@ class TupleInsertionVisitor(RtTupleVisitor):
         """
 
         query = f"""
-            CREATE (dc:{NodeLabels.DC.value} {{rui: $rui, t: $t, event_reason: $event_reason, event: $event}})
+            CREATE (dc:{NodeLabels.DC.value}:{NodeLabels.RtNode.value} {{rui: $rui, t: $t, event_reason: $event_reason, event: $event}})
 
             WITH dc
-            MATCH (ruit {{rui: $ruit}})
+            MATCH (ruit:{NodeLabels.RtNode.value} {{rui: $ruit}})
             CREATE (dc)-[:{RelationshipLabels.ruit.value}]->(ruit)
 
             WITH dc
-            MATCH (ruid {{rui: $ruid}})
-            CREATE (dc)-[:{RelationshipLabels.ruid.value}]->(ruid)"""
-        
-        for idx, repl in enumerate(host.replacements):
-            repl_id = TupleComponents.replacements.value + str(idx)
-            attributes[repl_id] = str(repl)
-            query += f"""
-                    WITH dc
-                    MATCH ({TupleComponents.replacements.value} {{rui: ${repl_id}}})
-                    CREATE (dc)-[:{RelationshipLabels.replacement.value} {{replacements:{str(idx)}}}]->({TupleComponents.replacements.value})"""
-            
-        pop_key(attributes, TupleComponents.replacements.value)
+            MATCH (ruid:{NodeLabels.RtNode.value} {{rui: $ruid}})
+            CREATE (dc)-[:{RelationshipLabels.ruid.value}]->(ruid)
+
+            WITH dc
+            UNWIND range(0, size($replacements) - 1) AS idx
+            MATCH (replacement:{NodeLabels.RtNode.value} {{rui: $replacements[idx]}})
+            CREATE (dc)-[:{RelationshipLabels.replacement.value} {{replacements: idx}}]->(replacement)"""
+        # The list is a single parameter, so every DC shares one query text and one cached plan
         return tx.run(query, **attributes)
 
+    @instrumented("visit_f")
     def visit_f(self, host: FTuple, attributes: dict, tx):
         """
         Generates a Cypher query for an FTuple.
@@ -288,12 +358,13 @@ class TupleInsertionVisitor(RtTupleVisitor):
 
         """
         return tx.run(f"""
-               MATCH (tup {{rui:$ruitn}})
-               CREATE (f:{NodeLabels.F.value} {{rui: $rui, C: $C}}) 
+               MATCH (tup:{NodeLabels.RtNode.value} {{rui:$ruitn}})
+               CREATE (f:{NodeLabels.F.value}:{NodeLabels.RtNode.value} {{rui: $rui, C: $C}}) 
                CREATE (f)-[:{RelationshipLabels.ruitn.value}]->(tup)
                """, **attributes)
 
     # TODO Figure out how to implement relationship nodes
+    @instrumented("visit_nton")
     def visit_nton(self, host: NtoNTuple, attributes: dict, tx):
         """
         Generates a Cypher query for an NtoNTuple.
@@ -304,27 +375,23 @@ class TupleInsertionVisitor(RtTupleVisitor):
 
         """
         query = f"""
-            CREATE (nton:{NodeLabels.NtoN.value} {{rui: $rui, polarity: $polarity}})
+            CREATE (nton:{NodeLabels.NtoN.value}:{NodeLabels.RtNode.value} {{rui: $rui, polarity: $polarity}})
 
             WITH nton
-            MATCH (r {{rui: $r}})
+            MATCH (r:{NodeLabels.RtNode.value} {{rui: $r}})
             CREATE (nton)-[:{RelationshipLabels.r.value}]->(r)
 
             WITH nton
-            MERGE (tr:{NodeLabels.Temporal.value} {{rui: $tr}})
-            CREATE (nton)-[:{RelationshipLabels.tr.value}]->(tr)"""
-        
-        for idx, ruin in enumerate(host.p):
-            ruin_id = TupleComponents.p_list.value + str(idx)
-            attributes[ruin_id] = str(ruin)
-            query += f"""
-                    WITH nton
-                    MATCH ({TupleComponents.p_list.value} {{rui: ${ruin_id}}})
-                    CREATE (nton)-[:{RelationshipLabels.p_list.value} {{p:{str(idx)}}}]->({TupleComponents.p_list.value})"""
-            
-        pop_key(attributes, TupleComponents.p_list.value)
+            MERGE (tr:{NodeLabels.Temporal.value}:{NodeLabels.RtNode.value} {{rui: $tr}})
+            CREATE (nton)-[:{RelationshipLabels.tr.value}]->(tr)
+
+            WITH nton
+            UNWIND range(0, size($p) - 1) AS idx
+            MATCH (ruip:{NodeLabels.RtNode.value} {{rui: $p[idx]}})
+            CREATE (nton)-[:{RelationshipLabels.p_list.value} {{p: idx}}]->(ruip)"""
         return tx.run(query, **attributes)
     
+    @instrumented("visit_ntor")
     def visit_ntor(self, host: NtoRTuple, attributes: dict, tx):
         """
         Generates a Cypher query for an NtoRTuple.
@@ -335,99 +402,87 @@ class TupleInsertionVisitor(RtTupleVisitor):
 
         """
         return tx.run(f"""
-            CREATE (ntor:{NodeLabels.NtoR.value} {{rui: $rui, polarity: $polarity}})
+            CREATE (ntor:{NodeLabels.NtoR.value}:{NodeLabels.RtNode.value} {{rui: $rui, polarity: $polarity}})
 
             WITH ntor
-            MATCH (ruin {{rui: $ruin}})
+            MATCH (ruin:{NodeLabels.RtNode.value} {{rui: $ruin}})
             CREATE (ntor)-[:{RelationshipLabels.ruin.value}]->(ruin)
 
             WITH ntor
-            MATCH (ruir {{rui: $ruir}})
+            MATCH (ruir:{NodeLabels.RtNode.value} {{rui: $ruir}})
             CREATE (ntor)-[:{RelationshipLabels.ruir.value}]->(ruir)
 
             WITH ntor
-            MATCH (r {{rui: $r}})
+            MATCH (r:{NodeLabels.RtNode.value} {{rui: $r}})
             CREATE (ntor)-[:{RelationshipLabels.r.value}]->(r)
 
             WITH ntor
-            MERGE (tr:{NodeLabels.Temporal.value} {{rui: $tr}})
+            MERGE (tr:{NodeLabels.Temporal.value}:{NodeLabels.RtNode.value} {{rui: $tr}})
             CREATE (ntor)-[:{RelationshipLabels.tr.value}]->(tr)
             """, **attributes)
 
+    @instrumented("visit_ntoc")
     def visit_ntoc(self, host: NtoCTuple, attributes: dict, tx):
         """
         Generates a Cypher query for an NtoCTuple, ensuring that the `code` node has a unique relationship to `ruics`.
+        The `code` node is keyed by its code and `ruics`, so designator lookups are a single indexed hop.
 
         Args:
             host (NtoCTuple): The NtoCTuple instance.
             attributes (dict): Attributes of the NtoCTuple.
         """
         return tx.run(f"""
-            CREATE (ntoc:{NodeLabels.NtoC.value} {{rui: $rui, polarity: $polarity}})
+            CREATE (ntoc:{NodeLabels.NtoC.value}:{NodeLabels.RtNode.value} {{rui: $rui, polarity: $polarity}})
 
             WITH ntoc
-            MATCH (r {{rui: $r}})
+            MATCH (r:{NodeLabels.RtNode.value} {{rui: $r}})
             CREATE (ntoc)-[:{RelationshipLabels.r.value}]->(r)
 
             WITH ntoc
-            MATCH (ruin {{rui: $ruin}})
+            MATCH (ruin:{NodeLabels.RtNode.value} {{rui: $ruin}})
             CREATE (ntoc)-[:{RelationshipLabels.ruin.value}]->(ruin)
 
             WITH ntoc
-            MATCH (ruics {{rui: $ruics}})
-            OPTIONAL MATCH (code_node:Code {{code: $code}})-[:{RelationshipLabels.ruics.value}]->(ruics {{rui: $ruics}})
-            
-            WITH ntoc, code_node, ruics
-            CALL {{
-                WITH code_node, ruics
-                WITH * WHERE code_node IS NULL
-                CREATE (new_code_node:Code {{code: $code}})
-                CREATE (new_code_node)-[:{RelationshipLabels.ruics.value}]->(ruics)
-                RETURN new_code_node
-            }}
-            WITH ntoc, COALESCE(new_code_node, code_node) AS final_code_node
-            CREATE (ntoc)-[:{RelationshipLabels.code.value}]->(final_code_node)
+            MATCH (ruics:{NodeLabels.RtNode.value} {{rui: $ruics}})
+            MERGE (code_node:{NodeLabels.Code.value} {{ruics: $ruics, code: $code}})
+            MERGE (code_node)-[:{RelationshipLabels.ruics.value}]->(ruics)
+            CREATE (ntoc)-[:{RelationshipLabels.code.value}]->(code_node)
 
             WITH ntoc
-            MERGE (tr:{NodeLabels.Temporal.value} {{rui: $tr}})
+            MERGE (tr:{NodeLabels.Temporal.value}:{NodeLabels.RtNode.value} {{rui: $tr}})
             CREATE (ntoc)-[:{RelationshipLabels.tr.value}]->(tr)
         """, **attributes)
 
+    @instrumented("visit_ntode")
     def visit_ntode(self, host: NtoDETuple, attributes: dict, tx):
         """
         Generates a Cypher query for an NtoDETuple, ensuring the `data` is stored in a separate node.
+        The `data` node is keyed by the SHA-256 digest of its data and `ruidt`, so deduplication and designator lookups
+        are a single indexed hop. The data is stored as a byte array, or in the blob store if it is too large.
 
         Args:
             host (NtoDETuple): The NtoDETuple instance.
             attributes (dict): Attributes of the NtoDETuple.
         """
-        attributes[TupleComponents.data.value] = base64.b64encode(host.data).decode('utf-8')
+        attributes.update(encode_data(host.data, self.blob_store))
 
         return tx.run(f"""
-            CREATE (ntode:{NodeLabels.NtoDE.value} {{rui: $rui, polarity: $polarity}})
+            CREATE (ntode:{NodeLabels.NtoDE.value}:{NodeLabels.RtNode.value} {{rui: $rui, polarity: $polarity}})
 
             WITH ntode
-            MATCH (ruin {{rui: $ruin}})
+            MATCH (ruin:{NodeLabels.RtNode.value} {{rui: $ruin}})
             CREATE (ntode)-[:{RelationshipLabels.ruin.value}]->(ruin)
 
             WITH ntode
-            MATCH (ruidt {{rui: $ruidt}})
-            OPTIONAL MATCH (data_node:{NodeLabels.Data.value} {{data: $data}})-[:{RelationshipLabels.ruidt.value}]->(ruidt)
-
-            WITH ntode, data_node, ruidt
-            CALL {{
-                WITH data_node, ruidt
-                WITH * WHERE data_node IS NULL
-                CREATE (new_data_node:{NodeLabels.Data.value} {{data: $data}})
-                CREATE (new_data_node)-[:{RelationshipLabels.ruidt.value}]->(ruidt)
-                RETURN new_data_node
-            }}
-            
-            WITH ntode, COALESCE(new_data_node, data_node) AS final_data_node
-            CREATE (ntode)-[:{RelationshipLabels.data.value}]->(final_data_node)
+            MATCH (ruidt:{NodeLabels.RtNode.value} {{rui: $ruidt}})
+            MERGE (data_node:{NodeLabels.Data.value} {{ruidt: $ruidt, sha256: $sha256}})
+            ON CREATE SET data_node.data = $data
+            MERGE (data_node)-[:{RelationshipLabels.ruidt.value}]->(ruidt)
+            CREATE (ntode)-[:{RelationshipLabels.data.value}]->(data_node)
         """, **attributes)
 
     
+    @instrumented("visit_ntolackr")
     def visit_ntolackr(self, host: NtoLackRTuple, attributes: dict, tx):
         """
         Generates a Cypher query for an NtoLackRTuple.
@@ -438,105 +493,472 @@ class TupleInsertionVisitor(RtTupleVisitor):
 
         """
         return tx.run(f"""
-            CREATE (ntolackr:{NodeLabels.NtoLackR.value} {{rui: $rui}})
+            CREATE (ntolackr:{NodeLabels.NtoLackR.value}:{NodeLabels.RtNode.value} {{rui: $rui}})
 
             WITH ntolackr
-            MATCH (ruin {{rui: $ruin}})
+            MATCH (ruin:{NodeLabels.RtNode.value} {{rui: $ruin}})
             CREATE (ntolackr)-[:{RelationshipLabels.ruin.value}]->(ruin)
 
             WITH ntolackr
-            MATCH (ruir {{rui: $ruir}})
+            MATCH (ruir:{NodeLabels.RtNode.value} {{rui: $ruir}})
             CREATE (ntolackr)-[:{RelationshipLabels.ruir.value}]->(ruir)
 
             WITH ntolackr
-            MATCH (r {{rui: $r}})
+            MATCH (r:{NodeLabels.RtNode.value} {{rui: $r}})
             CREATE (ntolackr)-[:{RelationshipLabels.r.value}]->(r)
 
             WITH ntolackr
-            MERGE (tr:{NodeLabels.Temporal.value} {{rui: $tr}})
+            MERGE (tr:{NodeLabels.Temporal.value}:{NodeLabels.RtNode.value} {{rui: $tr}})
             CREATE (ntolackr)-[:{RelationshipLabels.tr.value}]->(tr)
             """, **attributes)
 
         
 
-def tuple_query(tuple_rui: Rui, driver):
+"""Maps the label of a tuple node to the constructor of its tuple type"""
+tuple_constructors = {
+    NodeLabels.AN.value: ANTuple,
+    NodeLabels.AR.value: ARTuple,
+    NodeLabels.DI.value: DITuple,
+    NodeLabels.DC.value: DCTuple,
+    NodeLabels.F.value: FTuple,
+    NodeLabels.NtoN.value: NtoNTuple,
+    NodeLabels.NtoR.value: NtoRTuple,
+    NodeLabels.NtoC.value: NtoCTuple,
+    NodeLabels.NtoDE.value: NtoDETuple,
+    NodeLabels.NtoLackR.value: NtoLackRTuple,
+}
+
+"""Components of each tuple type, whether stored as properties of its node or as relationships"""
+tuple_components = {
+    NodeLabels.AN.value: [TupleComponents.rui, TupleComponents.ar, TupleComponents.unique, TupleComponents.ruin],
+    NodeLabels.AR.value: [TupleComponents.rui, TupleComponents.ar, TupleComponents.unique, TupleComponents.ruio, TupleComponents.ruir],
+    NodeLabels.DI.value: [TupleComponents.rui, TupleComponents.t, TupleComponents.event_reason, TupleComponents.ruit,
+                          TupleComponents.ruid, TupleComponents.ruia, TupleComponents.ta],
+    NodeLabels.DC.value: [TupleComponents.rui, TupleComponents.t, TupleComponents.event_reason, TupleComponents.event,
+                          TupleComponents.ruit, TupleComponents.ruid, TupleComponents.replacements],
+    NodeLabels.F.value: [TupleComponents.rui, TupleComponents.C, TupleComponents.ruitn],
+    NodeLabels.NtoN.value: [TupleComponents.rui, TupleComponents.polarity, TupleComponents.r, TupleComponents.tr, TupleComponents.p_list],
+    NodeLabels.NtoR.value: [TupleComponents.rui, TupleComponents.polarity, TupleComponents.ruin, TupleComponents.ruir,
+                            TupleComponents.r, TupleComponents.tr],
+    NodeLabels.NtoC.value: [TupleComponents.rui, TupleComponents.polarity, TupleComponents.r, TupleComponents.ruin,
+                            TupleComponents.code, TupleComponents.ruics, TupleComponents.tr],
+    NodeLabels.NtoDE.value: [TupleComponents.rui, TupleComponents.polarity, TupleComponents.ruin, TupleComponents.data,
+                             TupleComponents.ruidt],
+    NodeLabels.NtoLackR.value: [TupleComponents.rui, TupleComponents.ruin, TupleComponents.ruir, TupleComponents.r,
+                                TupleComponents.tr],
+}
+
+"""
+Properties stored on the node of each tuple type, in the order of the admin import CSV columns.
+These are the properties set by the corresponding TupleInsertionVisitor.visit_* function.
+"""
+tuple_node_properties = {
+    TupleType.AN: ["rui", "ar", "unique"],
+    TupleType.AR: ["rui", "ar", "unique", "ruio"],
+    TupleType.DI: ["rui", "t", "event_reason", "ruia"],
+    TupleType.DC: ["rui", "t", "event_reason", "event"],
+    TupleType.F: ["rui", "C"],
+    TupleType.NtoN: ["rui", "polarity"],
+    TupleType.NtoR: ["rui", "polarity"],
+    TupleType.NtoC: ["rui", "polarity"],
+    TupleType.NtoDE: ["rui", "polarity"],
+    TupleType.NtoLackR: ["rui"],
+}
+
+class TupleDecodeError(ValueError):
+    """
+    Raised when a neo4j value cannot be converted back to the component of a tuple.
+
+    Attributes:
+        key (str): The component whose value is invalid.
+        value: The invalid neo4j value.
+    """
+
+    def __init__(self, constructor, key: str, value, error: Exception):
+        super().__init__(f"Cannot decode {key}={value!r} of a {constructor.__name__}: {error}")
+        self.key = key
+        self.value = value
+
+class TupleDecoder:
     """
-    Visits a tuple and generates a Cypher query based on the tuple's type.
-    Retrieves the data and recreates the corresponding RtTuple object.
+    Decoder of the neo4j attributes of one tuple type, built once per type.
+    It maps each attribute straight to its converter and the result to the type's constructor,
+    skipping the per-field enum lookups and dispatch of neo4j_to_rttuple.
+    """
+
+    def __init__(self, constructor, components: list[TupleComponents]):
+        self.constructor = constructor
+        self.converters = {component.value: neo4j_entry_converter[component] for component in components}
+
+    def __call__(self, attributes: dict) -> RtTuple:
+        """
+        Builds the tuple of a dictionary of neo4j attributes. Properties that are not components of the type are ignored.
+
+        Raises:
+            TupleDecodeError: If a component's value cannot be converted.
+        """
+        converters = self.converters
+        arguments = {}
+        for key, value in attributes.items():
+            if value is None:
+                continue
+            converter = converters.get(key)
+            if converter is None:
+                continue
+            try:
+                arguments[key] = converter(value)
+            except (TypeError, ValueError) as error:
+                raise TupleDecodeError(self.constructor, key, value, error) from error
+        return self.constructor(**arguments)
+
+"""Maps the label of a tuple node to the decoder of its tuple type"""
+tuple_decoders = {label: TupleDecoder(constructor, tuple_components[label]) for label, constructor in tuple_constructors.items()}
+
+"""Maps the label of a tuple node with ordered relationships to the relationship carrying the order"""
+ordered_relationships = {
+    NodeLabels.DC.value: RelationshipLabels.replacement.value,
+    NodeLabels.NtoN.value: RelationshipLabels.p_list.value,
+}
+
+"""
+Cypher fragment returning everything needed to rebuild the tuple bound to `node`: its labels, its properties
+and one entry per outgoing relationship, including the ordering properties and the Code/data designator hop.
+Relationships are collected in a subquery per node, so records can be streamed as nodes are matched.
+"""
+hydration_return = f"""
+    CALL {{
+        WITH node
+        OPTIONAL MATCH (node)-[rel]->(target)
+        OPTIONAL MATCH (target)-[:{RelationshipLabels.ruics.value}|{RelationshipLabels.ruidt.value}]->(designated)
+        RETURN collect({{
+            type: type(rel), rui: target.rui, replacements: rel.replacements, p: rel.p,
+            code: target.code, data: target.data, sha256: target.sha256, designated: designated.rui
+        }}) AS edges
+    }}
+    RETURN labels(node) AS labels, properties(node) AS properties, edges
+"""
+
+"""Fetches a single tuple node by rui together with the data needed to rebuild it"""
+tuple_lookup_query = f"""
+    MATCH (node:{NodeLabels.RtNode.value} {{rui: $rui}})
+    {hydration_return}
+"""
+
+@instrumented("record_to_rttuple")
+def record_to_rttuple(record, blob_store=None) -> RtTuple:
+    """
+    Rebuilds a tuple from a record produced by hydration_return.
+
+    Args:
+        record: A record with the labels, properties and outgoing relationships of a tuple node.
+        blob_store (BlobStore | None): The blob store holding large NtoDE payloads, if any.
+
+    Returns:
+        RtTuple: The recreated tuple.
+    """
+    labels = record["labels"]
+    label = next((label for label in labels if label in tuple_constructors), None)
+    if label is None:
+        raise ValueError(f"Unknown tuple type for labels: {labels}")
+
+    attributes = dict(record["properties"])
+    ordered_key = ordered_relationships.get(label)
+    ordered = []
+    for edge in record["edges"]:
+        rel_type = edge["type"]
+        if rel_type is None:
+            continue
+        if rel_type == ordered_key:
+            ordered.append((edge[ordered_key], edge["rui"]))
+        elif rel_type == RelationshipLabels.code.value:
+            attributes[TupleComponents.code.value] = edge["code"]
+            attributes[TupleComponents.ruics.value] = edge["designated"]
+        elif rel_type == RelationshipLabels.data.value:
+            attributes[TupleComponents.data.value] = decode_data(edge["data"], edge["sha256"], blob_store)
+            attributes[TupleComponents.ruidt.value] = edge["designated"]
+        else:
+            attributes[rel_type] = edge["rui"]
+    if ordered_key:
+        attributes[ordered_key] = [rui for _, rui in sorted(ordered, key=lambda x: x[0])]
+
+    return tuple_decoders[label](attributes)
+
+def tuple_query(tuple_rui: Rui, driver, blob_store=None, encoding: Encoding = string_encoding):
+    """
+    Retrieves the node of a tuple with its labels and outgoing relationships in a single statement
+    and recreates the corresponding RtTuple object.
     
     Args:
         tuple_rui (Rui): The Rui of the tuple to be queried.
         driver: The Neo4j database driver.
+        blob_store (BlobStore | None): The blob store holding large NtoDE payloads, if any.
+        encoding (Encoding): The encoding of the ruis in the database.
 
     Returns:
         RtTuple: The recreated tuple based on the retrieved data.
     """
-    retrieved_tuple = None
     with driver.session() as session:
         with session.begin_transaction() as tx:
-            # First, determine the label of the node by matching the rui
-            result = tx.run(f"""
-                MATCH (node {{rui: $rui}})
-                RETURN labels(node) AS labels
-            """, rui=str(tuple_rui))
-
+            result = tx.run(tuple_lookup_query, rui=encoding.rui(tuple_rui))
             record = result.single()
-            if not record:
-                raise ValueError(f"No node found for Rui: {tuple_rui}")
-
-            labels = record["labels"]
-
-            # Match the node label to the correct tuple type
-            match labels:
-                case [NodeLabels.AN.value]:
-                    retrieved_tuple = query_an(tuple_rui, tx)
-                case [NodeLabels.AR.value]:
-                    retrieved_tuple = query_ar(tuple_rui, tx)
-                case [NodeLabels.DI.value]:
-                    retrieved_tuple = query_di(tuple_rui, tx)
-                case [NodeLabels.DC.value]:
-                    retrieved_tuple = query_dc(tuple_rui, tx)
-                case [NodeLabels.F.value]:
-                    retrieved_tuple = query_f(tuple_rui, tx)
-                case [NodeLabels.NtoN.value]:
-                    retrieved_tuple = query_nton(tuple_rui, tx)
-                case [NodeLabels.NtoR.value]:
-                    retrieved_tuple = query_ntor(tuple_rui, tx)
-                case [NodeLabels.NtoC.value]:
-                    retrieved_tuple = query_ntoc(tuple_rui, tx)
-                case [NodeLabels.NtoDE.value]:
-                    retrieved_tuple = query_ntode(tuple_rui, tx)
-                case [NodeLabels.NtoLackR.value]:
-                    retrieved_tuple = query_ntolackr(tuple_rui, tx)
-                case _:
-                    raise ValueError(f"Unknown tuple type for labels: {labels}")
-    return retrieved_tuple
-
-def query_an(rui: Rui, tx):
+            record_result(result, "tuple_query")
+    if not record:
+        raise ValueError(f"No node found for Rui: {tuple_rui}")
+    return record_to_rttuple(record, blob_store)
+
+"""Fetches the tuple nodes of a list of ruis together with the data needed to rebuild them"""
+tuples_lookup_query = f"""
+    UNWIND $ruis AS rui
+    MATCH (node:{NodeLabels.RtNode.value} {{rui: rui}})
+    WHERE any(label IN labels(node) WHERE label IN $tuple_labels)
+    {hydration_return}
+"""
+
+def tuples_query(tuple_ruis, driver, batch_size: int = 1000, blob_store=None, encoding: Encoding = string_encoding) -> dict[Rui, RtTuple | None]:
+    """
+    Retrieves many tuples with one statement per batch of ruis.
+    Unlike tuple_query, ruis without a tuple node do not raise and are mapped to None instead.
+
+    Args:
+        tuple_ruis: An iterable of the Ruis of the tuples to be queried.
+        driver: The Neo4j database driver.
+        batch_size (int): The maximum number of ruis looked up per statement.
+        blob_store (BlobStore | None): The blob store holding large NtoDE payloads, if any.
+        encoding (Encoding): The encoding of the ruis in the database.
+
+    Returns:
+        dict[Rui, RtTuple | None]: The recreated tuples keyed by Rui, with None for missing tuples.
+    """
+    retrieved = {}
+    with driver.session() as session:
+        for batch in batched(tuple_ruis, batch_size):
+            requested = {encoding.rui(rui): rui for rui in batch}
+            with session.begin_transaction() as tx:
+                found = lookup_tuples(list(requested), tx, blob_store)
+            for rui_str, rui in requested.items():
+                retrieved[rui] = found.get(rui_str)
+    return retrieved
+
+def lookup_tuples(rui_strs: list[str], tx, blob_store=None) -> dict[str, RtTuple]:
+    """Retrieves the tuples of a list of neo4j ruis in a single statement, keyed by their neo4j rui"""
+    records = tx.run(tuples_lookup_query, ruis=rui_strs, tuple_labels=list(tuple_constructors))
+    return {record["properties"]["rui"]: record_to_rttuple(record, blob_store) for record in records}
+
+"""Filters a list of ruis down to those of existing nodes"""
+existing_ruis_lookup_query = f"""
+    UNWIND $ruis AS rui
+    MATCH (node:{NodeLabels.RtNode.value} {{rui: rui}})
+    RETURN DISTINCT node.rui AS rui
+"""
+
+def existing_ruis_query(rui_strs, driver, batch_size: int = 10000, encoding: Encoding = string_encoding) -> set[str]:
+    """Returns which of a collection of canonical rui strings belong to nodes already in the database"""
+    existing = set()
+    with driver.session() as session:
+        for batch in batched(rui_strs, batch_size):
+            requested = {encoding.rui(rui_str): rui_str for rui_str in batch}
+            with session.begin_transaction() as tx:
+                existing.update(requested[record["rui"]] for record in tx.run(existing_ruis_lookup_query, ruis=list(requested)))
+    return existing
+
+"""Relationships pointing from a tuple node directly at the node it refers to"""
+referring_relationships = "|".join(label.value for label in RelationshipLabels
+                                  if label not in (RelationshipLabels.ruics, RelationshipLabels.ruidt,
+                                                   RelationshipLabels.code, RelationshipLabels.data))
+
+"""
+Fetches every tuple referring to the node with a given rui, whether directly or through the Code/data
+node designating it, together with the data needed to rebuild them
+"""
+referent_lookup_query = f"""
+    MATCH (referent:{NodeLabels.RtNode.value} {{rui: $rui}})
+    CALL {{
+        WITH referent
+        MATCH (referent)<-[:{referring_relationships}]-(node:{NodeLabels.RtNode.value})
+        RETURN node
+        UNION
+        WITH referent
+        MATCH (referent)<-[:{RelationshipLabels.ruics.value}|{RelationshipLabels.ruidt.value}]-()<-[:{RelationshipLabels.code.value}|{RelationshipLabels.data.value}]-(node)
+        RETURN node
+    }}
+    WITH DISTINCT node
+    {hydration_return}
+"""
+
+def referent_query(referent_rui: Rui, driver, blob_store=None, encoding: Encoding = string_encoding):
+    """
+    Lazily retrieves every tuple referring to a referent, such as an N or R PoR node, in a single traversal.
+    Tuples are rebuilt as their records are streamed from the database, so the results need not fit in memory.
+
+    Args:
+        referent_rui (Rui): The Rui of the referent.
+        driver: The Neo4j database driver.
+        blob_store (BlobStore | None): The blob store holding large NtoDE payloads, if any.
+        encoding (Encoding): The encoding of the ruis in the database.
+
+    Yields:
+        RtTuple: The tuples referring to the referent.
+    """
+    with driver.session() as session:
+        with session.begin_transaction() as tx:
+            for record in tx.run(referent_lookup_query, rui=encoding.rui(referent_rui)):
+                yield record_to_rttuple(record, blob_store)
+
+"""Fetches a page of the DI tuples of an author, ordered by rui, with the tuples they register"""
+author_page_lookup_query = f"""
+    MATCH (di:{NodeLabels.DI.value})
+    WHERE di.ruia = $ruia AND di.rui > $after
+    WITH di ORDER BY di.rui LIMIT $limit
+    OPTIONAL MATCH (di)-[:{RelationshipLabels.ruit.value}]->(registered)
+    RETURN di.rui AS rui, registered.rui AS registered
+"""
+
+"""Counts the DI tuples of an author from the degree of the author's node"""
+author_count_lookup_query = f"""
+    MATCH (author:{NodeLabels.RtNode.value} {{rui: $ruia}})
+    RETURN COUNT {{ (author)<-[:{RelationshipLabels.ruia.value}]-() }} AS count
+"""
+
+def author_page_query(author_rui: Rui, driver, after: Rui | None = None, page_size: int = 1000, blob_store=None, encoding: Encoding = string_encoding) -> tuple[list[RtTuple], Rui | None]:
+    """
+    Retrieves one page of the DI tuples authored by a Rui, using keyset pagination on the DI rui.
+    Each DI tuple is followed in the page by the tuple it registers.
+
+    Args:
+        author_rui (Rui): The Rui of the author.
+        driver: The Neo4j database driver.
+        after (Rui | None): The cursor returned with the previous page, or None for the first page.
+        page_size (int): The maximum number of DI tuples in the page.
+        blob_store (BlobStore | None): The blob store holding large NtoDE payloads, if any.
+        encoding (Encoding): The encoding of the ruis in the database.
+
+    Returns:
+        tuple[list[RtTuple], Rui | None]: The tuples of the page and the cursor of the next page, None after the last page.
+    """
+    with driver.session() as session:
+        with session.begin_transaction() as tx:
+            rows = tx.run(author_page_lookup_query, ruia=encoding.rui(author_rui),
+                          after="" if after is None else encoding.rui(after), limit=page_size).data()
+            ruis = []
+            for row in rows:
+                ruis.append(row["rui"])
+                if row["registered"] is not None:
+                    ruis.append(row["registered"])
+            found = lookup_tuples(list(dict.fromkeys(ruis)), tx, blob_store)
+    page = [found[rui] for rui in ruis if rui in found]
+    cursor = Neo4jEntryConverter.str_to_rui(rows[-1]["rui"]) if len(rows) == page_size else None
+    return page, cursor
+
+def author_count_query(author_rui: Rui, driver, encoding: Encoding = string_encoding) -> int:
+    """Counts the DI tuples authored by a Rui without retrieving them"""
+    with driver.session() as session:
+        with session.begin_transaction() as tx:
+            record = tx.run(author_count_lookup_query, ruia=encoding.rui(author_rui)).single()
+    return record["count"] if record else 0
+
+"""
+Fetches a page of the tuples of one type, ordered by rui, with the data needed to rebuild them.
+Pages start after the rui of the previous page's last tuple, "" for the first page, so every page is a range seek
+on the type's rui index rather than a scan of the skipped tuples.
+"""
+type_page_lookup_queries = {
+    TupleType(label): f"""
+        MATCH (node:{label})
+        WHERE node.rui > $after
+        WITH node ORDER BY node.rui LIMIT $limit
+        {hydration_return}
+    """ for label in tuple_constructors
+}
+
+def type_page_query(tuple_type: TupleType, driver, after: Rui | None = None, page_size: int = 1000, blob_store=None, encoding: Encoding = string_encoding) -> tuple[list[RtTuple], Rui | None]:
+    """
+    Retrieves one page of the tuples of a type, using keyset pagination on the tuple rui.
+
+    Args:
+        tuple_type (TupleType): The type of the tuples.
+        driver: The Neo4j database driver.
+        after (Rui | None): The cursor returned with the previous page, or None for the first page.
+        page_size (int): The maximum number of tuples in the page.
+        blob_store (BlobStore | None): The blob store holding large NtoDE payloads, if any.
+        encoding (Encoding): The encoding of the ruis in the database.
+
+    Returns:
+        tuple[list[RtTuple], Rui | None]: The tuples of the page and the cursor of the next page, None after the last page.
+    """
+    with driver.session() as session:
+        with session.begin_transaction() as tx:
+            records = list(tx.run(type_page_lookup_queries[tuple_type], after="" if after is None else encoding.rui(after), limit=page_size))
+    page = [record_to_rttuple(record, blob_store) for record in records]
+    cursor = Neo4jEntryConverter.str_to_rui(records[-1]["properties"]["rui"]) if len(records) == page_size else None
+    return page, cursor
+
+"""Fetches the designation tuples whose designator of a given type has a given text, one statement per tuple type"""
+designator_lookup_queries = {
+    TupleType.NtoC: f"""
+        MATCH (:{NodeLabels.Code.value} {{ruics: $designator_type, code: $designator}})<-[:{RelationshipLabels.code.value}]-(node:{NodeLabels.NtoC.value})
+        {hydration_return}
+    """,
+    TupleType.NtoDE: f"""
+        MATCH (:{NodeLabels.Data.value} {{ruidt: $designator_type, sha256: $designator}})<-[:{RelationshipLabels.data.value}]-(node:{NodeLabels.NtoDE.value})
+        {hydration_return}
+    """,
+}
+
+def designator_query(referent_type: TupleType, designator_type: Rui, designator_text, driver, blob_store=None, encoding: Encoding = string_encoding) -> set[RtTuple]:
+    """
+    Retrieves the designation tuples whose designator, a code or a piece of data, has the given type and text.
+
+    Args:
+        referent_type (TupleType): The type of the designation tuples, NtoC for codes or NtoDE for data.
+        designator_type (Rui): The Rui of the designator type, the tuples' ruics or ruidt.
+        designator_text (str | bytes): The code, or the data, of the designator.
+        driver: The Neo4j database driver.
+        blob_store (BlobStore | None): The blob store holding large NtoDE payloads, if any.
+        encoding (Encoding): The encoding of the ruis in the database.
+
+    Returns:
+        set[RtTuple]: The matching tuples.
+    """
+    if referent_type not in designator_lookup_queries:
+        raise ValueError(f"Tuples of type {referent_type} have no designator")
+    if referent_type == TupleType.NtoDE:
+        designator_text = hashlib.sha256(designator_text).hexdigest()
+    with driver.session() as session:
+        with session.begin_transaction() as tx:
+            records = tx.run(designator_lookup_queries[referent_type],
+                             designator_type=encoding.rui(designator_type), designator=designator_text)
+            return {record_to_rttuple(record, blob_store) for record in records}
+
+@instrumented("query_an")
+def query_an(rui: Rui, tx, encoding: Encoding = string_encoding):
     result = tx.run(f"""
         MATCH (an:{NodeLabels.AN.value} {{rui: $rui}})
         OPTIONAL MATCH (an)-[:{RelationshipLabels.ruin.value}]->(npor:{NodeLabels.NPoR.value})
         RETURN an.ar AS ar, an.unique AS unique, an.rui AS rui, npor.rui AS ruin
-    """, rui=str(rui))
+    """, rui=encoding.rui(rui))
     
     record = result.single()
+    record_result(result, "query_an")
     if record:
-        return ANTuple(**neo4j_to_rttuple(record))
+        return tuple_decoders[NodeLabels.AN.value](record)
     return None
 
-def query_ar(rui: Rui, tx):
+@instrumented("query_ar")
+def query_ar(rui: Rui, tx, encoding: Encoding = string_encoding):
     result = tx.run(f"""
         MATCH (ar:{NodeLabels.AR.value} {{rui: $rui}})
         OPTIONAL MATCH (ar)-[:{RelationshipLabels.ruir.value}]->(rpor:{NodeLabels.RPoR.value})
         RETURN ar.ar AS ar, ar.unique AS unique, ar.ruio AS ruio, ar.rui AS rui, rpor.rui AS ruir
-    """, rui=str(rui))
+    """, rui=encoding.rui(rui))
     
     record = result.single()
+    record_result(result, "query_ar")
     if record:
-        return ARTuple(**neo4j_to_rttuple(record))
+        return tuple_decoders[NodeLabels.AR.value](record)
     return None
 
-def query_di(rui: Rui, tx):
+@instrumented("query_di")
+def query_di(rui: Rui, tx, encoding: Encoding = string_encoding):
     result = tx.run(f"""
         MATCH (di:{NodeLabels.DI.value} {{rui: $rui}})
         OPTIONAL MATCH (di)-[:{RelationshipLabels.ruit.value}]->(ruit)
@@ -545,14 +967,16 @@ def query_di(rui: Rui, tx):
         OPTIONAL MATCH (di)-[:{RelationshipLabels.ta.value}]->(ta)
         RETURN di.t AS t, di.event_reason AS event_reason, di.rui AS rui, ta.rui AS ta,
                ruit.rui AS ruit, ruid.rui AS ruid, ruia.rui AS ruia
-    """, rui=str(rui))
+    """, rui=encoding.rui(rui))
     
     record = result.single()
+    record_result(result, "query_di")
     if record:
-        return DITuple(**neo4j_to_rttuple(record))
+        return tuple_decoders[NodeLabels.DI.value](record)
     return None
 
-def query_dc(rui: Rui, tx):
+@instrumented("query_dc")
+def query_dc(rui: Rui, tx, encoding: Encoding = string_encoding):
     result = tx.run(f"""
         MATCH (dc:{NodeLabels.DC.value} {{rui: $rui}})
         OPTIONAL MATCH (dc)-[:{RelationshipLabels.ruit.value}]->(ruit)
@@ -561,9 +985,10 @@ def query_dc(rui: Rui, tx):
         RETURN dc.t AS t, dc.event_reason AS event_reason, dc.event AS event, dc.rui AS rui,
                ruit.rui AS ruit, ruid.rui AS ruid, replacement.rui AS replacement_rui, rel.replacements AS replacements
         ORDER BY rel.replacements
-    """, rui=str(rui))
+    """, rui=encoding.rui(rui))
 
     records = result.data()
+    record_result(result, "query_dc")
 
     if records:
         first_record = records[0]  
@@ -584,24 +1009,27 @@ def query_dc(rui: Rui, tx):
             "replacements": ordered_replacements  
         }
 
-        return DCTuple(**neo4j_to_rttuple(attributes))
+        return tuple_decoders[NodeLabels.DC.value](attributes)
 
     return None
 
 
-def query_f(rui: Rui, tx):
+@instrumented("query_f")
+def query_f(rui: Rui, tx, encoding: Encoding = string_encoding):
     result = tx.run(f"""
         MATCH (f:{NodeLabels.F.value} {{rui: $rui}})
         OPTIONAL MATCH (f)-[:{RelationshipLabels.ruitn.value}]->(ruitn)
         RETURN f.C AS C, f.rui AS rui, ruitn.rui as ruitn
-    """, rui=str(rui))
+    """, rui=encoding.rui(rui))
     
     record = result.single()
+    record_result(result, "query_f")
     if record:
-        return FTuple(**neo4j_to_rttuple(record))
+        return tuple_decoders[NodeLabels.F.value](record)
     return None
 
-def query_nton(rui: Rui, tx):
+@instrumented("query_nton")
+def query_nton(rui: Rui, tx, encoding: Encoding = string_encoding):
     result = tx.run(f"""
         MATCH (nton:{NodeLabels.NtoN.value} {{rui: $rui}})
         OPTIONAL MATCH (nton)-[:{RelationshipLabels.r.value}]->(r)
@@ -609,9 +1037,10 @@ def query_nton(rui: Rui, tx):
         OPTIONAL MATCH (nton)-[rel:{RelationshipLabels.p_list.value}]->(p)
         RETURN nton.polarity AS polarity, nton.rui AS rui, r.rui AS r, tr.rui AS tr, p.rui AS p_rui, rel.p AS p
         ORDER BY p
-    """, rui=str(rui))
+    """, rui=encoding.rui(rui))
 
     records = result.data()
+    record_result(result, "query_nton")
 
     if records:
         first_record = records[0]
@@ -633,11 +1062,12 @@ def query_nton(rui: Rui, tx):
             "p": ordered_p_list
         }
 
-        return NtoNTuple(**neo4j_to_rttuple(attributes))
+        return tuple_decoders[NodeLabels.NtoN.value](attributes)
     return None
 
 
-def query_ntor(rui: Rui, tx):
+@instrumented("query_ntor")
+def query_ntor(rui: Rui, tx, encoding: Encoding = string_encoding):
     result = tx.run(f"""
         MATCH (ntor:{NodeLabels.NtoR.value} {{rui: $rui}})
         OPTIONAL MATCH (ntor)-[:{RelationshipLabels.ruin.value}]->(ruin)
@@ -645,15 +1075,17 @@ def query_ntor(rui: Rui, tx):
         OPTIONAL MATCH (ntor)-[:{RelationshipLabels.r.value}]->(r)
         OPTIONAL MATCH (ntor)-[:{RelationshipLabels.tr.value}]->(tr)
         RETURN ntor.polarity AS polarity, ntor.rui AS rui, ruin.rui AS ruin, ruir.rui AS ruir, tr.rui AS tr, r.rui AS r
-    """, rui=str(rui))
+    """, rui=encoding.rui(rui))
 
     record = result.single()
+    record_result(result, "query_ntor")
     if record:
-        return NtoRTuple(**neo4j_to_rttuple(record))
+        return tuple_decoders[NodeLabels.NtoR.value](record)
     return None
 
 
-def query_ntolackr(rui: Rui, tx):
+@instrumented("query_ntolackr")
+def query_ntolackr(rui: Rui, tx, encoding: Encoding = string_encoding):
     result = tx.run(f"""
         MATCH (ntolackr:{NodeLabels.NtoLackR.value} {{rui: $rui}})
         OPTIONAL MATCH (ntolackr)-[:{RelationshipLabels.ruin.value}]->(ruin)
@@ -661,15 +1093,17 @@ def query_ntolackr(rui: Rui, tx):
         OPTIONAL MATCH (ntolackr)-[:{RelationshipLabels.r.value}]->(r)
         OPTIONAL MATCH (ntolackr)-[:{RelationshipLabels.tr.value}]->(tr)
         RETURN ntolackr.rui AS rui, ruin.rui AS ruin, ruir.rui AS ruir, tr.rui AS tr, r.rui AS r
-    """, rui=str(rui))
+    """, rui=encoding.rui(rui))
 
     record = result.single()
+    record_result(result, "query_ntolackr")
     if record:
-        return NtoLackRTuple(**neo4j_to_rttuple(record))
+        return tuple_decoders[NodeLabels.NtoLackR.value](record)
     return None
 
 
-def query_ntoc(rui: Rui, tx):
+@instrumented("query_ntoc")
+def query_ntoc(rui: Rui, tx, encoding: Encoding = string_encoding):
     result = tx.run(f"""
         MATCH (ntoc:{NodeLabels.NtoC.value} {{rui: $rui}})
         OPTIONAL MATCH (ntoc)-[:{RelationshipLabels.r.value}]->(r)
@@ -678,38 +1112,48 @@ def query_ntoc(rui: Rui, tx):
         OPTIONAL MATCH (ntoc)-[:{RelationshipLabels.tr.value}]->(tr)
         RETURN ntoc.polarity AS polarity, ntoc.rui AS rui, r.rui AS r, ruin.rui AS ruin, 
                code_node.code AS code, ruics.rui AS ruics, tr.rui AS tr
-    """, rui=str(rui))
+    """, rui=encoding.rui(rui))
 
     record = result.single()
+    record_result(result, "query_ntoc")
 
     if record:
-        return NtoCTuple(**neo4j_to_rttuple(record))
+        return tuple_decoders[NodeLabels.NtoC.value](record)
 
     return None
 
 
-def query_ntode(rui: Rui, tx):
-    #TODO Not properly retrieving the data
+@instrumented("query_ntode")
+def query_ntode(rui: Rui, tx, blob_store=None, encoding: Encoding = string_encoding):
     result = tx.run(f"""
         MATCH (ntode:{NodeLabels.NtoDE.value} {{rui: $rui}})
         OPTIONAL MATCH (ntode)-[:{RelationshipLabels.ruin.value}]->(ruin)
         OPTIONAL MATCH (ntode)-[:{RelationshipLabels.data.value}]->(data_node)-[:{RelationshipLabels.ruidt.value}]->(ruidt)
         RETURN ntode.polarity AS polarity, ntode.rui AS rui, ruin.rui AS ruin, 
-               data_node.data AS data, ruidt.rui AS ruidt
-    """, rui=str(rui))
+               data_node.data AS data, data_node.sha256 AS sha256, ruidt.rui AS ruidt
+    """, rui=encoding.rui(rui))
 
     record = result.single()
-    print(record["data"])
+    record_result(result, "query_ntode")
     if record:
         record_dict = dict(record)
+        record_dict[TupleComponents.data.value] = decode_data(record_dict[TupleComponents.data.value], record_dict.pop("sha256"), blob_store)
 
-        return NtoDETuple(**neo4j_to_rttuple(record_dict))
+        return tuple_decoders[NodeLabels.NtoDE.value](record_dict)
 
     return None
 
 
 
 
+"""Yields successive lists of at most batch_size entries from an iterable"""
+def batched(iterable, batch_size: int):
+    if batch_size < 1:
+        raise ValueError(f"Batch size must be positive, got: {batch_size}")
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
 """Removes a key from a dictionary and returns the value"""
 def pop_key(dict, key):
     value = dict[key]
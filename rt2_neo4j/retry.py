@@ -0,0 +1,290 @@
+from typing import Callable
+import asyncio
+import random
+import threading
+import time
+
+"""Codes of the transient errors caused by lock contention, with the counter of RetryMetrics they are recorded in"""
+contention_codes = {
+    "Neo.TransientError.Transaction.DeadlockDetected": "deadlocks",
+    "Neo.TransientError.Transaction.LockAcquisitionTimeout": "lock_timeouts",
+    "Neo.TransientError.Transaction.LockClientStopped": "lock_timeouts",
+}
+
+def is_retryable(error: Exception) -> bool:
+    """Returns whether the driver considers an error transient, such as a deadlock or a lost connection"""
+    retryable = getattr(error, "is_retryable", None)
+    return callable(retryable) and retryable()
+
+def error_kind(error: Exception) -> str:
+    """Returns the counter of RetryMetrics a transient error is recorded in"""
+    return contention_codes.get(getattr(error, "code", None), "transient_errors")
+
+class TransientWriteError(Exception):
+    """
+    Wraps a transient error raised inside a transaction function, so that it leaves execute_write
+    at once instead of being retried by the driver with its own fixed backoff.
+
+    Attributes:
+        error (Exception): The transient error.
+    """
+
+    def __init__(self, error: Exception):
+        super().__init__(str(error))
+        self.error = error
+
+class PartialWriteError(Exception):
+    """
+    Raised by RetryPolicy.write when a split batch failed after some of its parts were committed.
+    Parts are written in batch order and writing stops at the first failure, so the committed tuples are a prefix of the batch.
+
+    Attributes:
+        error (Exception): The error of the part that failed.
+        results (list): The results of the transaction functions of the committed parts, in batch order.
+        committed (list): The tuples that were written.
+        remaining (list): The tuples that were not written.
+    """
+
+    def __init__(self, error: Exception, results: list, committed: list, remaining: list):
+        super().__init__(f"{len(committed)} tuples were written before the write failed: {error}")
+        self.error = error
+        self.results = results
+        self.committed = committed
+        self.remaining = remaining
+
+def combine_halves(error: Exception, first_results: list, first: list, second: list) -> PartialWriteError:
+    """Builds the PartialWriteError of a split batch whose first half was committed and whose second half failed"""
+    if isinstance(error, PartialWriteError):
+        return PartialWriteError(error.error, first_results + error.results, first + error.committed, error.remaining)
+    return PartialWriteError(error, first_results, first, second)
+
+class RetryMetrics:
+    """
+    Counters of the writes made through a RetryPolicy.
+
+    Attributes:
+        attempts (int): The transactions attempted, retries included.
+        retries (int): The transactions attempted again after a transient error.
+        failures (int): The transactions given up on after max_attempts.
+        splits (int): The batches split in two after their retries were exhausted.
+        deadlocks (int): The attempts that failed with a deadlock.
+        lock_timeouts (int): The attempts that failed waiting for a lock.
+        transient_errors (int): The attempts that failed with another transient error, such as a lost connection.
+        backoff_seconds (float): The total time spent waiting between attempts.
+    """
+
+    counters = ["attempts", "retries", "failures", "splits", "deadlocks", "lock_timeouts", "transient_errors", "backoff_seconds"]
+
+    def __init__(self):
+        for counter in self.counters:
+            setattr(self, counter, 0)
+
+    def add(self, other: "RetryMetrics"):
+        """Adds the counters of another RetryMetrics instance to this one"""
+        for counter in self.counters:
+            setattr(self, counter, getattr(self, counter) + getattr(other, counter))
+
+    def copy(self) -> "RetryMetrics":
+        metrics = RetryMetrics()
+        metrics.add(self)
+        return metrics
+
+    def contention_rate(self) -> float:
+        """Returns the share of attempts that failed on a deadlock or a lock timeout"""
+        return (self.deadlocks + self.lock_timeouts) / self.attempts if self.attempts else 0.0
+
+    def __repr__(self):
+        return "RetryMetrics(" + ", ".join(f"{counter}={getattr(self, counter)}" for counter in self.counters) + ")"
+
+class RetryPolicy:
+    """
+    Runs write transactions as managed transactions (execute_write), retrying transient errors with
+    exponential backoff and jitter, and splitting batches that keep failing.
+
+    The n-th retry waits min(max_delay, initial_delay * multiplier ** n) seconds, scaled by a random factor
+    between 1 - jitter and 1 + jitter so that writers that collided do not collide again. Non-transient errors,
+    such as constraint violations, are raised at once. The counters of every write are kept in metrics.
+    """
+
+    def __init__(self, max_attempts: int = 5, initial_delay: float = 0.05, multiplier: float = 2.0,
+                 max_delay: float = 2.0, jitter: float = 0.5, min_split_size: int = 1,
+                 sleep: Callable[[float], object] = time.sleep, random: Callable[[], float] = random.random):
+        """
+        Initializes a RetryPolicy instance.
+
+        Args:
+            max_attempts (int): The maximum number of attempts of a transaction.
+            initial_delay (float): The number of seconds waited before the first retry.
+            multiplier (float): The factor the delay grows by after each retry.
+            max_delay (float): The maximum number of seconds waited between attempts.
+            jitter (float): The relative amount of randomness added to each delay, between 0 and 1.
+            min_split_size (int): Batches of at most this many tuples are not split any further.
+            sleep (Callable[[float], object]): Waits a number of seconds.
+            random (Callable[[], float]): Returns a random number between 0 and 1.
+        """
+        if max_attempts < 1:
+            raise ValueError("A transaction must be attempted at least once")
+        if not 0 <= jitter <= 1:
+            raise ValueError("Jitter must be between 0 and 1")
+        self.max_attempts = max_attempts
+        self.initial_delay = initial_delay
+        self.multiplier = multiplier
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.min_split_size = min_split_size
+        self.sleep = sleep
+        self.random = random
+        self.metrics = RetryMetrics()
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        # Policies are sent to worker processes without their lock and counters
+        state = dict(self.__dict__)
+        del state["lock"], state["metrics"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.metrics = RetryMetrics()
+        self.lock = threading.Lock()
+
+    def delay(self, retry: int) -> float:
+        """Returns the number of seconds to wait before a retry, counting from 0"""
+        delay = min(self.max_delay, self.initial_delay * self.multiplier ** retry)
+        return delay * (1 - self.jitter + 2 * self.jitter * self.random())
+
+    def record(self, counter: str, amount: float = 1):
+        with self.lock:
+            setattr(self.metrics, counter, getattr(self.metrics, counter) + amount)
+
+    def stats(self) -> RetryMetrics:
+        """Returns a snapshot of the counters"""
+        with self.lock:
+            return self.metrics.copy()
+
+    def take_stats(self) -> RetryMetrics:
+        """Returns the counters and resets them"""
+        with self.lock:
+            metrics, self.metrics = self.metrics, RetryMetrics()
+        return metrics
+
+    @staticmethod
+    def managed(work: Callable) -> Callable:
+        def transaction_function(tx, *args):
+            try:
+                return work(tx, *args)
+            except Exception as error:
+                if is_retryable(error):
+                    raise TransientWriteError(error) from error
+                raise
+        return transaction_function
+
+    def failed(self, error: Exception, attempt: int) -> float | None:
+        """Records a failed attempt and returns the delay before the next one, or None if the error is final"""
+        if not is_retryable(error):
+            return None
+        self.record(error_kind(error))
+        if attempt + 1 >= self.max_attempts:
+            self.record("failures")
+            return None
+        delay = self.delay(attempt)
+        self.record("retries")
+        self.record("backoff_seconds", delay)
+        return delay
+
+    def execute_write(self, session, work: Callable, *args):
+        """
+        Runs work(tx, *args) in a managed write transaction of a session, retrying it on transient errors.
+
+        Args:
+            session: The session the transaction is run in.
+            work (Callable): The transaction function.
+            *args: The arguments passed to the transaction function after the transaction.
+
+        Returns:
+            The result of the transaction function.
+        """
+        transaction_function = self.managed(work)
+        for attempt in range(self.max_attempts):
+            self.record("attempts")
+            try:
+                return session.execute_write(transaction_function, *args)
+            except Exception as wrapped:
+                error = wrapped.error if isinstance(wrapped, TransientWriteError) else wrapped
+                delay = self.failed(error, attempt)
+                if delay is None:
+                    raise error
+            self.sleep(delay)
+
+    def write(self, session, work: Callable, batch: list, split: bool = True):
+        """
+        Runs work(tx, batch) in a managed write transaction, retrying it on transient errors.
+        If the retries are exhausted and split is True, the batch is split in two halves written separately,
+        down to batches of min_split_size tuples.
+
+        Args:
+            session: The session the transactions are run in.
+            work (Callable): The transaction function writing a batch.
+            batch (list): The tuples to be written.
+            split (bool): Whether a batch that keeps failing may be written in several transactions.
+
+        Returns:
+            list: The results of the transaction functions of the committed transactions, in batch order.
+
+        Raises:
+            PartialWriteError: If a part of a split batch failed after earlier parts were committed.
+        """
+        try:
+            return [self.execute_write(session, work, batch)]
+        except Exception as error:
+            if not split or not is_retryable(error) or len(batch) <= self.min_split_size:
+                raise
+            self.record("splits")
+            middle = len(batch) // 2
+        try:
+            first = self.write(session, work, batch[:middle], split)
+        except PartialWriteError as partial:
+            raise PartialWriteError(partial.error, partial.results, partial.committed, partial.remaining + batch[middle:]) from partial.error
+        try:
+            return first + self.write(session, work, batch[middle:], split)
+        except Exception as error:
+            raise combine_halves(error, first, batch[:middle], batch[middle:]) from error
+
+    async def execute_write_async(self, session, work: Callable, *args):
+        """Async counterpart of execute_write, for async sessions and async transaction functions"""
+        async def transaction_function(tx, *args):
+            try:
+                return await work(tx, *args)
+            except Exception as error:
+                if is_retryable(error):
+                    raise TransientWriteError(error) from error
+                raise
+
+        for attempt in range(self.max_attempts):
+            self.record("attempts")
+            try:
+                return await session.execute_write(transaction_function, *args)
+            except Exception as wrapped:
+                error = wrapped.error if isinstance(wrapped, TransientWriteError) else wrapped
+                delay = self.failed(error, attempt)
+                if delay is None:
+                    raise error
+            await asyncio.sleep(delay)
+
+    async def write_async(self, session, work: Callable, batch: list, split: bool = True):
+        """Async counterpart of write"""
+        try:
+            return [await self.execute_write_async(session, work, batch)]
+        except Exception as error:
+            if not split or not is_retryable(error) or len(batch) <= self.min_split_size:
+                raise
+            self.record("splits")
+            middle = len(batch) // 2
+        try:
+            first = await self.write_async(session, work, batch[:middle], split)
+        except PartialWriteError as partial:
+            raise PartialWriteError(partial.error, partial.results, partial.committed, partial.remaining + batch[middle:]) from partial.error
+        try:
+            return first + await self.write_async(session, work, batch[middle:], split)
+        except Exception as error:
+            raise combine_halves(error, first, batch[:middle], batch[middle:]) from error
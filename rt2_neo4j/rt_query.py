@@ -0,0 +1,355 @@
+from rt_core_v2.ids_codes.rui import Rui
+from rt_core_v2.rttuple import RtTuple, TupleType
+from rt2_neo4j.queries import NodeLabels, RelationshipLabels, hydration_return, record_to_rttuple, tuple_constructors, tuple_node_properties
+from rt2_neo4j.cypher import CypherQuery
+from rt2_neo4j.encoding import Encoding, string_encoding
+from typing import Callable, Iterable, Iterator
+import copy
+import hashlib
+import operator
+
+"""Properties stored on tuple nodes, the only components conditions and orderings may name"""
+node_properties = {prop for properties in tuple_node_properties.values() for prop in properties}
+
+"""Comparison operators of property conditions, with their Python counterparts used by RtQuery.evaluate"""
+comparison_operators = {
+    "=": operator.eq,
+    "<>": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "IN": lambda left, right: left in right,
+    "STARTS WITH": lambda left, right: left.startswith(right),
+    "ENDS WITH": lambda left, right: left.endswith(right),
+    "CONTAINS": lambda left, right: right in left,
+}
+
+def component_value(tup: RtTuple, relationship: RelationshipLabels):
+    """Returns the component of a tuple that a relationship is created from, as a list"""
+    value = getattr(tup, relationship.value, None)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+class PropertyCondition:
+    """Compares a property of the tuple node with a value"""
+
+    def __init__(self, component: str, comparison: str, value):
+        if component not in node_properties:
+            raise ValueError(f"{component} is not stored on tuple nodes; use refers_to for references")
+        if comparison not in comparison_operators:
+            raise ValueError(f"Unsupported comparison operator: {comparison}")
+        self.component = component
+        self.comparison = comparison
+        self.value = value
+
+    def pattern(self, parameter: str) -> tuple[str | None, str | None]:
+        return None, f"node.{self.component} {self.comparison} ${parameter}"
+
+    def parameter(self, encoding: Encoding):
+        return encoding.value(self.value)
+
+    def matches(self, tup: RtTuple, lookup: Callable[[Rui], RtTuple | None]) -> bool:
+        left = string_encoding.value(getattr(tup, self.component, None))
+        if left is None:
+            return False
+        return comparison_operators[self.comparison](left, string_encoding.value(self.value))
+
+class ReferenceCondition:
+    """Requires a relationship between the tuple node and the node of a rui, outgoing unless incoming is True"""
+
+    def __init__(self, relationship: RelationshipLabels, value, incoming: bool = False):
+        if not isinstance(relationship, RelationshipLabels):
+            raise ValueError(f"Unknown relationship: {relationship}")
+        self.relationship = relationship
+        self.value = value
+        self.incoming = incoming
+
+    def pattern(self, parameter: str) -> tuple[str | None, str | None]:
+        target = f"(:{NodeLabels.RtNode.value} {{rui: ${parameter}}})"
+        if self.incoming:
+            return f"MATCH (node)<-[:{self.relationship.value}]-{target}", None
+        return f"MATCH (node)-[:{self.relationship.value}]->{target}", None
+
+    def parameter(self, encoding: Encoding):
+        return encoding.value(self.value)
+
+    def matches(self, tup: RtTuple, lookup: Callable[[Rui], RtTuple | None]) -> bool:
+        if self.incoming:
+            source = lookup(self.value)
+            return source is not None and str(tup.rui) in {str(entry) for entry in component_value(source, self.relationship)}
+        return str(self.value) in {str(entry) for entry in component_value(tup, self.relationship)}
+
+class DesignatorCondition:
+    """Requires the tuple node's Code or data node to have a designator type and a code or payload"""
+
+    def __init__(self, designator_type, designator):
+        self.designator_type = designator_type
+        self.designator = designator
+        if isinstance(designator, bytes):
+            self.relationship, self.label, self.type_key, self.key = RelationshipLabels.data, NodeLabels.Data, "ruidt", "sha256"
+        else:
+            self.relationship, self.label, self.type_key, self.key = RelationshipLabels.code, NodeLabels.Code, "ruics", "code"
+
+    def digest(self):
+        return hashlib.sha256(self.designator).hexdigest() if isinstance(self.designator, bytes) else self.designator
+
+    def pattern(self, parameter: str) -> tuple[str | None, str | None]:
+        target = f"(:{self.label.value} {{{self.type_key}: ${parameter}.type, {self.key}: ${parameter}.designator}})"
+        return f"MATCH (node)-[:{self.relationship.value}]->{target}", None
+
+    def parameter(self, encoding: Encoding):
+        return {"type": encoding.rui(self.designator_type), "designator": self.digest()}
+
+    def matches(self, tup: RtTuple, lookup: Callable[[Rui], RtTuple | None]) -> bool:
+        if str(getattr(tup, self.type_key, None)) != str(self.designator_type):
+            return False
+        return getattr(tup, self.relationship.value, None) == self.designator
+
+class RtQuery(CypherQuery):
+    """
+    Composable query over tuple nodes, compiled to parameterized Cypher that hydrates the matched tuples.
+
+    Every method returns a new query, so partial queries can be shared and extended. Conditions are combined
+    with AND. Values are sent as parameters named after their position, so queries of the same shape render
+    the same text and reuse the same cached plan.
+
+    Example:
+        RtQuery(TupleType.DI).refers_to(RelationshipLabels.ruia, author).where("t", ">=", since).order_by("t").limit(100)
+    """
+
+    def __init__(self, *tuple_types: TupleType):
+        """
+        Initializes an RtQuery instance.
+
+        Args:
+            *tuple_types (TupleType): The types of the matched tuples, every type if none is given.
+        """
+        self.tuple_types = list(tuple_types)
+        self.conditions = []
+        self.ordering = None
+        self.cursor = None
+        self.skip_count = None
+        self.limit_count = None
+
+    def extend(self, **changes) -> "RtQuery":
+        query = copy.copy(self)
+        query.conditions = list(self.conditions)
+        for key, value in changes.items():
+            setattr(query, key, value)
+        return query
+
+    def where(self, component: str, comparison: str, value) -> "RtQuery":
+        """Keeps the tuples whose node property compares to a value, e.g. where("C", ">", 0.5)"""
+        query = self.extend()
+        query.conditions.append(PropertyCondition(component, comparison, value))
+        return query
+
+    def refers_to(self, relationship: RelationshipLabels, value) -> "RtQuery":
+        """Keeps the tuples with a relationship to the node of a rui or temporal reference"""
+        query = self.extend()
+        query.conditions.append(ReferenceCondition(relationship, value))
+        return query
+
+    def referred_by(self, relationship: RelationshipLabels, rui: Rui) -> "RtQuery":
+        """Keeps the tuples the tuple of a rui has a relationship to"""
+        query = self.extend()
+        query.conditions.append(ReferenceCondition(relationship, rui, incoming=True))
+        return query
+
+    def designated_by(self, designator_type: Rui, designator) -> "RtQuery":
+        """Keeps the NtoC tuples of a code, or the NtoDE tuples of a payload, with a designator type"""
+        query = self.extend()
+        query.conditions.append(DesignatorCondition(designator_type, designator))
+        return query
+
+    def order_by(self, component: str = "rui", descending: bool = False) -> "RtQuery":
+        """Orders the tuples by a node property"""
+        if component not in node_properties:
+            raise ValueError(f"{component} is not stored on tuple nodes")
+        return self.extend(ordering=(component, descending))
+
+    def after(self, rui: Rui | None) -> "RtQuery":
+        """Keeps the tuples whose rui comes after a cursor, in rui order, for keyset pagination"""
+        return self.extend(cursor=rui, ordering=("rui", False))
+
+    def skip(self, count: int) -> "RtQuery":
+        return self.extend(skip_count=count)
+
+    def limit(self, count: int) -> "RtQuery":
+        return self.extend(limit_count=count)
+
+    def compile(self, encoding: Encoding = string_encoding) -> tuple[str, dict]:
+        """
+        Compiles the query to Cypher.
+
+        Args:
+            encoding (Encoding): The encoding of the values in the database.
+
+        Returns:
+            tuple[str, dict]: The query text and its parameters.
+        """
+        labels = [tuple_type.value for tuple_type in self.tuple_types] or list(tuple_constructors)
+        lines = [f"MATCH (node:{'|'.join(labels)})"]
+        filters = []
+        parameters = {}
+        for idx, condition in enumerate(self.conditions):
+            name = f"p{idx}"
+            pattern, predicate = condition.pattern(name)
+            if pattern:
+                lines.append(pattern)
+            if predicate:
+                filters.append(predicate)
+            parameters[name] = condition.parameter(encoding)
+        if self.cursor is not None:
+            filters.append("node.rui > $after")
+            parameters["after"] = encoding.rui(self.cursor)
+        if filters:
+            lines.append("WHERE " + " AND ".join(filters))
+        projection = "WITH DISTINCT node"
+        if self.ordering:
+            component, descending = self.ordering
+            projection += f" ORDER BY node.{component}{' DESC' if descending else ''}"
+        if self.skip_count is not None:
+            projection += " SKIP $skip"
+            parameters["skip"] = self.skip_count
+        if self.limit_count is not None:
+            projection += " LIMIT $limit"
+            parameters["limit"] = self.limit_count
+        lines.append(projection)
+        lines.append(hydration_return)
+        return "\n".join(lines), parameters
+
+    def get_query(self):
+        return self.compile()[0]
+
+    def get_parameters(self, encoding: Encoding = string_encoding) -> dict:
+        return self.compile(encoding)[1]
+
+    def run(self, tx, encoding: Encoding = string_encoding):
+        return tx.run(*self.compile(encoding))
+
+    def evaluate(self, tuples: Iterable[RtTuple], lookup: Callable[[Rui], RtTuple | None]) -> list[RtTuple]:
+        """
+        Applies the query to tuples in memory, with the same semantics as the compiled Cypher.
+
+        Args:
+            tuples (Iterable[RtTuple]): The candidate tuples.
+            lookup (Callable[[Rui], RtTuple | None]): Returns the tuple of a rui, used by referred_by conditions.
+
+        Returns:
+            list[RtTuple]: The matching tuples, in the query's order.
+        """
+        types = set(self.tuple_types)
+        matched = [tup for tup in tuples if (not types or tup.tuple_type in types)
+                   and all(condition.matches(tup, lookup) for condition in self.conditions)]
+        if self.cursor is not None:
+            matched = [tup for tup in matched if str(tup.rui) > str(self.cursor)]
+        if self.ordering:
+            component, descending = self.ordering
+            # Tuples without the property sort last, like nulls in Cypher
+            present = [tup for tup in matched if getattr(tup, component, None) is not None]
+            absent = [tup for tup in matched if getattr(tup, component, None) is None]
+            present.sort(key=lambda tup: string_encoding.value(getattr(tup, component)), reverse=descending)
+            matched = absent + present if descending else present + absent
+        start = self.skip_count or 0
+        end = None if self.limit_count is None else start + self.limit_count
+        return matched[start:end]
+
+def iter_query(query: RtQuery, driver, blob_store=None, encoding: Encoding = string_encoding) -> Iterator[RtTuple]:
+    """
+    Lazily retrieves the tuples matched by a query, in the query's order.
+
+    Args:
+        query (RtQuery): The query.
+        driver: The Neo4j database driver.
+        blob_store (BlobStore | None): The blob store holding large NtoDE payloads, if any.
+        encoding (Encoding): The encoding of the values in the database.
+
+    Yields:
+        RtTuple: The matched tuples.
+    """
+    with driver.session() as session:
+        with session.begin_transaction() as tx:
+            for record in query.run(tx, encoding):
+                yield record_to_rttuple(record, blob_store)
+
+def run_query(query: RtQuery, driver, blob_store=None, encoding: Encoding = string_encoding) -> set[RtTuple]:
+    """Retrieves the tuples matched by a query"""
+    return set(iter_query(query, driver, blob_store, encoding))
+
+class QueryPlan:
+    """
+    Operator tree of a query plan, as returned by EXPLAIN, or by PROFILE with the rows and db hits of each operator.
+
+    Attributes:
+        operator (str): The name of the operator.
+        arguments (dict): The operator's details, such as its estimated rows or the index it uses.
+        identifiers (list[str]): The variables the operator produces.
+        children (list[QueryPlan]): The operators feeding this one.
+        db_hits (int | None): The database accesses of the operator, profiled plans only.
+        rows (int | None): The rows produced by the operator, profiled plans only.
+    """
+
+    def __init__(self, operator: str, arguments: dict, identifiers: list[str], children: list["QueryPlan"],
+                 db_hits: int | None = None, rows: int | None = None):
+        self.operator = operator
+        self.arguments = arguments
+        self.identifiers = identifiers
+        self.children = children
+        self.db_hits = db_hits
+        self.rows = rows
+
+    @classmethod
+    def from_summary(cls, plan: dict) -> "QueryPlan":
+        """Builds a plan from the plan or profile of a result summary"""
+        return cls(
+            plan["operatorType"].split("@")[0],
+            plan.get("args", {}),
+            list(plan.get("identifiers", [])),
+            [cls.from_summary(child) for child in plan.get("children", [])],
+            plan.get("dbHits"),
+            plan.get("rows"),
+        )
+
+    def operators(self) -> Iterator["QueryPlan"]:
+        """Walks the operators of the tree, parents first"""
+        yield self
+        for child in self.children:
+            yield from child.operators()
+
+    def total_db_hits(self) -> int:
+        """Returns the database accesses of the whole plan, 0 for plans that were not profiled"""
+        return sum(plan.db_hits or 0 for plan in self.operators())
+
+    def render(self, depth: int = 0) -> str:
+        """Renders the tree one operator per line, indented by depth"""
+        line = "  " * depth + self.operator
+        if self.db_hits is not None:
+            line += f" rows={self.rows} db_hits={self.db_hits}"
+        elif "EstimatedRows" in self.arguments:
+            line += f" estimated_rows={self.arguments['EstimatedRows']:.0f}"
+        if "Details" in self.arguments:
+            line += f" ({self.arguments['Details']})"
+        return "\n".join([line] + [child.render(depth + 1) for child in self.children])
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return f"QueryPlan({self.operator!r}, children={len(self.children)}, db_hits={self.total_db_hits()})"
+
+def explain(query: RtQuery, driver, encoding: Encoding = string_encoding) -> QueryPlan:
+    """Returns the plan Neo4j would use to run a query, without running it"""
+    text, parameters = query.compile(encoding)
+    with driver.session() as session:
+        summary = session.run("EXPLAIN " + text, parameters).consume()
+    return QueryPlan.from_summary(summary.plan)
+
+def profile(query: RtQuery, driver, encoding: Encoding = string_encoding) -> QueryPlan:
+    """Runs a query, discarding its results, and returns its plan with the rows and db hits of each operator"""
+    text, parameters = query.compile(encoding)
+    with driver.session() as session:
+        summary = session.run("PROFILE " + text, parameters).consume()
+    return QueryPlan.from_summary(summary.profile)
@@ -0,0 +1,351 @@
+from rt_core_v2.rttuple import TupleComponents
+from rt2_neo4j.queries import NodeLabels, RelationshipLabels, Neo4jEntryConverter, neo4j_entry_converter, encode_data, batched, tuple_node_properties
+from rt2_neo4j.encoding import Encoding, canonical_rui_length, compact_rui_length, expand_rui
+import base64
+
+"""Node labels whose rui identifies exactly one node, backed by a uniqueness constraint"""
+unique_rui_labels = [
+    NodeLabels.AN,
+    NodeLabels.AR,
+    NodeLabels.DC,
+    NodeLabels.DI,
+    NodeLabels.F,
+    NodeLabels.NtoDE,
+    NodeLabels.NtoN,
+    NodeLabels.NtoR,
+    NodeLabels.NtoC,
+    NodeLabels.NtoLackR,
+    NodeLabels.Temporal,
+]
+
+"""Node labels whose rui is looked up but not guaranteed unique, backed by a range index"""
+indexed_rui_labels = [
+    NodeLabels.NPoR,
+    NodeLabels.RPoR,
+    NodeLabels.Relation,
+    NodeLabels.Concept,
+    NodeLabels.RtNode,
+]
+
+"""Properties identifying a Code or data node, which the insertion statements MERGE on"""
+designator_keys = {
+    NodeLabels.Code: ("ruics", "code"),
+    NodeLabels.Data: ("ruidt", "sha256"),
+}
+
+def schema_statements() -> list[str]:
+    """
+    Builds the statements creating every constraint and index used by the insertion and retrieval queries.
+    All statements use IF NOT EXISTS, so running them against an initialized database is a no-op.
+
+    Returns:
+        list[str]: The schema statements.
+    """
+    statements = []
+    for label in unique_rui_labels:
+        statements.append(f"""
+            CREATE CONSTRAINT {label.name}_rui_unique IF NOT EXISTS
+            FOR (n:{label.value}) REQUIRE n.rui IS UNIQUE
+        """)
+    for label in indexed_rui_labels:
+        statements.append(f"""
+            CREATE INDEX {label.name}_rui IF NOT EXISTS
+            FOR (n:{label.value}) ON (n.rui)
+        """)
+    statements.append(f"""
+        CREATE INDEX {NodeLabels.Code.name}_code IF NOT EXISTS
+        FOR (n:{NodeLabels.Code.value}) ON (n.code)
+    """)
+    # Code and data nodes are MERGEd on their designator key, so concurrent writers need a uniqueness constraint
+    # to not create the same node twice; it replaces the plain composite indexes, whose schema it takes over
+    for label, key in designator_keys.items():
+        statements.append(f"DROP INDEX {label.name}_designator IF EXISTS")
+        statements.append(f"""
+            CREATE CONSTRAINT {label.name}_designator_unique IF NOT EXISTS
+            FOR (n:{label.value}) REQUIRE (n.{key[0]}, n.{key[1]}) IS UNIQUE
+        """)
+    # Author pages seek DI nodes by author and walk them in rui order
+    statements.append(f"""
+        CREATE INDEX {NodeLabels.DI.name}_author IF NOT EXISTS
+        FOR (n:{NodeLabels.DI.value}) ON (n.ruia, n.rui)
+    """)
+    # Data nodes are keyed by the digest of their payload, which replaces the indexes on the payload itself
+    statements.append(f"DROP INDEX {NodeLabels.Data.name}_data IF EXISTS")
+    statements.append(f"DROP INDEX {NodeLabels.Data.name}_ruidt IF EXISTS")
+    return statements
+
+def ensure_schema(driver, await_indexes: bool = True):
+    """
+    Creates the constraints and indexes used by the insertion and retrieval queries. Idempotent.
+
+    Args:
+        driver: The Neo4j database driver.
+        await_indexes (bool): Whether to wait until the created indexes are online.
+    """
+    with driver.session() as session:
+        for statement in schema_statements():
+            session.run(statement).consume()
+        if await_indexes:
+            session.run("CALL db.awaitIndexes()").consume()
+
+def update_in_transactions(session, match: str, update: str, batch_size: int, migrated: str = "count(*)", **parameters) -> int:
+    """
+    Runs an update on every row of a match in a single pass, committing every batch_size rows.
+    The rows are streamed by one scan instead of being filtered again from scratch for every batch.
+    Must be run in an auto-commit transaction, as CALL ... IN TRANSACTIONS commits on its own.
+
+    Args:
+        session: The Neo4j session the statement is run in.
+        match (str): The clauses producing the rows to update.
+        update (str): The body of the subquery updating one row, starting with the WITH importing its variables.
+        batch_size (int): The maximum number of rows updated per transaction.
+        migrated (str): The aggregation counting the updates from the rows of the match.
+
+    Returns:
+        int: The value of the migrated aggregation.
+    """
+    return session.run(f"""
+        {match}
+        CALL {{
+            {update}
+        }} IN TRANSACTIONS OF $batch_size ROWS
+        RETURN {migrated} AS migrated
+    """, batch_size=batch_size, **parameters).single()["migrated"]
+
+def migrate_shared_label(driver, batch_size: int = 10000) -> int:
+    """
+    Adds the shared RtNode label to nodes written before it was introduced.
+    Every node carrying a rui is labeled, one transaction per batch.
+
+    Args:
+        driver: The Neo4j database driver.
+        batch_size (int): The maximum number of nodes labeled per transaction.
+
+    Returns:
+        int: The number of nodes labeled.
+    """
+    with driver.session() as session:
+        return update_in_transactions(session, f"""
+            MATCH (node)
+            WHERE node.rui IS NOT NULL AND NOT node:{NodeLabels.RtNode.value}
+        """, f"""
+            WITH node
+            SET node:{NodeLabels.RtNode.value}
+        """, batch_size)
+
+def migrate_designator_keys(driver, batch_size: int = 10000) -> int:
+    """
+    Copies the rui of the designator type onto Code and data nodes written before it was stored on them,
+    so that get_by_type and the insertion MERGE can find them by key.
+
+    Args:
+        driver: The Neo4j database driver.
+        batch_size (int): The maximum number of nodes updated per transaction.
+
+    Returns:
+        int: The number of nodes updated.
+    """
+    total = 0
+    with driver.session() as session:
+        for label, relationship in [(NodeLabels.Code, RelationshipLabels.ruics), (NodeLabels.Data, RelationshipLabels.ruidt)]:
+            total += update_in_transactions(session, f"""
+                MATCH (node:{label.value})-[:{relationship.value}]->(designator_type)
+                WHERE node.{relationship.value} IS NULL
+            """, f"""
+                WITH node, designator_type
+                SET node.{relationship.value} = designator_type.rui
+            """, batch_size)
+    return total
+
+def merge_duplicate_designators(driver, batch_size: int = 1000) -> int:
+    """
+    Merges Code and data nodes sharing a designator key, which concurrent writers could create before the key
+    was backed by a uniqueness constraint. The tuples designated by a duplicate are moved to the node kept.
+    Must run before ensure_schema on such databases, or creating the constraint fails.
+
+    Args:
+        driver: The Neo4j database driver.
+        batch_size (int): The maximum number of duplicated keys merged per transaction.
+
+    Returns:
+        int: The number of duplicate nodes deleted.
+    """
+    total = 0
+    with driver.session() as session:
+        for label, (first, second) in designator_keys.items():
+            relationship = RelationshipLabels.code if label == NodeLabels.Code else RelationshipLabels.data
+            total += update_in_transactions(session, f"""
+                MATCH (node:{label.value})
+                WHERE node.{first} IS NOT NULL AND node.{second} IS NOT NULL
+                WITH node.{first} AS first, node.{second} AS second, collect(node) AS nodes
+                WHERE size(nodes) > 1
+            """, f"""
+                WITH nodes
+                WITH nodes[0] AS kept, nodes[1..] AS duplicates
+                UNWIND duplicates AS duplicate
+                OPTIONAL MATCH (tup)-[rel:{relationship.value}]->(duplicate)
+                FOREACH (_ IN CASE WHEN tup IS NULL THEN [] ELSE [1] END |
+                    CREATE (tup)-[:{relationship.value}]->(kept))
+                DELETE rel
+                WITH DISTINCT duplicate
+                DETACH DELETE duplicate
+            """, batch_size, migrated="sum(size(nodes) - 1)")
+    return total
+
+def migrate_author_keys(driver, batch_size: int = 10000) -> int:
+    """
+    Copies the rui of the author onto DI nodes written before it was stored on them,
+    so that author pages can seek them in the author index.
+
+    Args:
+        driver: The Neo4j database driver.
+        batch_size (int): The maximum number of nodes updated per transaction.
+
+    Returns:
+        int: The number of nodes updated.
+    """
+    with driver.session() as session:
+        return update_in_transactions(session, f"""
+            MATCH (node:{NodeLabels.DI.value})-[:{RelationshipLabels.ruia.value}]->(author)
+            WHERE node.ruia IS NULL
+        """, """
+            WITH node, author
+            SET node.ruia = author.rui
+        """, batch_size)
+
+def migrate_timestamps(driver, batch_size: int = 10000) -> int:
+    """
+    Converts the timestamps of DI and DC nodes written as formatted strings to native datetime values.
+
+    Args:
+        driver: The Neo4j database driver.
+        batch_size (int): The maximum number of nodes updated per transaction.
+
+    Returns:
+        int: The number of nodes updated.
+    """
+    with driver.session() as session:
+        return update_in_transactions(session, f"""
+            MATCH (node:{NodeLabels.DI.value}|{NodeLabels.DC.value})
+            WHERE node.t IS :: STRING NOT NULL
+        """, """
+            WITH node
+            SET node.t = datetime(replace(node.t, ' ', 'T'))
+        """, batch_size)
+
+"""
+Matches and updates rewriting component values written as strings before they were stored natively,
+run by update_in_transactions
+"""
+native_value_migrations = [
+    (f"""
+        MATCH (node:{NodeLabels.RtNode.value})
+        WHERE node.polarity IS :: STRING NOT NULL
+    """, """
+        WITH node
+        SET node.polarity = node.polarity = 'True'
+    """),
+    (f"""
+        MATCH (node:{NodeLabels.F.value})
+        WHERE node.C IS :: STRING NOT NULL
+    """, """
+        WITH node
+        SET node.C = toFloat(node.C)
+    """),
+    # Missing components were written as the string "None" and are now left unset
+    (f"""
+        MATCH (node:{NodeLabels.RtNode.value})
+        WHERE node.ruio = 'None' OR node.event = 'None' OR node.event_reason = 'None'
+    """, """
+        WITH node
+        SET node.ruio = CASE node.ruio WHEN 'None' THEN null ELSE node.ruio END,
+            node.event = CASE node.event WHEN 'None' THEN null ELSE node.event END,
+            node.event_reason = CASE node.event_reason WHEN 'None' THEN null ELSE node.event_reason END
+    """),
+]
+
+"""
+Properties holding a rui, with the label of the nodes holding them and a condition on those nodes:
+the rui of every node but temporal ones, whose keys are not ruis, the designator keys of Code and data nodes
+and every rui-valued component stored on tuple nodes, such as AR.ruio and DI.ruia
+"""
+rui_properties = [
+    (NodeLabels.RtNode, "rui", f"NOT node:{NodeLabels.Temporal.value}"),
+    (NodeLabels.Code, "ruics", "true"),
+    (NodeLabels.Data, "ruidt", "true"),
+] + [
+    (NodeLabels(tuple_type.value), prop, "true")
+    for tuple_type, properties in tuple_node_properties.items() for prop in properties
+    if prop != "rui" and neo4j_entry_converter[TupleComponents(prop)] is Neo4jEntryConverter.str_to_rui
+]
+
+def migrate_encoding(driver, encoding: Encoding, batch_size: int = 10000) -> int:
+    """
+    Rewrites a graph written with stringified values to the native values of the encoding layer,
+    and converts its ruis to the encoding's canonical or compact form.
+    Timestamps are converted by migrate_timestamps.
+
+    Args:
+        driver: The Neo4j database driver.
+        encoding (Encoding): The encoding the graph is converted to.
+        batch_size (int): The maximum number of nodes updated per transaction.
+
+    Returns:
+        int: The number of node updates.
+    """
+    total = 0
+    source_length = canonical_rui_length if encoding.compact_ruis else compact_rui_length
+    with driver.session() as session:
+        for match, update in native_value_migrations:
+            total += update_in_transactions(session, match, update, batch_size)
+    # Ruis are converted in Python, so the nodes are streamed by one read while the updates are written in batches
+    with driver.session() as reader, driver.session() as writer:
+        for label, prop, condition in rui_properties:
+            result = reader.run(f"""
+                MATCH (node:{label.value})
+                WHERE size(node.{prop}) = $length AND {condition}
+                RETURN elementId(node) AS id, node.{prop} AS rui
+            """, length=source_length)
+            for records in batched(result, batch_size):
+                with writer.begin_transaction() as tx:
+                    tx.run(f"""
+                        UNWIND $rows AS row
+                        MATCH (node:{label.value}) WHERE elementId(node) = row.id
+                        SET node.{prop} = row.rui
+                    """, rows=[{"id": record["id"], "rui": encoding.rui(expand_rui(record["rui"]))} for record in records]).consume()
+                total += len(records)
+    return total
+
+def migrate_data_nodes(driver, blob_store=None, batch_size: int = 1000) -> int:
+    """
+    Rewrites data nodes holding base64 strings as content-addressed nodes holding byte arrays,
+    moving the payloads accepted by the blob store out of the database.
+
+    Args:
+        driver: The Neo4j database driver.
+        blob_store (BlobStore | None): The blob store for large payloads, if any.
+        batch_size (int): The maximum number of nodes rewritten per transaction.
+
+    Returns:
+        int: The number of nodes rewritten.
+    """
+    total = 0
+    # Payloads are encoded in Python, so the nodes are streamed by one read while the updates are written in batches
+    with driver.session() as reader, driver.session() as writer:
+        result = reader.run(f"""
+            MATCH (node:{NodeLabels.Data.value})
+            WHERE node.sha256 IS NULL
+            RETURN elementId(node) AS id, node.data AS data
+        """)
+        for records in batched(result, batch_size):
+            rows = [{"id": record["id"], **encode_data(base64.b64decode(record["data"]), blob_store)}
+                    for record in records]
+            with writer.begin_transaction() as tx:
+                tx.run(f"""
+                    UNWIND $rows AS row
+                    MATCH (node:{NodeLabels.Data.value})
+                    WHERE elementId(node) = row.id
+                    SET node.sha256 = row.sha256, node.data = row.data
+                """, rows=rows).consume()
+            total += len(rows)
+    return total
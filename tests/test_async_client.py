@@ -0,0 +1,26 @@
+from rt_core_v2.rttuple import ANTuple, ARTuple, DITuple
+from rt_core_v2.ids_codes.rui import Rui
+from rt2_neo4j.async_client import AsyncNeo4jRtStore
+import asyncio
+
+
+uri = "neo4j://localhost:7687/"
+auth = ("neo4j", "neo4jneo4j")
+
+
+def test_async_round_trip():
+    async def run():
+        async with AsyncNeo4jRtStore(uri, auth, max_concurrency=4) as store:
+            ans = [ANTuple() for _ in range(20)]
+            await asyncio.gather(*(store.save_tuple(an) for an in ans))
+            tuple_ar = ARTuple()
+            tuple_di = DITuple(ruia=ans[0].ruin, ruid=ans[0].ruin, ruit=tuple_ar.rui)
+            assert await store.save_tuples([tuple_di, tuple_ar]) == 2
+
+            assert await store.get_tuple(tuple_di.rui) == tuple_di
+            missing = Rui()
+            retrieved = await store.get_tuples([an.rui for an in ans] + [missing], batch_size=7)
+            assert retrieved[missing] is None
+            assert all(retrieved[an.rui] == an for an in ans)
+
+    asyncio.run(run())
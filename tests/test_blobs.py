@@ -0,0 +1,15 @@
+from rt2_neo4j.blobs import BlobStore
+import hashlib
+
+
+def test_blob_round_trip(tmp_path):
+    store = BlobStore(tmp_path / "blobs", threshold=4)
+    data = b'\x00\x01\x02\x03\x04\x05'
+    digest = hashlib.sha256(data).hexdigest()
+    assert store.accepts(data)
+    assert not store.accepts(data[:4])
+    store.put(digest, data)
+    store.put(digest, data)
+    assert store.path(digest).parent.name == digest[:2]
+    assert store.get(digest) == data
+    assert [path.name for path in store.path(digest).parent.iterdir()] == [digest]
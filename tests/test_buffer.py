@@ -0,0 +1,141 @@
+from rt2_neo4j.buffer import WriteBehindBuffer
+from rt2_neo4j.retry import PartialWriteError
+import queue
+import threading
+import time
+import pytest
+
+
+class RecordingWriter:
+    def __init__(self, fail_on=(), delay=0.0):
+        self.batches = []
+        self.fail_on = set(fail_on)
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, batch):
+        time.sleep(self.delay)
+        if self.fail_on.intersection(batch):
+            raise RuntimeError(f"cannot write {batch}")
+        with self.lock:
+            self.batches.append(list(batch))
+
+    def written(self):
+        return [entry for batch in self.batches for entry in batch]
+
+
+def test_flush_on_batch_size():
+    writer = RecordingWriter()
+    buffer = WriteBehindBuffer(writer, batch_size=10, flush_interval=60)
+    for entry in range(25):
+        buffer.put(entry)
+    buffer.flush()
+    assert writer.written() == list(range(25))
+    assert [len(batch) for batch in writer.batches][:2] == [10, 10]
+    buffer.close()
+
+
+def test_flush_on_interval():
+    writer = RecordingWriter()
+    buffer = WriteBehindBuffer(writer, batch_size=1000, flush_interval=0.05)
+    buffer.put("entry")
+    deadline = time.monotonic() + 5
+    while not writer.batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.batches == [["entry"]]
+    buffer.close()
+
+
+def test_failures_reported_per_tuple():
+    writer = RecordingWriter(fail_on={3})
+    reported = []
+    buffer = WriteBehindBuffer(writer, batch_size=5, flush_interval=60, on_error=reported.append)
+    for entry in range(5):
+        buffer.put(entry)
+    buffer.flush()
+    assert sorted(writer.written()) == [0, 1, 2, 4]
+    failures = buffer.take_failures()
+    assert [failure.tup for failure in failures] == [3]
+    assert isinstance(failures[0].error, RuntimeError)
+    assert reported == failures
+    assert buffer.take_failures() == []
+    buffer.close()
+
+
+def test_partial_write_retries_remainder():
+    attempts = []
+
+    def writer(batch):
+        attempts.append(list(batch))
+        if len(batch) > 1:
+            # The first half was committed before the second half failed
+            raise PartialWriteError(RuntimeError("cannot write"), [], batch[:2], batch[2:])
+        if batch == [3]:
+            raise RuntimeError("cannot write [3]")
+
+    buffer = WriteBehindBuffer(writer, batch_size=4, flush_interval=60)
+    for entry in range(4):
+        buffer.put(entry)
+    buffer.flush()
+    assert attempts == [[0, 1, 2, 3], [2], [3]]
+    assert [failure.tup for failure in buffer.take_failures()] == [3]
+    buffer.close()
+
+
+def test_failing_on_error(caplog):
+    writer = RecordingWriter(fail_on={1})
+
+    def on_error(failure):
+        raise ValueError("callback failed")
+
+    buffer = WriteBehindBuffer(writer, batch_size=5, flush_interval=60, on_error=on_error)
+    buffer.put(1)
+    buffer.flush()
+    # The flushing thread survives the callback, so later tuples are still written and close() returns
+    buffer.put(2)
+    buffer.flush()
+    assert writer.written() == [2]
+    assert [failure.tup for failure in buffer.take_failures()] == [1]
+    assert "on_error callback failed" in caplog.text
+    buffer.close()
+    assert not buffer.thread.is_alive()
+
+
+def test_backpressure():
+    writer = RecordingWriter(delay=0.2)
+    buffer = WriteBehindBuffer(writer, max_size=2, batch_size=1, flush_interval=60)
+    buffer.put(0)
+    buffer.put(1)
+    buffer.put(2)
+    with pytest.raises(queue.Full):
+        for entry in range(3, 10):
+            buffer.put(entry, timeout=0.01)
+    buffer.close()
+
+
+def test_close_waits_for_blocked_put():
+    writer = RecordingWriter(delay=0.1)
+    buffer = WriteBehindBuffer(writer, max_size=1, batch_size=1, flush_interval=60)
+    buffer.put(0)
+    buffer.put(1)
+    producer = threading.Thread(target=buffer.put, args=(2,))
+    producer.start()
+    time.sleep(0.05)
+    # The producer is blocked on the full queue when the buffer closes, and its tuple is still written
+    buffer.close()
+    producer.join()
+    assert writer.written() == [0, 1, 2]
+    with pytest.raises(RuntimeError):
+        buffer.put(3)
+    buffer.flush()
+
+
+def test_close_drains():
+    writer = RecordingWriter()
+    buffer = WriteBehindBuffer(writer, batch_size=1000, flush_interval=60)
+    for entry in range(100):
+        buffer.put(entry)
+    buffer.close()
+    assert writer.written() == list(range(100))
+    with pytest.raises(RuntimeError):
+        buffer.put(100)
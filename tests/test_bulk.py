@@ -0,0 +1,139 @@
+from rt_core_v2.rttuple import TupleType, ANTuple, ARTuple, DITuple, DCTuple, FTuple, NtoNTuple, NtoRTuple, NtoCTuple, NtoDETuple, NtoLackRTuple
+from rt2_neo4j.bulk import insert_batches, batch_levels, batched, TemporalHubs, hub_insertion_queries, temporal_components
+from rt2_neo4j.blobs import BlobStore
+from rt2_neo4j.queries import tuple_query, tuples_query, referent_query, author_page_query, author_count_query, designator_query, type_page_query
+from rt_core_v2.ids_codes.rui import Rui, TempRef
+from datetime import datetime
+from neo4j import GraphDatabase
+import pytest
+
+
+uri = "neo4j://localhost:7687/"
+auth = ("neo4j", "neo4jneo4j")
+config = {}
+
+driver = GraphDatabase.driver(uri, auth=auth, **config)
+
+with driver.session() as session:
+    session.run("MATCH (n) DETACH DELETE n")
+
+tuple_an = ANTuple()
+tuple_ar = ARTuple()
+replacement_one_an = ANTuple()
+replacement_two_an = ANTuple()
+tuple_di = DITuple(ruia=tuple_an.ruin, ruid=tuple_an.ruin, ruit=tuple_ar.rui)
+tuple_dc = DCTuple(ruid=replacement_one_an.ruin, ruit=tuple_an.rui, replacements=[replacement_one_an.rui, replacement_two_an.rui])
+tuple_nton = NtoNTuple(r=replacement_one_an.ruin, p=[replacement_one_an.ruin, replacement_two_an.ruin])
+tuple_ntor = NtoRTuple(ruin=replacement_two_an.ruin, ruir=tuple_ar.ruir, r=replacement_one_an.ruin)
+tuple_f = FTuple(C=0.32, ruitn=tuple_ntor.rui)
+tuple_ntoc = NtoCTuple(code="Test_code", ruin=replacement_one_an.ruin, r=replacement_two_an.ruin, ruics=tuple_an.ruin)
+tuple_ntode = NtoDETuple(ruin=replacement_one_an.ruin, ruidt=replacement_two_an.ruin, data=b'\x01\x02\x03\x04\x05')
+tuple_ntolackr = NtoLackRTuple(ruin=replacement_two_an.ruin, ruir=tuple_ar.ruir, r=replacement_one_an.ruin)
+
+all_tuples = [tuple_dc, tuple_f, tuple_di, tuple_ntolackr, tuple_ntode, tuple_ntoc, tuple_ntor, tuple_nton,
+              replacement_two_an, replacement_one_an, tuple_ar, tuple_an]
+
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    with pytest.raises(ValueError):
+        list(batched(range(5), 0))
+
+
+def test_insert_batches():
+    # All tuples go out in a single batch, so type ordering alone must resolve the references
+    assert insert_batches(all_tuples, driver, batch_size=len(all_tuples)) == len(all_tuples)
+    for tup in all_tuples:
+        assert tuple_query(tup.rui, driver) == tup
+
+
+def test_intra_batch_references():
+    an = ANTuple()
+    dc = DCTuple(ruid=an.ruin, ruit=an.rui, replacements=[an.rui])
+    di = DITuple(ruia=an.ruin, ruid=an.ruin, ruit=dc.rui)
+    f = FTuple(C=0.5, ruitn=di.rui)
+    # F and DI precede the tuples they point at in type order, so each needs a level of its own
+    assert batch_levels([f, di, dc, an]) == [[an], [dc], [di], [f]]
+    insert_batches([f, di, dc, an], driver, batch_size=4)
+    for tup in [an, dc, di, f]:
+        assert tuple_query(tup.rui, driver) == tup
+
+
+def test_tuples_query():
+    missing = Rui()
+    retrieved = tuples_query([tup.rui for tup in all_tuples] + [missing, tuple_an.ruin], driver, batch_size=5)
+    assert retrieved[missing] is None
+    # PoR nodes are not tuples
+    assert retrieved[tuple_an.ruin] is None
+    for tup in all_tuples:
+        assert retrieved[tup.rui] == tup
+
+
+def test_referent_query():
+    assert set(referent_query(replacement_one_an.ruin, driver)) == {
+        replacement_one_an, tuple_dc, tuple_nton, tuple_ntor, tuple_ntoc, tuple_ntode, tuple_ntolackr}
+    # tuple_ntoc refers to tuple_an.ruin only through its Code node
+    assert set(referent_query(tuple_an.ruin, driver)) == {tuple_an, tuple_di, tuple_ntoc}
+    assert list(referent_query(Rui(), driver)) == []
+
+
+def test_author_queries():
+    assert author_count_query(tuple_an.ruin, driver) == 1
+    assert author_count_query(Rui(), driver) == 0
+    page, cursor = author_page_query(tuple_an.ruin, driver, page_size=1)
+    assert page == [tuple_di, tuple_ar]
+    assert cursor == tuple_di.rui
+    assert author_page_query(tuple_an.ruin, driver, after=cursor, page_size=1) == ([], None)
+
+
+def test_designator_query():
+    assert designator_query(TupleType.NtoC, tuple_an.ruin, "Test_code", driver) == {tuple_ntoc}
+    assert designator_query(TupleType.NtoC, tuple_an.ruin, "Other_code", driver) == set()
+    assert designator_query(TupleType.NtoDE, replacement_two_an.ruin, b'\x01\x02\x03\x04\x05', driver) == {tuple_ntode}
+    with pytest.raises(ValueError):
+        designator_query(TupleType.AN, tuple_an.ruin, "Test_code", driver)
+
+
+def test_blob_payloads(tmp_path):
+    blob_store = BlobStore(tmp_path, threshold=8)
+    large_ntode = NtoDETuple(ruin=replacement_one_an.ruin, ruidt=replacement_two_an.ruin, data=bytes(range(64)))
+    duplicate_ntode = NtoDETuple(ruin=replacement_two_an.ruin, ruidt=replacement_two_an.ruin, data=bytes(range(64)))
+    insert_batches([large_ntode, duplicate_ntode], driver, blob_store=blob_store)
+    assert tuple_query(large_ntode.rui, driver, blob_store) == large_ntode
+    assert designator_query(TupleType.NtoDE, replacement_two_an.ruin, bytes(range(64)), driver, blob_store) == {large_ntode, duplicate_ntode}
+    with driver.session() as session:
+        record = session.run("MATCH (d:data)<-[:data]-(n {rui: $rui}) RETURN d.data AS data, COUNT { (d)<-[:data]-() } AS uses",
+                             rui=str(large_ntode.rui)).single()
+    assert record["data"] is None
+    assert record["uses"] == 2
+
+
+def test_type_page_query():
+    ans = {tuple_an, replacement_one_an, replacement_two_an}
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = type_page_query(TupleType.AN, driver, cursor, page_size=2)
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert ans <= set(seen)
+    assert [str(tup.rui) for tup in seen] == sorted(str(tup.rui) for tup in seen)
+
+
+def test_temporal_hubs():
+    assert all("MERGE (t" not in hub_insertion_queries[tuple_type] for tuple_type in temporal_components)
+    shared = TempRef(datetime(2024, 1, 1))
+    hubs = TemporalHubs(max_size=10)
+    particulars = [ANTuple() for _ in range(20)]
+    relation = ANTuple()
+    ntors = [NtoRTuple(ruin=particular.ruin, ruir=tuple_ar.ruir, r=relation.ruin, tr=shared) for particular in particulars]
+    insert_batches(particulars + [relation] + ntors[:10], driver, batch_size=100, temporal_hubs=hubs)
+    assert len(hubs) == 1
+    insert_batches(ntors[10:], driver, batch_size=5, temporal_hubs=hubs)
+    for tup in ntors:
+        assert tuple_query(tup.rui, driver) == tup
+    with driver.session() as session:
+        record = session.run("MATCH (t:temp {rui: $rui}) RETURN count(t) AS nodes, COUNT { (t)<-[:tr]-() } AS edges",
+                             rui=str(shared)).single()
+    assert (record["nodes"], record["edges"]) == (1, 20)
@@ -0,0 +1,64 @@
+from rt2_neo4j.cache import TupleCache
+import pytest
+
+
+class Entry:
+    def __init__(self, rui):
+        self.rui = rui
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction():
+    cache = TupleCache(max_size=2)
+    first, second, third = Entry("a"), Entry("b"), Entry("c")
+    cache.put_many([first, second])
+    assert cache.get("a") is first
+    cache.put(third)
+    assert cache.get("b") is None
+    assert cache.get("a") is first
+    assert cache.get("c") is third
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (3, 1, 1, 2)
+
+
+def test_get_many():
+    cache = TupleCache()
+    cache.put_many(Entry(rui) for rui in "abc")
+    found, missing = cache.get_many(["a", "x", "c", "y"])
+    assert sorted(found) == ["a", "c"]
+    assert missing == ["x", "y"]
+    assert cache.stats().hit_rate() == 0.5
+
+
+def test_ttl():
+    clock = Clock()
+    cache = TupleCache(ttl=10, clock=clock)
+    cache.put(Entry("a"))
+    clock.now = 5
+    assert cache.get("a") is not None
+    clock.now = 10
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats.expirations, stats.size) == (1, 0)
+
+
+def test_invalidate_and_clear():
+    cache = TupleCache()
+    cache.put_many(Entry(rui) for rui in "abc")
+    cache.invalidate("a")
+    cache.invalidate("x")
+    assert cache.get("a") is None
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        TupleCache(max_size=0)
@@ -13,6 +13,10 @@ from rt_core_v2.rttuple import (
     AttributesVisitor,
 )
 from rt_core_v2.ids_codes.rui import Rui, TempRef
+from neo4j import GraphDatabase
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import pytest
 
 
 # storage = Neo4jRtStore(uri="neo4j://localhost:7687", auth=("neo4j", "neo4j_pass"))
@@ -23,4 +27,163 @@ ruin = Rui()
 
 a = ANTuple(rui=rui, ruin=ruin)
 
-# storage.save_tuple(a)
\ No newline at end of file
+# storage.save_tuple(a)
+
+class FakeResult:
+    def consume(self):
+        return None
+
+
+class FakeTransaction:
+    def __init__(self, session):
+        self.session = session
+        self.runs = []
+
+    def run(self, query, **parameters):
+        self.session.check_owner()
+        self.runs.append((query, parameters))
+        return FakeResult()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.session.driver.commit(self)
+
+
+class FakeSession:
+    """Session double that fails if it is ever used by two threads"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.owner = threading.get_ident()
+
+    def check_owner(self):
+        assert self.owner == threading.get_ident(), "session shared between threads"
+
+    def begin_transaction(self):
+        self.check_owner()
+        return FakeTransaction(self)
+
+    def execute_write(self, work, *args):
+        with self.begin_transaction() as tx:
+            return work(tx, *args)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+class FakeDriver:
+    """Driver double recording committed transactions"""
+
+    def __init__(self, uri, auth=None, **config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.committed = []
+
+    def session(self, **kwargs):
+        return FakeSession(self)
+
+    def commit(self, tx):
+        with self.lock:
+            self.committed.append(tx)
+
+    def close(self):
+        pass
+
+    def written_ruis(self):
+        ruis = []
+        for tx in self.committed:
+            for _, parameters in tx.runs:
+                ruis.extend(row["rui"] for row in parameters.get("rows", [parameters]))
+        return ruis
+
+
+@pytest.fixture
+def fake_store(monkeypatch):
+    monkeypatch.setattr(GraphDatabase, "driver", FakeDriver)
+    return Neo4jRtStore("neo4j://fake", ("neo4j", "neo4j"), max_connection_pool_size=8, connection_acquisition_timeout=5.0)
+
+
+def test_pool_configuration(fake_store):
+    assert fake_store.driver.config == {"max_connection_pool_size": 8, "connection_acquisition_timeout": 5.0}
+
+
+def test_unit_of_work_commits_once(fake_store):
+    tuples = [ANTuple() for _ in range(10)]
+    with fake_store.unit_of_work():
+        for tup in tuples:
+            fake_store.save_tuple(tup)
+        assert fake_store.driver.committed == []
+    assert len(fake_store.driver.committed) == 1
+    assert sorted(fake_store.driver.written_ruis()) == sorted(str(tup.rui) for tup in tuples)
+
+
+def test_unit_of_work_rolls_back(fake_store):
+    with pytest.raises(RuntimeError):
+        with fake_store.unit_of_work():
+            fake_store.save_tuple(ANTuple())
+            raise RuntimeError()
+    assert fake_store.pending() == []
+    assert fake_store.driver.committed == []
+
+
+def test_concurrent_writers(fake_store):
+    threads = 16
+    per_thread = 50
+    barrier = threading.Barrier(threads)
+    saved = [[ANTuple() for _ in range(per_thread)] for _ in range(threads)]
+
+    def work(tuples):
+        barrier.wait()
+        for idx, tup in enumerate(tuples):
+            if idx % 2:
+                fake_store.save_tuple(tup)
+            else:
+                with fake_store.unit_of_work():
+                    fake_store.save_tuple(tup)
+        assert fake_store.pending() == []
+
+    with ThreadPoolExecutor(threads) as executor:
+        for future in [executor.submit(work, tuples) for tuples in saved]:
+            future.result()
+    assert sorted(fake_store.driver.written_ruis()) == sorted(str(tup.rui) for tuples in saved for tup in tuples)
+    assert len(fake_store.driver.committed) == threads * per_thread
+
+
+def test_write_behind(monkeypatch):
+    monkeypatch.setattr(GraphDatabase, "driver", FakeDriver)
+    store = Neo4jRtStore("neo4j://fake", ("neo4j", "neo4j"), write_behind=True, batch_size=10, flush_interval=60)
+    tuples = [ANTuple() for _ in range(25)]
+    for tup in tuples:
+        store.save_tuple(tup)
+    store.commit()
+    assert sorted(store.driver.written_ruis()) == sorted(str(tup.rui) for tup in tuples)
+    assert store.write_failures() == []
+    store.shut_down()
+
+
+def test_read_cache(monkeypatch):
+    monkeypatch.setattr(GraphDatabase, "driver", FakeDriver)
+    store = Neo4jRtStore("neo4j://fake", ("neo4j", "neo4j"), cache_size=100)
+    written = [ANTuple() for _ in range(3)]
+    stored = ANTuple()
+    for tup in written:
+        store.save_tuple(tup)
+    queried = []
+    monkeypatch.setattr("rt2_neo4j.client.tuple_query", lambda rui, *args: queried.append(rui) or stored)
+    monkeypatch.setattr("rt2_neo4j.client.tuples_query",
+                        lambda ruis, *args: queried.extend(ruis) or {rui: stored for rui in ruis})
+    assert store.get_tuple(written[0].rui) == written[0]
+    assert store.get_tuple(stored.rui) == stored
+    assert store.get_tuple(stored.rui) == stored
+    other = Rui()
+    assert store.get_tuples([written[1].rui, written[2].rui, other]) == {
+        written[1].rui: written[1], written[2].rui: written[2], other: stored}
+    assert queried == [stored.rui, other]
+    assert store.cache_stats().hits == 4
+    store.shut_down()
@@ -0,0 +1,53 @@
+from rt2_neo4j.cypher import CypherNode, CypherOperation, CompoundQuery, AtomicEntityQuery, query_node, create_relationship, render_node
+import pytest
+
+
+def dc_query(rui, replacements):
+    dc = CypherNode("dc", ["DC"], {"rui": rui})
+    queries = [AtomicEntityQuery(CypherOperation.CREATE, dc)]
+    for idx, replacement in enumerate(replacements):
+        node = CypherNode(f"replacement{idx}", ["RtNode"], {"rui": replacement})
+        queries.append(AtomicEntityQuery(CypherOperation.MATCH, node))
+        queries.append(create_relationship(dc, node, ["replacements"], {"replacements": idx}))
+    return CompoundQuery(queries)
+
+
+def test_node_placeholders():
+    query = query_node(CypherOperation.MERGE, "tr", ["temp", "RtNode"], {"rui": "abc"})
+    assert query.get_query() == "MERGE (tr:temp : RtNode {rui: $tr_rui})"
+    assert query.get_parameters() == {"tr_rui": "abc"}
+
+
+def test_relationship_placeholders():
+    start = CypherNode("a", ["AN"], {})
+    end = CypherNode("b", ["N"], {})
+    query = create_relationship(start, end, ["ruin"], {"order": 1})
+    assert query.get_query() == "CREATE (a)-[:ruin {order: $a_b_ruin_order}]->(b)"
+    assert query.get_parameters() == {"a_b_ruin_order": 1}
+
+
+def test_same_shape_same_text():
+    first = dc_query("dc-1", ["r-1", "r-2"])
+    second = dc_query("dc-2", ["r-3", "r-4"])
+    assert first.get_query() == second.get_query()
+    assert first.get_parameters() != second.get_parameters()
+    assert dc_query("dc-3", ["r-5"]).get_query() != first.get_query()
+    assert render_node.cache_info().hits > 0
+
+
+def test_conflicting_parameters():
+    query = CompoundQuery([query_node(CypherOperation.MATCH, "n", ["N"], {"rui": "a"}),
+                           query_node(CypherOperation.MATCH, "n", ["N"], {"rui": "b"})])
+    with pytest.raises(ValueError):
+        query.get_parameters()
+
+
+def test_run():
+    class RecordingTx:
+        def run(self, query, parameters):
+            self.ran = (query, parameters)
+
+    tx = RecordingTx()
+    query = query_node(CypherOperation.MATCH, "n", ["N"], {"rui": "a"})
+    query.run(tx)
+    assert tx.ran == ("MATCH (n:N {rui: $n_rui})", {"n_rui": "a"})
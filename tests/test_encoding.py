@@ -0,0 +1,42 @@
+from rt_core_v2.ids_codes.rui import Rui
+from rt_core_v2.rttuple import RuiStatus
+from rt2_neo4j.encoding import Encoding, compact_rui, expand_rui, compact_rui_length
+from rt2_neo4j.queries import Neo4jEntryConverter
+from datetime import datetime, timezone
+import uuid
+
+
+def test_compact_rui_round_trip():
+    for _ in range(100):
+        rui = uuid.uuid4()
+        compact = compact_rui(rui)
+        assert len(compact) == compact_rui_length
+        assert expand_rui(compact) == rui
+        assert expand_rui(str(rui)) == rui
+
+
+def test_native_values():
+    encoding = Encoding()
+    now = datetime.now(timezone.utc)
+    assert encoding.value(now) is now
+    assert encoding.value(True) is True
+    assert encoding.value(0.5) == 0.5
+    assert encoding.value(None) is None
+    assert encoding.value(b'\x01') == b'\x01'
+    status = next(iter(RuiStatus))
+    assert encoding.value(status) == status.value
+
+
+def test_rui_encodings():
+    rui = Rui()
+    assert Encoding().value(rui) == str(rui)
+    compact = Encoding(compact_ruis=True)
+    assert compact.value([rui]) == [compact_rui(rui)]
+    assert Neo4jEntryConverter.str_to_rui(compact.rui(rui)) == rui
+    assert Neo4jEntryConverter.str_to_rui(str(rui)) == rui
+
+
+def test_legacy_booleans():
+    assert Neo4jEntryConverter.to_bool("False") is False
+    assert Neo4jEntryConverter.to_bool("True") is True
+    assert Neo4jEntryConverter.to_bool(False) is False
@@ -0,0 +1,56 @@
+from rt_core_v2.rttuple import ANTuple, ARTuple, DITuple, DCTuple, FTuple, NtoNTuple, NtoRTuple, NtoCTuple, NtoDETuple, NtoLackRTuple, TupleComponents
+from rt2_neo4j.queries import TupleDecodeError
+from rt2_neo4j.metrics import MetricsRegistry, set_sink
+from rt2_neo4j.export import export_jsonl, read_jsonl, export_parquet, read_parquet, tuple_to_record, record_to_tuple
+import pytest
+
+
+tuple_an = ANTuple()
+tuple_ar = ARTuple()
+replacement_an = ANTuple()
+tuple_di = DITuple(ruia=tuple_an.ruin, ruid=tuple_an.ruin, ruit=tuple_ar.rui)
+tuple_dc = DCTuple(ruid=replacement_an.ruin, ruit=tuple_an.rui, replacements=[replacement_an.rui, tuple_ar.rui])
+tuple_nton = NtoNTuple(r=replacement_an.ruin, p=[replacement_an.ruin, tuple_an.ruin])
+tuple_ntor = NtoRTuple(ruin=tuple_an.ruin, ruir=tuple_ar.ruir, r=replacement_an.ruin)
+tuple_f = FTuple(C=0.32, ruitn=tuple_ntor.rui)
+tuple_ntoc = NtoCTuple(code="Test_code", ruin=replacement_an.ruin, r=tuple_an.ruin, ruics=tuple_an.ruin)
+tuple_ntode = NtoDETuple(ruin=replacement_an.ruin, ruidt=tuple_an.ruin, data=b'\x00\x01\xff')
+tuple_ntolackr = NtoLackRTuple(ruin=tuple_an.ruin, ruir=tuple_ar.ruir, r=replacement_an.ruin)
+
+all_tuples = [tuple_an, tuple_ar, replacement_an, tuple_di, tuple_dc, tuple_nton, tuple_ntor, tuple_f,
+              tuple_ntoc, tuple_ntode, tuple_ntolackr]
+
+
+def test_records_of_mixed_types():
+    # Records are not bulk insertion rows: no payload is hashed or counted in the payload size metric
+    registry = MetricsRegistry()
+    previous = set_sink(registry)
+    try:
+        records = [tuple_to_record(tup) for tup in all_tuples]
+    finally:
+        set_sink(previous)
+    assert all("sha256" not in record for record in records)
+    assert registry.histogram("rt2_neo4j_payload_bytes", {"operation": "encode_data"}) is None
+    assert [record[TupleComponents.type.value] for record in records] == [tup.tuple_type.value for tup in all_tuples]
+    assert [record_to_tuple(record) for record in records] == all_tuples
+
+
+def test_invalid_record():
+    record = tuple_to_record(tuple_f)
+    record["C"] = "not a number"
+    with pytest.raises(TupleDecodeError) as raised:
+        record_to_tuple(record)
+    assert raised.value.key == "C"
+
+
+def test_jsonl_round_trip(tmp_path):
+    path = tmp_path / "tuples.jsonl"
+    assert export_jsonl(iter(all_tuples), path) == len(all_tuples)
+    assert list(read_jsonl(path)) == all_tuples
+
+
+def test_parquet_round_trip(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "tuples.parquet"
+    assert export_parquet(iter(all_tuples), path, row_group_size=4) == len(all_tuples)
+    assert list(read_parquet(path)) == all_tuples
@@ -0,0 +1,126 @@
+from rt_core_v2.rttuple import TupleType, ANTuple, ARTuple, DITuple, DCTuple, FTuple, NtoNTuple, NtoRTuple, NtoCTuple, NtoDETuple, NtoLackRTuple
+from rt2_neo4j.memory import InMemoryRtStore
+from rt2_neo4j.client import Neo4jRtStore
+from rt_core_v2.ids_codes.rui import Rui, TempRef
+from datetime import datetime
+import pytest
+
+
+uri = "neo4j://localhost:7687/"
+auth = ("neo4j", "neo4jneo4j")
+
+tuple_an = ANTuple()
+tuple_ar = ARTuple()
+replacement_one_an = ANTuple()
+replacement_two_an = ANTuple()
+tuple_di = DITuple(ruia=tuple_an.ruin, ruid=tuple_an.ruin, ruit=tuple_ar.rui)
+tuple_dc = DCTuple(ruid=replacement_one_an.ruin, ruit=tuple_an.rui, replacements=[replacement_one_an.rui, replacement_two_an.rui])
+tuple_nton = NtoNTuple(r=replacement_one_an.ruin, p=[replacement_one_an.ruin, replacement_two_an.ruin])
+tuple_ntor = NtoRTuple(ruin=replacement_two_an.ruin, ruir=tuple_ar.ruir, r=replacement_one_an.ruin)
+tuple_f = FTuple(C=0.32, ruitn=tuple_ntor.rui)
+tuple_ntoc = NtoCTuple(code="Test_code", ruin=replacement_one_an.ruin, r=replacement_two_an.ruin, ruics=tuple_an.ruin)
+tuple_ntode = NtoDETuple(ruin=replacement_one_an.ruin, ruidt=replacement_two_an.ruin, data=b'\x01\x02\x03\x04\x05')
+tuple_ntolackr = NtoLackRTuple(ruin=replacement_two_an.ruin, ruir=tuple_ar.ruir, r=replacement_one_an.ruin)
+
+shared_tr = TempRef(datetime(2024, 1, 1))
+temporal_ntor = NtoRTuple(ruin=replacement_one_an.ruin, ruir=tuple_ar.ruir, r=replacement_two_an.ruin, tr=shared_tr)
+temporal_ntolackr = NtoLackRTuple(ruin=replacement_two_an.ruin, ruir=tuple_ar.ruir, r=replacement_one_an.ruin, tr=shared_tr)
+temporal_tuples = [temporal_ntor, temporal_ntolackr]
+
+all_tuples = [tuple_an, tuple_ar, replacement_one_an, replacement_two_an, tuple_di, tuple_dc, tuple_nton,
+              tuple_ntor, tuple_f, tuple_ntoc, tuple_ntode, tuple_ntolackr]
+
+
+@pytest.fixture
+def memory_store():
+    store = InMemoryRtStore()
+    store.save_tuples(all_tuples)
+    return store
+
+
+def test_get_tuple(memory_store):
+    for tup in all_tuples:
+        assert memory_store.get_tuple(tup.rui) == tup
+    missing = Rui()
+    with pytest.raises(ValueError):
+        memory_store.get_tuple(missing)
+    # PoR nodes are not tuples
+    with pytest.raises(ValueError):
+        memory_store.get_tuple(tuple_an.ruin)
+    assert memory_store.get_tuples([tuple_an.rui, missing]) == {tuple_an.rui: tuple_an, missing: None}
+
+
+def test_get_by_referent(memory_store):
+    assert memory_store.get_by_referent(replacement_one_an.ruin) == {
+        replacement_one_an, tuple_dc, tuple_nton, tuple_ntor, tuple_ntoc, tuple_ntode, tuple_ntolackr}
+    assert memory_store.get_by_referent(tuple_an.ruin) == {tuple_an, tuple_di, tuple_ntoc}
+    assert memory_store.get_by_referent(tuple_ntor.rui) == {tuple_f}
+    # Tuples refer to their temporal nodes as well
+    memory_store.save_tuples(temporal_tuples)
+    assert memory_store.get_by_referent(shared_tr) == set(temporal_tuples)
+
+
+def test_get_by_author(memory_store):
+    dis = [DITuple(ruia=tuple_an.ruin, ruid=tuple_an.ruin, ruit=tup.rui) for tup in all_tuples]
+    memory_store.save_tuples(dis)
+    assert memory_store.count_by_author(tuple_an.ruin) == len(dis) + 1
+    page, cursor = memory_store.page_by_author(tuple_an.ruin, page_size=5)
+    assert len(page) == 10 and cursor is not None
+    assert memory_store.get_by_author(tuple_an.ruin) == set(dis) | set(all_tuples)
+
+
+def test_get_by_type(memory_store):
+    assert memory_store.get_by_type(TupleType.NtoC, tuple_an.ruin, "Test_code") == {tuple_ntoc}
+    assert memory_store.get_by_type(TupleType.NtoC, tuple_an.ruin, "Other_code") == set()
+    assert memory_store.get_by_type(TupleType.NtoDE, replacement_two_an.ruin, b'\x01\x02\x03\x04\x05') == {tuple_ntode}
+    with pytest.raises(ValueError):
+        memory_store.get_by_type(TupleType.AN, tuple_an.ruin, "Test_code")
+
+
+def test_duplicate_rui(memory_store):
+    with pytest.raises(ValueError):
+        memory_store.save_tuple(tuple_an)
+    assert len(memory_store) == len(all_tuples)
+
+
+def test_unit_of_work_and_ingest():
+    store = InMemoryRtStore()
+    with pytest.raises(RuntimeError):
+        with store.unit_of_work():
+            store.save_tuple(tuple_an)
+            raise RuntimeError()
+    assert len(store) == 0
+    report = store.ingest(reversed(all_tuples + [FTuple(C=0.5, ruitn=Rui())]), window_size=4)
+    assert report.written == len(all_tuples)
+    assert len(report.unresolved) == 1
+    assert list(store.iter_tuples([TupleType.AN])) == sorted([tuple_an, replacement_one_an, replacement_two_an], key=lambda tup: str(tup.rui))
+
+
+def test_differential(memory_store):
+    # Neo4jRtStore must answer every query exactly like the in-memory oracle
+    neo4j_store = Neo4jRtStore(uri, auth)
+    with neo4j_store.driver.session() as session:
+        session.run("MATCH (n) DETACH DELETE n").consume()
+    neo4j_store.ensure_schema()
+    neo4j_store.save_tuples(all_tuples)
+    neo4j_store.save_tuples(temporal_tuples)
+    memory_store.save_tuples(temporal_tuples)
+    por_ruis = [tuple_an.ruin, tuple_ar.ruir, replacement_one_an.ruin, replacement_two_an.ruin]
+    for tup in all_tuples:
+        assert neo4j_store.get_tuple(tup.rui) == memory_store.get_tuple(tup.rui)
+    # Both stores raise for ruis of PoR nodes and of no node at all, and map them to None in bulk lookups
+    for rui in por_ruis + [Rui()]:
+        for store in (neo4j_store, memory_store):
+            with pytest.raises(ValueError):
+                store.get_tuple(rui)
+    assert neo4j_store.get_tuples(por_ruis) == memory_store.get_tuples(por_ruis)
+    referents = [tup.rui for tup in all_tuples] + por_ruis + [shared_tr]
+    for rui in referents:
+        assert neo4j_store.get_by_referent(rui) == memory_store.get_by_referent(rui)
+        assert neo4j_store.get_by_author(rui) == memory_store.get_by_author(rui)
+        assert neo4j_store.count_by_author(rui) == memory_store.count_by_author(rui)
+    assert neo4j_store.get_by_type(TupleType.NtoC, tuple_an.ruin, "Test_code") == memory_store.get_by_type(TupleType.NtoC, tuple_an.ruin, "Test_code")
+    assert (neo4j_store.get_by_type(TupleType.NtoDE, replacement_two_an.ruin, b'\x01\x02\x03\x04\x05')
+            == memory_store.get_by_type(TupleType.NtoDE, replacement_two_an.ruin, b'\x01\x02\x03\x04\x05'))
+    assert list(neo4j_store.iter_tuples()) == list(memory_store.iter_tuples())
+    neo4j_store.shut_down()
@@ -0,0 +1,160 @@
+from rt2_neo4j.metrics import MetricsRegistry, MetricsSink, CallbackSink, Histogram, instrumented, record_summary, record_result, record_size, set_sink, get_sink
+from types import SimpleNamespace
+import asyncio
+import pytest
+
+
+@pytest.fixture
+def registry():
+    registry = MetricsRegistry()
+    previous = set_sink(registry)
+    yield registry
+    set_sink(previous)
+
+
+def summary(nodes=0, relationships=0, properties=0, available=None, consumed=None):
+    counters = SimpleNamespace(nodes_created=nodes, relationships_created=relationships, properties_set=properties)
+    return SimpleNamespace(counters=counters, result_available_after=available, result_consumed_after=consumed)
+
+
+class FakeResult:
+    def __init__(self, summary):
+        self.summary = summary
+        self.consumed = False
+
+    def consume(self):
+        self.consumed = True
+        return self.summary
+
+
+@instrumented("double")
+def double(x):
+    return 2 * x
+
+
+@instrumented("fail")
+def fail():
+    raise ValueError("failed")
+
+
+def test_disabled_by_default():
+    assert not get_sink().enabled
+    result = FakeResult(summary(nodes=1))
+    record_result(result, "save_tuple")
+    assert double(2) == 4
+    assert not result.consumed
+
+
+def test_instrumented_latency(registry):
+    assert double(3) == 6
+    assert double.__name__ == "double"
+    histogram = registry.histogram("rt2_neo4j_operation_seconds", {"operation": "double"})
+    assert histogram.count == 1
+    assert histogram.sum >= 0
+
+
+def test_instrumented_errors(registry):
+    with pytest.raises(ValueError):
+        fail()
+    assert registry.counter("rt2_neo4j_operation_errors_total", {"operation": "fail"}) == 1
+    assert registry.histogram("rt2_neo4j_operation_seconds", {"operation": "fail"}).count == 1
+
+
+def test_instrumented_coroutine(registry):
+    @instrumented("sleep")
+    async def sleep():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    assert asyncio.run(sleep()) == "done"
+    histogram = registry.histogram("rt2_neo4j_operation_seconds", {"operation": "sleep"})
+    assert histogram.sum >= 0.01
+
+
+def test_instrumented_returning_awaitable(registry):
+    class FakeAsyncTx:
+        async def run(self, query):
+            await asyncio.sleep(0.01)
+            if query == "fail":
+                raise ValueError(query)
+            return query
+
+    @instrumented("visit")
+    def visit(tx, query):
+        return tx.run(query)
+
+    async def main():
+        tx = FakeAsyncTx()
+        assert await visit(tx, "create") == "create"
+        with pytest.raises(ValueError):
+            await visit(tx, "fail")
+
+    asyncio.run(main())
+    histogram = registry.histogram("rt2_neo4j_operation_seconds", {"operation": "visit"})
+    assert histogram.count == 2
+    assert histogram.sum >= 0.02
+    assert registry.counter("rt2_neo4j_operation_errors_total", {"operation": "visit"}) == 1
+
+
+def test_record_summary(registry):
+    record_result(FakeResult(summary(nodes=2, relationships=3, properties=4, available=5, consumed=7)), "save_tuple")
+    record_summary(summary(nodes=1), "save_tuple")
+    labels = {"operation": "save_tuple"}
+    assert registry.counter("rt2_neo4j_nodes_created_total", labels) == 3
+    assert registry.counter("rt2_neo4j_relationships_created_total", labels) == 3
+    assert registry.counter("rt2_neo4j_properties_set_total", labels) == 4
+    assert registry.histogram("rt2_neo4j_result_available_after_seconds", labels).sum == pytest.approx(0.005)
+    assert registry.histogram("rt2_neo4j_result_consumed_after_seconds", labels).count == 1
+
+
+def test_record_size(registry):
+    record_size("rt2_neo4j_payload_bytes", 100, "encode_data")
+    record_size("rt2_neo4j_payload_bytes", 10 ** 9, "encode_data")
+    histogram = registry.histogram("rt2_neo4j_payload_bytes", {"operation": "encode_data"})
+    assert histogram.buckets[0] == 64
+    assert histogram.cumulative() == [0] + [1] * 10 + [2]
+
+
+def test_histogram_quantile():
+    histogram = Histogram([1, 2, 4])
+    for value in [0.5, 1, 1.5, 3, 10]:
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.quantile(0.4) == 1
+    assert histogram.quantile(0.8) == 4
+    assert histogram.quantile(1) == float("inf")
+    assert Histogram([1]).quantile(0.5) == 0.0
+
+
+def test_render():
+    registry = MetricsRegistry(buckets={"latency_seconds": [0.1, 1]})
+    registry.observe("latency_seconds", 0.5, {"operation": "get_tuple"})
+    registry.increment("nodes_created_total", 2)
+    assert registry.render() == "\n".join([
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{operation="get_tuple",le="0.1"} 0',
+        'latency_seconds_bucket{operation="get_tuple",le="1"} 1',
+        'latency_seconds_bucket{operation="get_tuple",le="+Inf"} 1',
+        'latency_seconds_sum{operation="get_tuple"} 0.5',
+        'latency_seconds_count{operation="get_tuple"} 1',
+        "# TYPE nodes_created_total counter",
+        "nodes_created_total 2",
+    ]) + "\n"
+
+
+def test_callback_sink():
+    observed = []
+    previous = set_sink(CallbackSink(observe=lambda name, value, labels: observed.append((name, labels))))
+    try:
+        double(1)
+        record_summary(summary(), "save_tuple")
+    finally:
+        set_sink(previous)
+    assert ("rt2_neo4j_operation_seconds", {"operation": "double"}) in observed
+
+
+def test_set_sink_none():
+    previous = set_sink(MetricsRegistry())
+    set_sink(None)
+    assert type(get_sink()) is MetricsSink
+    set_sink(previous)
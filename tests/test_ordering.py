@@ -0,0 +1,69 @@
+from rt_core_v2.rttuple import ANTuple, ARTuple, DITuple, DCTuple, FTuple, NtoNTuple, NtoRTuple
+from rt2_neo4j.ordering import DependencyOrderer, tuple_references, tuple_provides
+
+
+tuple_an = ANTuple()
+tuple_ar = ARTuple()
+replacement_an = ANTuple()
+tuple_di = DITuple(ruia=tuple_an.ruin, ruid=tuple_an.ruin, ruit=tuple_ar.rui)
+tuple_dc = DCTuple(ruid=tuple_an.ruin, ruit=tuple_an.rui, replacements=[replacement_an.rui])
+tuple_nton = NtoNTuple(r=tuple_an.ruin, p=[tuple_an.ruin, replacement_an.ruin])
+tuple_ntor = NtoRTuple(ruin=tuple_an.ruin, ruir=tuple_ar.ruir, r=replacement_an.ruin)
+tuple_f = FTuple(C=0.5, ruitn=tuple_ntor.rui)
+
+
+def position(levels, tup):
+    for idx, level in enumerate(levels):
+        if tup in level:
+            return idx
+    return None
+
+
+def test_references():
+    assert tuple_references(tuple_an) == set()
+    assert tuple_provides(tuple_an) == {str(tuple_an.rui), str(tuple_an.ruin)}
+    assert tuple_references(tuple_dc) == {str(tuple_an.ruin), str(tuple_an.rui), str(replacement_an.rui)}
+    assert tuple_references(tuple_nton) == {str(tuple_an.ruin), str(replacement_an.ruin)}
+    assert tuple_references(tuple_f) == {str(tuple_ntor.rui)}
+
+
+def test_levels_follow_references():
+    orderer = DependencyOrderer()
+    reversed_stream = [tuple_f, tuple_dc, tuple_di, tuple_nton, tuple_ntor, replacement_an, tuple_ar, tuple_an]
+    levels = orderer.order(reversed_stream)
+    assert orderer.pending == []
+    assert sum(len(level) for level in levels) == len(reversed_stream)
+    assert position(levels, tuple_an) < position(levels, tuple_ntor) < position(levels, tuple_f)
+    assert position(levels, tuple_ar) < position(levels, tuple_di)
+    assert position(levels, replacement_an) < position(levels, tuple_dc)
+
+
+def test_pending_across_windows():
+    orderer = DependencyOrderer()
+    assert orderer.order([tuple_f, tuple_ntor]) == []
+    assert len(orderer.pending) == 2
+    levels = orderer.order([tuple_an, tuple_ar, replacement_an])
+    assert orderer.pending == []
+    assert position(levels, tuple_ntor) < position(levels, tuple_f)
+
+
+def test_unresolved_at_end_of_stream():
+    orderer = DependencyOrderer()
+    levels = list(orderer.stream([tuple_f, tuple_an, tuple_di], window_size=2))
+    assert [tup for level in levels for tup in level] == [tuple_an]
+    assert set(orderer.unresolved) == {tuple_f, tuple_di}
+
+
+def test_exists_resolves_written_nodes():
+    written = {str(tuple_an.ruin), str(tuple_ar.ruir), str(replacement_an.ruin)}
+    orderer = DependencyOrderer(exists=lambda ruis: ruis & written)
+    levels = list(orderer.stream([tuple_f, tuple_ntor]))
+    assert levels == [[tuple_ntor], [tuple_f]]
+    assert orderer.unresolved == []
+
+
+def test_max_pending():
+    orderer = DependencyOrderer(max_pending=1)
+    orderer.order([tuple_f, tuple_ntor])
+    assert orderer.pending == [tuple_ntor]
+    assert orderer.unresolved == [tuple_f]
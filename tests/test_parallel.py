@@ -0,0 +1,81 @@
+from rt_core_v2.rttuple import ANTuple, DITuple, NtoCTuple, NtoRTuple, ARTuple
+from rt2_neo4j.parallel import contended_keys, partition, parallel_ingest, ShardWriter
+from rt2_neo4j.retry import RetryPolicy, PartialWriteError
+from rt_core_v2.ids_codes.rui import TempRef
+from datetime import datetime
+from rt2_neo4j.queries import tuples_query
+from rt2_neo4j.schema import ensure_schema
+from neo4j import GraphDatabase
+
+
+uri = "neo4j://localhost:7687/"
+auth = ("neo4j", "neo4jneo4j")
+
+
+def test_partition_by_contended_keys():
+    code_system, relation = ANTuple(), ANTuple()
+    particulars = [ANTuple() for _ in range(50)]
+    ntocs = [NtoCTuple(code="shared", ruin=particular.ruin, r=relation.ruin, ruics=code_system.ruin) for particular in particulars]
+    assert all(f"code:{code_system.ruin}:shared" in contended_keys(tup) for tup in ntocs)
+    shards = partition(particulars + ntocs, 4)
+    assert sum(len(shard) for shard in shards) == 100
+    assert sum(1 for shard in shards if set(ntocs) & set(shard)) == 1
+    assert partition(particulars, 4) == partition(particulars, 4)
+
+
+def test_partition_joins_shared_nodes():
+    ar = ARTuple()
+    first, second, third = ANTuple(), ANTuple(), ANTuple()
+    shared = TempRef(datetime(2024, 1, 1))
+    # The first two tuples share a temporal node, the last two a PoR, so all three lock a node another one locks
+    linked = [NtoRTuple(ruin=first.ruin, ruir=ar.ruir, r=first.ruin, tr=shared),
+              NtoRTuple(ruin=second.ruin, ruir=ar.ruir, r=second.ruin, tr=shared),
+              NtoCTuple(code="code", ruin=second.ruin, r=third.ruin, ruics=third.ruin)]
+    shards = partition(linked + [ANTuple() for _ in range(10)], 4)
+    assert sum(1 for shard in shards if set(linked) & set(shard)) == 1
+    assert max(len(shard) for shard in shards) - min(len(shard) for shard in shards) <= 3
+
+
+class PartialPolicy(RetryPolicy):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def write(self, session, work, batch, split=True):
+        self.batches.append(batch)
+        if len(self.batches) == 2:
+            raise PartialWriteError(RuntimeError("cannot write"), [], batch[:1], batch[1:])
+        return []
+
+
+def test_shard_writer_partial_write():
+    tuples = [ANTuple() for _ in range(6)]
+    policy = PartialPolicy()
+    writer = ShardWriter(uri, auth, {}, 2, None, False, policy)
+    _, written, batches, _, _, failed, error = writer.write(tuples)
+    # The first batch and half of the second were committed, and the third batch was never attempted
+    assert (written, batches) == (3, 1)
+    assert failed == tuples[3:]
+    assert error == "cannot write"
+    assert len(policy.batches) == 2
+    writer.driver.close()
+
+
+def test_parallel_ingest():
+    driver = GraphDatabase.driver(uri, auth=auth)
+    with driver.session() as session:
+        session.run("MATCH (n) DETACH DELETE n").consume()
+    ensure_schema(driver)
+    author, ar = ANTuple(), ARTuple()
+    particulars = [ANTuple() for _ in range(200)]
+    dependents = [DITuple(ruia=author.ruin, ruid=author.ruin, ruit=particular.rui) for particular in particulars]
+    dependents += [NtoRTuple(ruin=particular.ruin, ruir=ar.ruir, r=author.ruin) for particular in particulars]
+    tuples = dependents + particulars + [author, ar]
+    report = parallel_ingest(reversed(tuples), uri, auth, workers=2, window_size=100, batch_size=50)
+    assert report.written == len(tuples)
+    assert report.unresolved == []
+    assert report.levels >= 2
+    assert sum(report.worker_written.values()) == len(tuples)
+    found = tuples_query([tup.rui for tup in tuples], driver)
+    assert all(found[tup.rui] == tup for tup in tuples)
+    driver.close()
@@ -1,7 +1,8 @@
 from rt_core_v2.rttuple import ANTuple, ARTuple, DITuple, DCTuple, FTuple, NtoNTuple, NtoRTuple, NtoCTuple, NtoDETuple, NtoLackRTuple, AttributesVisitor
-from rt2_neo4j.queries import TupleInsertionVisitor, tuple_query
+from rt2_neo4j.queries import TupleInsertionVisitor, TupleDecodeError, neo4j_to_rttuple, tuple_query, query_an, query_ar, query_di, query_dc, query_f, query_nton, query_ntor, query_ntoc, query_ntode
 from rt_core_v2.ids_codes.rui import Rui
 from neo4j import GraphDatabase
+import pytest
 
 
 
@@ -112,3 +113,38 @@ def ntolackr():
     print(f'ntolackr: {ntolackr_query}\n')
     retrieved_ntolackr = tuple_query(tuple_ntolackr.rui, driver)
     assert(retrieved_ntolackr == tuple_ntolackr)
+
+
+def test_tuple_query_matches_typed_queries():
+    # The single-statement lookup must rebuild the same tuples as the per-type queries
+    typed_queries = [(tuple_an, query_an), (tuple_ar, query_ar), (tuple_di, query_di), (tuple_dc, query_dc),
+                     (tuple_nton, query_nton), (tuple_ntor, query_ntor), (tuple_f, query_f),
+                     (tuple_ntoc, query_ntoc), (tuple_ntode, query_ntode)]
+    with driver.session() as session:
+        with session.begin_transaction() as tx:
+            for tup, query in typed_queries:
+                assert query(tup.rui, tx) == tuple_query(tup.rui, driver)
+
+
+def test_dc_nton_share_query_text():
+    # Lists of any length are passed as one parameter, so the query text does not depend on their length
+    short_dc = DCTuple(ruid=replacement_one_an.ruin, ruit=tuple_an.rui, replacements=[replacement_two_an.rui])
+    long_dc = DCTuple(ruid=replacement_one_an.ruin, ruit=tuple_an.rui,
+                      replacements=[replacement_two_an.rui, tuple_an.rui, replacement_one_an.rui])
+    short_nton = NtoNTuple(r=replacement_one_an.ruin, p=[replacement_two_an.ruin])
+    long_nton = NtoNTuple(r=replacement_one_an.ruin, p=[replacement_two_an.ruin, tuple_an.ruin, replacement_one_an.ruin])
+    with driver.session() as session:
+        with session.begin_transaction() as tx:
+            summaries = [insert_tuple.insert(tup, tx).consume() for tup in [short_dc, long_dc, short_nton, long_nton]]
+    assert summaries[0].query == summaries[1].query
+    assert summaries[2].query == summaries[3].query
+    assert tuple_query(long_dc.rui, driver) == long_dc
+    assert tuple_query(long_nton.rui, driver) == long_nton
+
+
+def test_neo4j_to_rttuple():
+    # Keys that are not components, such as the digest of a data node, are skipped
+    assert neo4j_to_rttuple({"C": 0.5, "sha256": "digest"}) == {"C": 0.5}
+    with pytest.raises(TupleDecodeError) as raised:
+        neo4j_to_rttuple({"C": "not a number"})
+    assert raised.value.key == "C"
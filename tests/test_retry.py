@@ -0,0 +1,144 @@
+from rt2_neo4j.retry import RetryPolicy, RetryMetrics, PartialWriteError
+import asyncio
+import pickle
+import pytest
+
+
+class FakeNeo4jError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+    def is_retryable(self):
+        return self.code.startswith("Neo.TransientError")
+
+
+deadlock = "Neo.TransientError.Transaction.DeadlockDetected"
+lock_timeout = "Neo.TransientError.Transaction.LockAcquisitionTimeout"
+constraint = "Neo.ClientError.Schema.ConstraintValidationFailed"
+
+
+class FakeSession:
+    """Session double running transaction functions once, like execute_write does for non-driver errors"""
+
+    def __init__(self):
+        self.committed = []
+
+    def execute_write(self, work, *args):
+        tx = []
+        result = work(tx, *args)
+        self.committed.append(tx)
+        return result
+
+
+def policy(**kwargs):
+    sleeps = []
+    return RetryPolicy(sleep=sleeps.append, random=lambda: 0.5, **kwargs), sleeps
+
+
+def failing(errors):
+    errors = list(errors)
+
+    def work(tx, *args):
+        if errors:
+            raise FakeNeo4jError(errors.pop(0))
+        tx.append(args)
+        return "done"
+    return work
+
+
+def test_backoff():
+    retry_policy, sleeps = policy(initial_delay=0.1, multiplier=2.0, max_delay=0.3)
+    session = FakeSession()
+    assert retry_policy.execute_write(session, failing([deadlock, lock_timeout, deadlock])) == "done"
+    assert sleeps == pytest.approx([0.1, 0.2, 0.3])
+    stats = retry_policy.stats()
+    assert (stats.attempts, stats.retries, stats.deadlocks, stats.lock_timeouts, stats.failures) == (4, 3, 2, 1, 0)
+    assert stats.backoff_seconds == pytest.approx(0.6)
+    assert stats.contention_rate() == 0.75
+
+
+def test_jitter():
+    retry_policy = RetryPolicy(initial_delay=1.0, jitter=0.5, random=lambda: 0.0)
+    assert retry_policy.delay(0) == 0.5
+    retry_policy.random = lambda: 1.0
+    assert retry_policy.delay(0) == 1.5
+
+
+def test_gives_up():
+    retry_policy, sleeps = policy(max_attempts=3)
+    with pytest.raises(FakeNeo4jError):
+        retry_policy.execute_write(FakeSession(), failing([deadlock] * 3))
+    assert len(sleeps) == 2
+    assert retry_policy.stats().failures == 1
+
+
+def test_non_transient_errors_are_not_retried():
+    retry_policy, sleeps = policy()
+    with pytest.raises(FakeNeo4jError):
+        retry_policy.write(FakeSession(), failing([constraint]), list(range(8)))
+    assert sleeps == []
+    assert retry_policy.stats().splits == 0
+
+
+def test_split():
+    retry_policy, _ = policy(max_attempts=2, min_split_size=2)
+    session = FakeSession()
+    assert retry_policy.write(session, failing([deadlock] * 2), list(range(8))) == ["done", "done"]
+    assert [tx[0][0] for tx in session.committed] == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert retry_policy.stats().splits == 1
+
+
+def test_partial_write():
+    retry_policy, _ = policy(max_attempts=1)
+    session = FakeSession()
+
+    def work(tx, batch):
+        # Batches holding 5 always fail, so [0..3] and [4] are committed before [5] gives up and [6, 7] is never tried
+        if 5 in batch:
+            raise FakeNeo4jError(deadlock)
+        tx.append(batch)
+        return batch[0]
+
+    with pytest.raises(PartialWriteError) as raised:
+        retry_policy.write(session, work, list(range(8)))
+    partial = raised.value
+    assert partial.committed == [0, 1, 2, 3, 4]
+    assert partial.remaining == [5, 6, 7]
+    assert partial.results == [0, 4]
+    assert partial.error.code == deadlock
+    assert [tx[0] for tx in session.committed] == [[0, 1, 2, 3], [4]]
+
+
+def test_no_split():
+    retry_policy, _ = policy(max_attempts=2)
+    with pytest.raises(FakeNeo4jError):
+        retry_policy.write(FakeSession(), failing([deadlock] * 2), list(range(8)), split=False)
+
+
+def test_async():
+    class AsyncSession:
+        async def execute_write(self, work, *args):
+            return await work([], *args)
+
+    errors = [deadlock]
+
+    async def work(tx, batch):
+        if errors:
+            raise FakeNeo4jError(errors.pop())
+        return batch
+
+    retry_policy = RetryPolicy(initial_delay=0.0)
+    assert asyncio.run(retry_policy.execute_write_async(AsyncSession(), work, [1])) == [1]
+    assert retry_policy.stats().retries == 1
+
+
+def test_pickle():
+    retry_policy, _ = policy(max_attempts=7)
+    retry_policy.record("retries")
+    copy = pickle.loads(pickle.dumps(RetryPolicy(max_attempts=7)))
+    assert copy.max_attempts == 7
+    assert copy.stats().retries == 0
+    metrics = RetryMetrics()
+    metrics.add(retry_policy.take_stats())
+    assert metrics.retries == 1 and retry_policy.stats().retries == 0
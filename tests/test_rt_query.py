@@ -0,0 +1,99 @@
+from rt_core_v2.rttuple import TupleType, ANTuple, ARTuple, DITuple, FTuple, NtoRTuple, NtoCTuple, NtoDETuple
+from rt2_neo4j.rt_query import RtQuery, QueryPlan
+from rt2_neo4j.queries import RelationshipLabels
+from rt2_neo4j.memory import InMemoryRtStore
+from rt2_neo4j.client import Neo4jRtStore
+import pytest
+
+
+uri = "neo4j://localhost:7687/"
+auth = ("neo4j", "neo4jneo4j")
+
+author, other, ar = ANTuple(), ANTuple(), ARTuple()
+dis = [DITuple(ruia=author.ruin, ruid=author.ruin, ruit=tup.rui) for tup in (other, ar)]
+ntor = NtoRTuple(ruin=other.ruin, ruir=ar.ruir, r=author.ruin)
+fs = [FTuple(C=confidence, ruitn=ntor.rui) for confidence in (0.2, 0.5, 0.9)]
+ntoc = NtoCTuple(code="code", ruin=other.ruin, r=author.ruin, ruics=author.ruin)
+ntode = NtoDETuple(ruin=other.ruin, ruidt=author.ruin, data=b"payload")
+all_tuples = [author, other, ar, ntor, ntoc, ntode] + dis + fs
+
+queries = [
+    RtQuery(TupleType.DI).refers_to(RelationshipLabels.ruia, author.ruin),
+    RtQuery(TupleType.F).where("C", ">=", 0.5),
+    RtQuery(TupleType.F).order_by("C", descending=True).limit(2),
+    RtQuery().refers_to(RelationshipLabels.ruin, other.ruin),
+    RtQuery().referred_by(RelationshipLabels.ruitn, fs[0].rui),
+    RtQuery(TupleType.NtoC).designated_by(author.ruin, "code"),
+    RtQuery(TupleType.NtoDE).designated_by(author.ruin, b"payload"),
+    RtQuery(TupleType.AN, TupleType.AR).order_by().skip(1),
+]
+
+
+def test_compile():
+    text, parameters = RtQuery(TupleType.F).where("C", ">", 0.5).refers_to(RelationshipLabels.ruitn, ntor.rui).after(fs[0].rui).limit(10).compile()
+    assert "MATCH (node:F)" in text
+    assert "MATCH (node)-[:ruitn]->(:RtNode {rui: $p1})" in text
+    assert "WHERE node.C > $p0 AND node.rui > $after" in text
+    assert "WITH DISTINCT node ORDER BY node.rui LIMIT $limit" in text
+    assert parameters == {"p0": 0.5, "p1": str(ntor.rui), "after": str(fs[0].rui), "limit": 10}
+    # Queries of the same shape share their text
+    assert RtQuery(TupleType.F).where("C", ">", 0.1).get_query() == RtQuery(TupleType.F).where("C", ">", 0.7).get_query()
+
+
+def test_invalid_queries():
+    with pytest.raises(ValueError):
+        RtQuery().where("ruin", "=", other.ruin)
+    with pytest.raises(ValueError):
+        RtQuery().where("C", "=~", ".*")
+    with pytest.raises(ValueError):
+        RtQuery().order_by("ruia")
+
+
+def test_queries_are_immutable():
+    base = RtQuery(TupleType.F)
+    filtered = base.where("C", ">", 0.5)
+    assert base.conditions == [] and len(filtered.conditions) == 1
+
+
+def test_evaluate():
+    store = InMemoryRtStore()
+    store.save_tuples(all_tuples)
+    assert store.run_query(queries[0]) == set(dis)
+    assert store.run_query(queries[1]) == set(fs[1:])
+    assert list(store.iter_query(queries[2])) == [fs[2], fs[1]]
+    assert store.run_query(queries[3]) == {other, ntor, ntoc, ntode}
+    assert store.run_query(queries[4]) == {ntor}
+    assert store.run_query(queries[5]) == {ntoc}
+    assert store.run_query(queries[6]) == {ntode}
+
+
+def test_differential():
+    memory_store = InMemoryRtStore()
+    memory_store.save_tuples(all_tuples)
+    neo4j_store = Neo4jRtStore(uri, auth)
+    with neo4j_store.driver.session() as session:
+        session.run("MATCH (n) DETACH DELETE n").consume()
+    neo4j_store.ensure_schema()
+    neo4j_store.save_tuples(all_tuples)
+    for query in queries:
+        if query.ordering:
+            assert list(neo4j_store.iter_query(query)) == list(memory_store.iter_query(query))
+        else:
+            assert neo4j_store.run_query(query) == memory_store.run_query(query)
+    plan = neo4j_store.explain(queries[0])
+    assert plan.operator == "ProduceResults"
+    assert plan.total_db_hits() == 0
+    profiled = neo4j_store.profile(queries[0])
+    assert profiled.total_db_hits() > 0
+    assert "db_hits=" in profiled.render()
+    neo4j_store.shut_down()
+
+
+def test_query_plan():
+    plan = QueryPlan.from_summary({
+        "operatorType": "ProduceResults@neo4j", "args": {"Details": "node"}, "identifiers": ["node"], "dbHits": 0, "rows": 2,
+        "children": [{"operatorType": "NodeIndexSeek@neo4j", "args": {}, "identifiers": ["node"], "dbHits": 3, "rows": 2, "children": []}],
+    })
+    assert [operator.operator for operator in plan.operators()] == ["ProduceResults", "NodeIndexSeek"]
+    assert plan.total_db_hits() == 3
+    assert plan.render().splitlines() == ["ProduceResults rows=2 db_hits=0 (node)", "  NodeIndexSeek rows=2 db_hits=3"]
@@ -0,0 +1,104 @@
+from rt_core_v2.rttuple import ANTuple
+from rt_core_v2.ids_codes.rui import Rui
+from rt2_neo4j.schema import rui_properties, ensure_schema, migrate_shared_label, migrate_author_keys, merge_duplicate_designators, migrate_encoding, schema_statements
+from rt2_neo4j.encoding import Encoding
+from rt2_neo4j.queries import NodeLabels, tuple_query, author_page_lookup_query
+from neo4j import GraphDatabase
+
+
+uri = "neo4j://localhost:7687/"
+auth = ("neo4j", "neo4jneo4j")
+config = {}
+
+driver = GraphDatabase.driver(uri, auth=auth, **config)
+
+
+def test_ensure_schema_idempotent():
+    ensure_schema(driver)
+    ensure_schema(driver)
+    with driver.session() as session:
+        names = {record["name"] for record in session.run("SHOW INDEXES YIELD name")}
+    assert f"{NodeLabels.RtNode.name}_rui" in names
+    assert f"{NodeLabels.AN.name}_rui_unique" in names
+    assert f"{NodeLabels.Code.name}_designator_unique" in names
+    assert len(names) >= len([statement for statement in schema_statements() if not statement.startswith("DROP")])
+
+
+def test_migrate_shared_label():
+    # Simulate an AN tuple written before the shared label existed
+    legacy_an = ANTuple()
+    with driver.session() as session:
+        session.run(f"""
+            CREATE (an:{NodeLabels.AN.value} {{rui: $rui, ar: $ar, unique: $unique}})
+            CREATE (npor:{NodeLabels.NPoR.value} {{rui: $ruin}})
+            CREATE (an)-[:ruin]->(npor)
+        """, rui=str(legacy_an.rui), ruin=str(legacy_an.ruin), ar=legacy_an.ar.value, unique=legacy_an.unique.value).consume()
+    assert migrate_shared_label(driver, batch_size=1) >= 2
+    assert migrate_shared_label(driver) == 0
+    assert tuple_query(legacy_an.rui, driver) == legacy_an
+
+
+def test_migrate_encoding():
+    # Simulate an AN tuple written with canonical ruis
+    legacy_an = ANTuple()
+    with driver.session() as session:
+        session.run(f"""
+            CREATE (an:{NodeLabels.AN.value}:{NodeLabels.RtNode.value} {{rui: $rui, ar: $ar, unique: $unique}})
+            CREATE (npor:{NodeLabels.NPoR.value}:{NodeLabels.RtNode.value} {{rui: $ruin}})
+            CREATE (an)-[:ruin]->(npor)
+        """, rui=str(legacy_an.rui), ruin=str(legacy_an.ruin), ar=legacy_an.ar.value, unique=legacy_an.unique.value).consume()
+    assert migrate_encoding(driver, Encoding(compact_ruis=True)) >= 2
+    compact = Encoding(compact_ruis=True)
+    assert tuple_query(legacy_an.rui, driver, encoding=compact) == legacy_an
+    migrate_encoding(driver, Encoding())
+    assert tuple_query(legacy_an.rui, driver) == legacy_an
+
+
+def test_migrate_author_keys():
+    # Simulate a DI node written before its author was stored on it
+    author, di = str(Rui()), str(Rui())
+    with driver.session() as session:
+        session.run(f"""
+            CREATE (di:{NodeLabels.DI.value}:{NodeLabels.RtNode.value} {{rui: $di}})
+            CREATE (author:{NodeLabels.NPoR.value}:{NodeLabels.RtNode.value} {{rui: $author}})
+            CREATE (di)-[:ruia]->(author)
+        """, di=di, author=author).consume()
+    assert migrate_author_keys(driver) >= 1
+    assert migrate_author_keys(driver) == 0
+    with driver.session() as session:
+        rows = session.run(author_page_lookup_query, ruia=author, after="", limit=10).data()
+    assert [row["rui"] for row in rows] == [di]
+
+
+def test_merge_duplicate_designators():
+    # Simulate two writers that created the same Code node before the uniqueness constraint existed
+    with driver.session() as session:
+        session.run("DROP CONSTRAINT Code_designator_unique IF EXISTS").consume()
+        session.run(f"""
+            UNWIND range(0, 1) AS idx
+            CREATE (ntoc:{NodeLabels.NtoC.value}:{NodeLabels.RtNode.value} {{rui: randomUUID()}})
+            CREATE (ntoc)-[:code]->(:{NodeLabels.Code.value} {{ruics: 'duplicated', code: 'code'}})
+        """).consume()
+    assert merge_duplicate_designators(driver) == 1
+    ensure_schema(driver)
+    with driver.session() as session:
+        record = session.run(f"""
+            MATCH (code:{NodeLabels.Code.value} {{ruics: 'duplicated', code: 'code'}})
+            RETURN count(code) AS nodes, COUNT {{ (code)<-[:code]-() }} AS uses
+        """).single()
+    assert (record["nodes"], record["uses"]) == (1, 2)
+
+
+def test_migrate_encoding_rui_components():
+    assert {(NodeLabels.AR, "ruio"), (NodeLabels.DI, "ruia")} <= {(label, prop) for label, prop, _ in rui_properties}
+    # Simulate an AR node whose ruio was written canonical
+    rui, ruio = Rui(), Rui()
+    with driver.session() as session:
+        session.run(f"CREATE (:{NodeLabels.AR.value}:{NodeLabels.RtNode.value} {{rui: $rui, ruio: $ruio}})",
+                    rui=str(rui), ruio=str(ruio)).consume()
+    compact = Encoding(compact_ruis=True)
+    migrate_encoding(driver, compact)
+    with driver.session() as session:
+        record = session.run(f"MATCH (ar:{NodeLabels.AR.value} {{rui: $rui}}) RETURN ar.ruio AS ruio", rui=compact.rui(rui)).single()
+    assert record["ruio"] == compact.rui(ruio)
+    migrate_encoding(driver, Encoding())